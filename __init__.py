@@ -5,12 +5,27 @@ from flask import Flask
 
 def create_app():
     """Cria e configura uma instância do aplicativo Flask."""
+    from . import metrics
+    with metrics.startup_phase("create_app"): # Inclui importar os módulos (e carregar os dados, na primeira vez)
+        app = _build_app(metrics)
+    if metrics.STARTUP_REPORT:
+        print(metrics.startup_report())
+    return app
+
+def _build_app(metrics):
     app = Flask(__name__, template_folder='templates')
     app.config['SECRET_KEY'] = 'dev_secret_key' # Usar uma chave segura em produção
 
+    metrics.init_app(app) # Antes das rotas: o tempo de cada requisição inclui a espera pela trava de escrita
+
     # Importar e registrar blueprints ou rotas aqui
     from . import routes
     app.register_blueprint(routes.bp)
+    from . import api
+    app.register_blueprint(api.bp) # API JSON de leitura (/api/...)
+
+    from .commands import register_commands
+    register_commands(app)
 
     # Inicializar extensões (ex: banco de dados) aqui, se necessário
 
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""API JSON de leitura (classificação, tabela de jogos, mata-mata e estatísticas) para placares e apps.
+
+Cada resposta tem um ETag forte derivado da versão da competição: clientes que repetem a consulta com
+`If-None-Match` recebem `304 Not Modified` sem que nada seja recalculado nem serializado. Os corpos
+JSON ficam no `view_cache` (válidos enquanto a versão não mudar) e `Cache-Control` permite que um
+proxy reverso atenda a maior parte das consultas.
+"""
+
+import hashlib
+import json
+import os
+
+from flask import Blueprint, Response, request, abort
+
+from .models import (
+    list_competitions, get_competition, get_group,
+    get_competition_teams, get_competition_matches, get_group_matches, get_round_matches
+)
+from .cache import view_cache
+from .serializers import standings_json, match_json, team_name
+from .live import live_hub, LIVE_RETRY_AFTER
+from .routes import get_sorted_standings, get_bracket, get_competition_stats
+from .simulation import qualification_odds
+
+bp = Blueprint("api", __name__, url_prefix="/api")
+
+API_FORMAT = 1 # Incrementar ao mudar o formato das respostas: invalida os ETags já distribuídos
+CACHE_MAX_AGE = int(os.environ.get("API_CACHE_MAX_AGE", "5")) # Segundos que clientes/proxies podem reutilizar a resposta
+MATCH_STATUSES = ("scheduled", "finished") # Valores aceitos no filtro `status`
+MAX_STATS_LIMIT = 50 # `limit` das estatísticas é limitado a 1..MAX_STATS_LIMIT (poucas variantes em cache)
+
+# --- Respostas com ETag ---
+
+def _etag(*parts):
+    return hashlib.sha1(json.dumps([API_FORMAT, *parts], default=str).encode("utf-8")).hexdigest()[:24]
+
+def _respond(etag, build_body):
+    """304 se o cliente já tem a versão; senão o JSON (bytes de `build_body()`) com ETag e Cache-Control."""
+    if request.if_none_match.contains_weak(etag): # If-None-Match usa comparação fraca (RFC 9110): proxies podem enfraquecer o ETag
+        response = Response(status=304)
+    else:
+        response = Response(build_body(), mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = f"public, max-age={CACHE_MAX_AGE}, must-revalidate"
+    return response
+
+def _cached_response(competition, resource, build_data, *args):
+    """Resposta de um recurso da competição: ETag pela versão e corpo serializado em cache."""
+    def build_body():
+        return view_cache.get_or_build(competition, ("api", resource, args),
+                                       lambda: json.dumps(build_data(), ensure_ascii=False).encode("utf-8"))
+    return _respond(_etag(competition.id, competition.version, resource, args), build_body)
+
+def _int_arg(name):
+    """Parâmetro inteiro opcional; 400 se vier em outro formato (nunca vira chave de cache)."""
+    value = request.args.get(name)
+    if value is None or value == "": return None
+    try:
+        return int(value)
+    except ValueError:
+        abort(400, description=f"Parâmetro '{name}' deve ser um número inteiro.")
+
+def _get_competition_or_404(competition_id):
+    competition = get_competition(competition_id)
+    if not competition: abort(404)
+    return competition
+
+# --- Rotas ---
+
+@bp.route("/competitions")
+def competitions():
+    summaries = [{"id": c.id, "name": c.name, "type": c.type, "format": c.format, "status": c.status}
+                 for c in list_competitions()]
+    body = json.dumps(summaries, ensure_ascii=False).encode("utf-8")
+    return _respond(hashlib.sha1(body).hexdigest()[:24], lambda: body) # Listagem não tem versão: ETag pelo conteúdo
+
+@bp.route("/competition/<int:competition_id>")
+def competition_detail(competition_id):
+    competition = _get_competition_or_404(competition_id)
+    def build():
+        return {"id": competition.id, "name": competition.name, "type": competition.type,
+                "format": competition.format, "status": competition.status, "version": competition.version,
+                "teams": [{"id": t.id, "name": t.name} for t in get_competition_teams(competition_id)],
+                "groups": [{"id": g.id, "name": g.name, "teams": g.teams.to_list()}
+                           for g in (get_group(group_id) for group_id in competition.groups) if g]}
+    return _cached_response(competition, "competition", build)
+
+@bp.route("/competition/<int:competition_id>/standings")
+def standings(competition_id):
+    competition = _get_competition_or_404(competition_id)
+    def build():
+        if competition.format == "groups_knockout":
+            return {"groups": [{"group_id": g.id, "name": g.name,
+                                "standings": standings_json(get_sorted_standings(competition, group_id=g.id))}
+                               for g in (get_group(group_id) for group_id in competition.groups) if g]}
+        return {"standings": standings_json(get_sorted_standings(competition))}
+    return _cached_response(competition, "standings", build)
+
+@bp.route("/competition/<int:competition_id>/schedule")
+def schedule(competition_id):
+    """Partidas da competição; filtros opcionais `group_id`, `round` e `status`."""
+    competition = _get_competition_or_404(competition_id)
+    # Filtros validados antes de virarem chave do view_cache: valores arbitrários não criam entradas novas
+    group_id = _int_arg("group_id")
+    round_number = _int_arg("round")
+    status = request.args.get("status") or None
+    if group_id is not None and group_id not in competition.groups:
+        abort(400, description=f"Grupo {group_id} não pertence à competição.")
+    if round_number is not None and not get_round_matches(competition_id, round_number):
+        abort(400, description=f"Rodada {round_number} não existe na competição.")
+    if status is not None and status not in MATCH_STATUSES:
+        abort(400, description=f"Parâmetro 'status' deve ser um de: {', '.join(MATCH_STATUSES)}.")
+    def build():
+        if group_id is not None: matches = get_group_matches(group_id)
+        elif round_number is not None: matches = get_round_matches(competition_id, round_number)
+        else: matches = get_competition_matches(competition_id)
+        matches = [m for m in matches if m.competition_id == competition_id and (not status or m.status == status)]
+        matches = sorted(matches, key=lambda m: (m.round_number or 0, m.group_id or 0, m.id))
+        return {"matches": [match_json(m) for m in matches]}
+    return _cached_response(competition, "schedule", build, group_id, round_number, status)
+
+@bp.route("/competition/<int:competition_id>/knockout")
+def knockout(competition_id):
+    competition = _get_competition_or_404(competition_id)
+    def build():
+        return {"rounds": [{"name": round_name, "matches": [match_json(m) for m, _, _ in entries]}
+                           for round_name, entries in get_bracket(competition)]}
+    return _cached_response(competition, "knockout", build)
+
+@bp.route("/competition/<int:competition_id>/stats")
+def stats(competition_id):
+    """Artilharia, disciplina e goleiros; `limit` restringe cada lista aos N primeiros."""
+    competition = _get_competition_or_404(competition_id)
+    limit = _int_arg("limit")
+    if limit is not None: limit = min(max(limit, 1), MAX_STATS_LIMIT)
+    def build():
+        data = get_competition_stats(competition)
+        return {name: rows[:limit] if limit is not None else rows for name, rows in data.items()}
+    return _cached_response(competition, "stats", build, limit)
+
+@bp.route("/competition/<int:competition_id>/odds")
+def odds(competition_id):
+    """Probabilidades por simulação: de cada posição final e de classificação (grupos) por time."""
+    competition = _get_competition_or_404(competition_id)
+    def odds_json(result):
+        if result is None: return None
+        return {"runs": result.runs, "remaining_matches": result.remaining,
+                "teams": [{"team_id": team_id, "team_name": team_name(team_id), "qualify": round(result.qualify[team_id], 4),
+                           "positions": [round(p, 4) for p in positions]}
+                          for team_id, positions in result.positions.items()]}
+    def build():
+        if competition.format == "groups_knockout":
+            return {"groups": [{"group_id": group_id, "odds": odds_json(qualification_odds(competition, group_id))}
+                               for group_id in competition.groups if get_group(group_id)]}
+        return {"odds": odds_json(qualification_odds(competition))}
+    return _cached_response(competition, "odds", build)
+
+@bp.route("/competition/<int:competition_id>/live")
+def live(competition_id):
+    """Server-Sent Events: um evento `result` a cada resultado registrado (diff da partida, classificação
+    e jogadores) e `version` quando outro worker alterou a competição."""
+    competition = _get_competition_or_404(competition_id)
+    last_event_id = request.headers.get("Last-Event-ID", type=int) or 0
+    if not live_hub.try_subscribe():
+        # Limite de streams do worker: recusar em vez de ocupar a thread que atenderia outras requisições
+        response = Response("Limite de conexões ao vivo atingido; tente novamente.", status=503, mimetype="text/plain")
+        response.headers["Retry-After"] = str(LIVE_RETRY_AFTER)
+        return response
+    response = Response(live_hub.stream(competition_id, competition.version, last_event_id), mimetype="text/event-stream")
+    response.call_on_close(live_hub.unsubscribe) # Libera a vaga mesmo se o stream nunca chegar a ser iterado
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no" # nginx: não acumular o stream
+    return response
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks dos caminhos críticos (carga/gravação, classificação, estatísticas, página da competição e súmula).
+
+Executar a partir do diretório que contém o pacote: `python -m src.benchmarks --size small`.
+Os dados são gerados (com semente fixa) em um diretório temporário; nada do DATA_FILE real é tocado.
+"""
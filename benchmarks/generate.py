@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Gerador de torneios sintéticos (reprodutível pela semente) no formato cru do data.json.
+
+Não importa models.py: o arquivo pode ser gerado antes de DATA_FILE/DATA_BACKEND serem definidos. As
+competições alternam entre grupos + mata-mata e pontos corridos (com o mesmo número de times); as
+primeiras rodadas de cada tabela ficam finalizadas, com placares e eventos (gols e cartões). Classificações
+e totais de estatísticas não são gerados: o benchmark os calcula ao preparar os dados.
+"""
+
+import json
+import os
+import random
+
+from ..scheduling import schedule_matches
+from ..storage import ENTITY_KINDS, DEFAULT_NEXT_IDS
+
+SIZES = { # Presets de --size
+    "small": {"competitions": 2, "groups": 2, "teams_per_group": 4, "players_per_team": 11, "events_per_match": 4},
+    "medium": {"competitions": 10, "groups": 4, "teams_per_group": 4, "players_per_team": 16, "events_per_match": 6},
+    "large": {"competitions": 40, "groups": 4, "teams_per_group": 6, "players_per_team": 22, "events_per_match": 8},
+}
+GROUP_NAMES = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+class _Builder:
+    """Acumula as entidades cruas e distribui os IDs como get_next_id faria."""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.raw = {kind: {} for kind in ENTITY_KINDS}
+        self.next_ids = dict(DEFAULT_NEXT_IDS)
+
+    def new_id(self, type_key):
+        entity_id = self.next_ids[type_key]
+        self.next_ids[type_key] = entity_id + 1
+        return entity_id
+
+    def add_team(self, competition_id, players_per_team):
+        team_id = self.new_id("team")
+        player_ids = [self.new_id("player") for _ in range(players_per_team)]
+        for number, player_id in enumerate(player_ids, 1):
+            self.raw["players"][str(player_id)] = {"id": player_id, "name": f"Jogador {team_id:04d}-{number:02d}",
+                                                   "team_id": team_id, "competition_stats": {}}
+        self.raw["teams"][str(team_id)] = {"id": team_id, "name": f"Time {team_id:04d}", "competition_id": competition_id,
+                                           "players": player_ids, "competition_stats": {}}
+        return team_id
+
+    def _event(self, match_id, team_id, event_type):
+        player_id = self.rng.choice(self.raw["teams"][str(team_id)]["players"])
+        return {"id": self.new_id("event"), "match_id": match_id, "team_id": team_id, "player_id": player_id,
+                "event_type": event_type, "minute": str(self.rng.randint(1, 90))}
+
+    def add_matches(self, competition_id, team_ids, group_id, finished_ratio, events_per_match):
+        """Cria a tabela de pontos corridos; rodadas até `finished_ratio` do total saem finalizadas."""
+        fixtures = schedule_matches(team_ids)
+        last_finished = round(max(r for r, _, _ in fixtures) * finished_ratio)
+        match_ids = []
+        for round_number, team1_id, team2_id in fixtures:
+            match_id = self.new_id("match")
+            match = {"id": match_id, "competition_id": competition_id, "team1_id": team1_id, "team2_id": team2_id,
+                     "group_id": group_id, "round_number": round_number, "events": []}
+            if round_number <= last_finished:
+                score1, score2 = self.rng.randint(0, 3), self.rng.randint(0, 3)
+                events = ([self._event(match_id, team1_id, "goal") for _ in range(score1)]
+                          + [self._event(match_id, team2_id, "goal") for _ in range(score2)])
+                for _ in range(max(0, events_per_match - score1 - score2)):
+                    card = "red_card" if self.rng.random() < 0.1 else "yellow_card"
+                    events.append(self._event(match_id, self.rng.choice((team1_id, team2_id)), card))
+                events.sort(key=lambda e: int(e["minute"]))
+                match.update(status="finished", team1_score=score1, team2_score=score2,
+                             date=f"2026-{1 + round_number // 28:02d}-{1 + round_number % 28:02d}", events=events)
+            self.raw["matches"][str(match_id)] = match
+            match_ids.append(match_id)
+        return match_ids
+
+def generate_dataset(seed=0, competitions=2, groups=2, teams_per_group=4, players_per_team=11,
+                     events_per_match=4, finished_ratio=0.75):
+    """Gera os dados crus (formato do data.json). A mesma semente e os mesmos tamanhos geram os mesmos dados."""
+    builder = _Builder(seed)
+    groups = max(1, groups)
+    for index in range(competitions):
+        competition_id = builder.new_id("competition")
+        round_robin = index % 2 == 1
+        team_ids = [builder.add_team(competition_id, players_per_team) for _ in range(groups * teams_per_group)]
+        competition = {"id": competition_id, "name": f"Competição {competition_id:03d}", "type": "futebol",
+                       "format": "round_robin" if round_robin else "groups_knockout", "teams": team_ids,
+                       "groups": [], "matches": [], "standings": {}, "knockout_stage": None,
+                       "status": "round_robin_stage" if round_robin else "group_stage", "version": 0, "stats_ready": False}
+        if round_robin:
+            competition["matches"] = builder.add_matches(competition_id, team_ids, None, finished_ratio, events_per_match)
+        else:
+            for number in range(groups):
+                group_id = builder.new_id("group")
+                group_teams = team_ids[number * teams_per_group:(number + 1) * teams_per_group]
+                match_ids = builder.add_matches(competition_id, group_teams, group_id, finished_ratio, events_per_match)
+                builder.raw["groups"][str(group_id)] = {"id": group_id, "competition_id": competition_id,
+                                                        "name": f"Grupo {GROUP_NAMES[number % len(GROUP_NAMES)]}",
+                                                        "teams": group_teams, "matches": match_ids, "standings": {},
+                                                        "is_finished": False}
+                competition["groups"].append(group_id)
+                competition["matches"].extend(match_ids)
+        builder.raw["competitions"][str(competition_id)] = competition
+    builder.raw["next_ids"] = builder.next_ids
+    return builder.raw
+
+def write_dataset(path, raw):
+    """Grava os dados crus em `path` (como data.json). Retorna o tamanho do arquivo em bytes."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(raw, f, ensure_ascii=False)
+    return os.path.getsize(path)
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""Executa os benchmarks: gera os dados, carrega o app sobre eles e mede cada caminho crítico.
+
+Para cada caso: latência (p50/p95/p99/máx. em ms), pico de memória alocada em uma chamada (tracemalloc)
+e bytes gravados por chamada (`wchar` de /proc/self/io; indisponível fora do Linux). Os casos "direct"
+chamam as funções; os casos "client" passam pelo test client do Flask (rotas, templates e caches).
+Casos "cold" descartam os caches derivados antes de cada chamada (fora do tempo medido).
+
+Com `--baseline` compara com um resultado salvo (`--save-baseline`) e termina com código 1 se algum
+caso piorou além da tolerância.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from .generate import SIZES, generate_dataset, write_dataset
+
+BASELINE_FORMAT = 1
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# --- Medição ---
+
+def _written_bytes():
+    """Bytes enviados a write() por este processo até agora (None se o sistema não informa)."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _percentile(sorted_values, q):
+    """Percentil pelo método do posto mais próximo."""
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+def measure(call, iterations, setup=None):
+    """Mede `call(i)` por `iterations` vezes (`setup(i)` roda antes de cada chamada, fora do tempo)."""
+    if setup: setup(-1)
+    call(-1) # Aquecimento (imports, templates compilados, fontes do PDF)
+    timings = []
+    written = 0
+    for i in range(iterations):
+        if setup: setup(i)
+        before = _written_bytes()
+        start = time.perf_counter()
+        call(i)
+        timings.append(time.perf_counter() - start)
+        after = _written_bytes()
+        written = None if before is None or written is None else written + after - before
+    if setup: setup(iterations)
+    tracemalloc.start()
+    call(iterations)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    timings.sort()
+    return {"iterations": iterations,
+            "p50_ms": round(_percentile(timings, 0.50) * 1000, 3),
+            "p95_ms": round(_percentile(timings, 0.95) * 1000, 3),
+            "p99_ms": round(_percentile(timings, 0.99) * 1000, 3),
+            "max_ms": round(timings[-1] * 1000, 3),
+            "peak_kib": round(peak / 1024, 1),
+            "written_kib": round(written / iterations / 1024, 1) if written is not None else None}
+
+# --- Ambiente ---
+
+def prepare_environment(directory, raw, backend):
+    """Grava os dados gerados para o backend escolhido e aponta as variáveis de ambiente para eles.
+
+    Precisa rodar antes de importar models.py (que lê a configuração na importação).
+    """
+    from ..storage import migrate_json_to_sqlite, migrate_json_to_shards
+    data_file = os.path.join(directory, "data.json")
+    size = write_dataset(data_file, raw)
+    os.environ.update({"DATA_FILE": data_file, "DATABASE_FILE": os.path.join(directory, "data.db"),
+                       "SHARD_DIR": os.path.join(directory, "shards"), "DATA_BACKEND": backend,
+                       "SAVE_INTERVAL": "0", # Gravação síncrona: o tempo e os bytes gravados entram na medição
+                       "MULTI_WORKER": "0", "SUMULA_CACHE_DIR": ""})
+    if backend == "sqlite":
+        migrate_json_to_sqlite(data_file, os.environ["DATABASE_FILE"])
+    elif backend == "sharded":
+        migrate_json_to_shards(data_file, os.environ["SHARD_DIR"])
+    return size
+
+def prepare_derived(models, standings, stats):
+    """Calcula classificações e totais de estatísticas de todas as competições e grava tudo."""
+    for competition in models.list_competitions():
+        competition = models.get_competition(competition.id)
+        if competition.format == "groups_knockout":
+            for group_id in competition.groups:
+                standings.calculate_standings(competition.id, group_id=group_id, save=False)
+        else:
+            standings.calculate_standings(competition.id, save=False)
+        stats.rebuild_competition_stats(competition)
+    models.save_data(full=True)
+
+def standings_targets(models):
+    """(competition_id, group_id) de cada classificação (group_id None nos pontos corridos)."""
+    targets = []
+    for summary in models.list_competitions():
+        competition = models.get_competition(summary.id)
+        if competition.format == "groups_knockout":
+            targets.extend((competition.id, group_id) for group_id in competition.groups)
+        else:
+            targets.append((competition.id, None))
+    return targets
+
+# --- Casos ---
+
+def build_cases(app):
+    """Lista de (nome, tipo, setup, chamada). Cada chamada recebe o número da iteração e percorre os alvos
+    (os casos "cached" repetem sempre o mesmo alvo, aquecido na primeira chamada)."""
+    from .. import models, standings, stats
+    from ..cache import view_cache, page_cache
+    from ..sumula import generate_sumula_pdf
+    from ..routes import APP_NAME
+
+    targets = standings_targets(models)
+    competition_ids = sorted({competition_id for competition_id, _ in targets})
+    finished = [m for m in sorted(models.data_storage["matches"].values(), key=lambda m: m.id) if m.status == "finished"]
+    client = app.test_client(use_cookies=False) # Sem cookies: mensagens flash não desviam do cache de páginas
+    def pick(items, i): return items[i % len(items)]
+
+    def drop_derived(i):
+        view_cache.invalidate()
+        page_cache.invalidate()
+        stats._boards.clear()
+
+    def direct_load(i):
+        models.load_data()
+
+    def direct_load_json(i):
+        enabled, models.DATA_SNAPSHOT = models.DATA_SNAPSHOT, False # Sempre decodifica o JSON
+        try:
+            models.load_data()
+        finally:
+            models.DATA_SNAPSHOT = enabled
+
+    def direct_save_full(i):
+        models.save_data(full=True)
+
+    def direct_save_one(i):
+        models.touch("matches", pick(finished, i).id)
+        models.save_data()
+
+    def direct_calculate_standings(i):
+        competition_id, group_id = pick(targets, i)
+        standings.calculate_standings(competition_id, group_id=group_id, save=False)
+
+    def direct_sort_standings(i):
+        competition_id, group_id = pick(targets, i)
+        competition = models.get_competition(competition_id)
+        table = models.get_group(group_id).standings if group_id else competition.standings
+        standings.sort_standings(table, competition_id, group_id)
+
+    def direct_calculate_stats(i):
+        stats.calculate_stats(pick(competition_ids, i))
+
+    def direct_sumula(i):
+        generate_sumula_pdf(pick(finished, i).id, APP_NAME)
+
+    def client_get(path_for):
+        def call(i):
+            response = client.get(path_for(i))
+            if response.status_code != 200:
+                raise RuntimeError(f"{path_for(i)} respondeu {response.status_code}")
+        return call
+
+    def client_record_result(i):
+        match = pick(finished, i)
+        form = {"score1": match.team1_score, "score2": match.team2_score, "match_date": match.date or "",
+                "event_count": len(match.events)}
+        for n, event in enumerate(match.events):
+            form.update({f"event_type_{n}": event.event_type, f"player_id_{n}": event.player_id, f"minute_{n}": event.minute or ""})
+        response = client.post(f"/match/{match.id}/record_result", data=form)
+        if response.status_code != 302:
+            raise RuntimeError(f"record_result da partida {match.id} respondeu {response.status_code}")
+
+    return [
+        ("load_data", "direct", None, direct_load),
+        ("load_data no snapshot", "direct", None, direct_load_json),
+        ("save_data full", "direct", None, direct_save_full),
+        ("save_data one match", "direct", None, direct_save_one),
+        ("calculate_standings", "direct", None, direct_calculate_standings),
+        ("sort_standings", "direct", None, direct_sort_standings),
+        ("calculate_stats cold", "direct", drop_derived, direct_calculate_stats),
+        ("generate_sumula_pdf", "direct", None, direct_sumula),
+        ("view_competition cold", "client", drop_derived, client_get(lambda i: f"/competition/{pick(competition_ids, i)}")),
+        ("view_competition cached", "client", None, client_get(lambda i: f"/competition/{competition_ids[0]}")),
+        ("api standings cold", "client", drop_derived, client_get(lambda i: f"/api/competition/{pick(competition_ids, i)}/standings")),
+        ("record_result", "client", None, client_record_result),
+        ("generate_sumula cached", "client", None, client_get(lambda i: f"/match/{finished[0].id}/generate_sumula")),
+    ]
+
+# --- Baseline ---
+
+def compare(results, baseline, tolerance, memory_tolerance, min_delta_ms):
+    """Casos que pioraram: [(caso, métrica, baseline, atual)]. Latência usa `tolerance` (fração) e ignora
+    diferenças abaixo de `min_delta_ms`; memória e bytes gravados usam `memory_tolerance`."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous: continue
+        for metric in ("p50_ms", "p95_ms"):
+            if current[metric] > previous[metric] * (1 + tolerance) and current[metric] - previous[metric] >= min_delta_ms:
+                regressions.append((name, metric, previous[metric], current[metric]))
+        for metric in ("peak_kib", "written_kib"):
+            if current.get(metric) is None or previous.get(metric) is None: continue
+            if current[metric] > previous[metric] * (1 + memory_tolerance) and current[metric] - previous[metric] >= 1:
+                regressions.append((name, metric, previous[metric], current[metric]))
+    return regressions
+
+def _load_baseline(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print(f"Aviso: baseline {path} não encontrado; nada a comparar.")
+    except json.JSONDecodeError as e:
+        print(f"Aviso: baseline {path} inválido ({e}); nada a comparar.")
+    return None
+
+# --- Relatório ---
+
+def print_report(results, kinds):
+    columns = ("caso", "tipo", "p50 ms", "p95 ms", "p99 ms", "máx ms", "pico KiB", "grav. KiB")
+    rows = [(name, kinds[name], r["p50_ms"], r["p95_ms"], r["p99_ms"], r["max_ms"], r["peak_kib"],
+             "-" if r["written_kib"] is None else r["written_kib"]) for name, r in results.items()]
+    widths = [max(len(str(value)) for value in column) for column in zip(columns, *rows)]
+    for row in (columns, *rows):
+        print("  ".join(str(value).ljust(width) if n < 2 else str(value).rjust(width)
+                        for n, (value, width) in enumerate(zip(row, widths))))
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m src.benchmarks", description="Benchmarks dos caminhos críticos.")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small", help="Preset de tamanho dos dados.")
+    for option in SIZES["small"]:
+        parser.add_argument(f"--{option.replace('_', '-')}", type=int, dest=option, help="Substitui o valor do preset.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=20, help="Chamadas medidas por caso.")
+    parser.add_argument("--backend", choices=("json", "sqlite", "journal", "sharded"), default="json")
+    parser.add_argument("--only", action="append", help="Executa só os casos cujo nome contém o texto (repetível).")
+    parser.add_argument("--output", help="Grava os resultados em JSON neste arquivo.")
+    parser.add_argument("--baseline", nargs="?", const=DEFAULT_BASELINE, help="Compara com o baseline (padrão: benchmarks/baseline.json).")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, help="Grava os resultados como baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Piora de latência aceita (fração; padrão 0.5).")
+    parser.add_argument("--memory-tolerance", type=float, default=0.2, help="Piora aceita de memória/bytes gravados.")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="Diferenças de latência menores são ignoradas.")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = dict(SIZES[args.size])
+    config.update({option: getattr(args, option) for option in SIZES["small"] if getattr(args, option) is not None})
+    config.update(seed=args.seed, backend=args.backend)
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as directory:
+        raw = generate_dataset(seed=args.seed, **{k: v for k, v in config.items() if k in SIZES["small"]})
+        size = prepare_environment(directory, raw, args.backend)
+        print(f"Dados: {len(raw['competitions'])} competições, {len(raw['teams'])} times, {len(raw['players'])} jogadores, "
+              f"{len(raw['matches'])} partidas, {raw['next_ids']['event'] - 1} eventos ({size / 1024:.0f} KiB, backend {args.backend}).")
+
+        from .. import create_app, models, standings, stats
+        app = create_app()
+        prepare_derived(models, standings, stats)
+
+        results, kinds = {}, {}
+        for name, kind, setup, call in build_cases(app):
+            if args.only and not any(text in name for text in args.only): continue
+            results[name] = measure(call, args.iterations, setup)
+            kinds[name] = kind
+        print_report(results, kinds)
+
+    document = {"format": BASELINE_FORMAT, "config": config, "results": results}
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"Resultados gravados em {path}.")
+
+    if not args.baseline: return 0
+    baseline = _load_baseline(args.baseline)
+    if baseline is None: return 0
+    if baseline.get("format") != BASELINE_FORMAT or baseline.get("config") != config:
+        print(f"Aviso: baseline {args.baseline} foi gerado com outra configuração ({baseline.get('config')}); nada a comparar.")
+        return 0
+    regressions = compare(results, baseline.get("results", {}), args.tolerance, args.memory_tolerance, args.min_delta_ms)
+    for name, metric, before, after in regressions:
+        print(f"REGRESSÃO: {name} {metric}: {before} -> {after}")
+    if not regressions: print("Nenhuma regressão em relação ao baseline.")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
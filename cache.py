@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Cache em memória de dados derivados (classificações ordenadas, estatísticas) por versão da competição."""
+
+import threading
+
+class VersionedCache:
+    """Guarda valores calculados por (competição, chave), válidos enquanto a versão da competição não mudar.
+
+    As rotas que alteram dados chamam `bump_version`, então leituras nunca precisam recalcular nem salvar.
+    """
+
+    def __init__(self):
+        self._entries = {} # (competition_id, key) -> (version, value)
+        self._lock = threading.Lock()
+        self._building = {} # cache_key -> (version, threading.Event) das construções em andamento (get_or_build_shared)
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, competition, key, builder):
+        """Retorna o valor em cache para a versão atual da competição ou o constrói com `builder()`."""
+        return self.get_or_build_versioned((competition.id, key), competition.version, builder)
+
+    def get_or_build_versioned(self, cache_key, version, builder):
+        """Como `get_or_build`, para chaves que não são de uma competição: `version` é qualquer valor comparável."""
+        entry = self._entries.get(cache_key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        value = builder()
+        with self._lock:
+            self._entries[cache_key] = (version, value)
+        return value
+
+    def get_or_build_shared(self, cache_key, version, builder):
+        """Como `get_or_build_versioned`, mas requisições simultâneas que não acharam o valor esperam a construção
+        em andamento em vez de repeti-la (para cálculos caros). `builder` não pode esperar por `models.data_lock`
+        nem pela mesma chave. Se a construção falhar, quem esperava constrói por conta própria."""
+        entry = self._entries.get(cache_key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+        with self._lock:
+            building = self._building.get(cache_key)
+            owner = building is None or building[0] != version
+            if owner:
+                building = self._building[cache_key] = (version, threading.Event())
+        if not owner:
+            building[1].wait()
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            return self.get_or_build_versioned(cache_key, version, builder)
+        try:
+            return self.get_or_build_versioned(cache_key, version, builder)
+        finally:
+            with self._lock:
+                if self._building.get(cache_key) is building:
+                    del self._building[cache_key]
+            building[1].set()
+
+    def invalidate(self, competition_id=None):
+        """Remove entradas de uma competição (ou todas)."""
+        with self._lock:
+            if competition_id is None:
+                self._entries.clear()
+            else:
+                for cache_key in [k for k in self._entries if k[0] == competition_id]:
+                    del self._entries[cache_key]
+
+view_cache = VersionedCache()
+page_cache = VersionedCache() # HTML renderizado das páginas (index e competição), só para requisições sem mensagens flash
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Comandos de linha de comando (flask --app src.main <comando>)."""
+
+import click
+from flask.cli import with_appcontext
+
+from .models import (save_data, begin_write, end_write, storage_backend, get_competition, list_competitions, write_data_snapshot,
+                     DATA_FILE, DATABASE_FILE, SHARD_DIR, DATA_SNAPSHOT, SNAPSHOT_FILE)
+from .standings import verify_standings
+from .stats import verify_competition_stats
+from .routes import APP_NAME
+from .sumula import export_matches, iter_sumulas_zip, render_merged_pdf
+from .importer import import_teams, iter_rows, detect_format, ImportFormatError
+from .storage import migrate_json_to_sqlite, migrate_json_to_shards, StorageError
+
+def _selected_competitions(competition_id):
+    """A competição informada ou todas (carregando uma por vez, no backend em shards)."""
+    ids = [competition_id] if competition_id else [summary.id for summary in list_competitions()]
+    return [competition for competition in map(get_competition, ids) if competition]
+
+@click.command("verify-standings")
+@click.option("--competition", "competition_id", type=int, default=None, help="Verifica apenas esta competição.")
+@click.option("--repair", is_flag=True, help="Substitui classificações divergentes pelo recálculo completo.")
+@with_appcontext
+def verify_standings_command(competition_id, repair):
+    """Compara as classificações incrementais com um recálculo completo."""
+    competitions = _selected_competitions(competition_id)
+    total = 0
+    for competition in competitions:
+        targets = competition.groups if competition.format == "groups_knockout" else [None]
+        for group_id in targets:
+            mismatched = verify_standings(competition.id, group_id=group_id, repair=repair)
+            if mismatched:
+                total += len(mismatched)
+                label = f"grupo {group_id}" if group_id else "geral"
+                click.echo(f"Competição {competition.id} ({label}): times divergentes {mismatched}" + (" - reparado" if repair else ""))
+    click.echo("Classificações consistentes." if not total else f"{total} linha(s) divergente(s).")
+
+@click.command("verify-stats")
+@click.option("--competition", "competition_id", type=int, default=None, help="Verifica apenas esta competição.")
+@click.option("--repair", is_flag=True, help="Substitui os totais divergentes pelo recálculo completo.")
+@with_appcontext
+def verify_stats_command(competition_id, repair):
+    """Compara os totais materializados (artilharia, cartões, goleiros) com um recálculo completo."""
+    competitions = _selected_competitions(competition_id)
+    total = 0
+    for competition in competitions:
+        players, teams = verify_competition_stats(competition.id, repair=repair)
+        if players or teams:
+            total += len(players) + len(teams)
+            click.echo(f"Competição {competition.id}: jogadores divergentes {players}, times divergentes {teams}" + (" - reparado" if repair else ""))
+    if repair:
+        save_data(wait=True)
+    click.echo("Estatísticas consistentes." if not total else f"{total} total(is) divergente(s).")
+
+@click.command("migrate-sqlite")
+@click.option("--source", default=DATA_FILE, show_default=True, help="Arquivo data.json de origem.")
+@click.option("--target", default=DATABASE_FILE, show_default=True, help="Banco SQLite de destino.")
+@click.option("--force", is_flag=True, help="Sobrescreve o banco de destino se já tiver dados.")
+def migrate_sqlite_command(source, target, force):
+    """Migra o data.json para o backend SQLite (use DATA_BACKEND=sqlite em seguida)."""
+    try:
+        counts = migrate_json_to_sqlite(source, target, force=force)
+    except StorageError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Migração concluída para {target}: " + ", ".join(f"{n} {kind}" for kind, n in counts.items()))
+
+@click.command("migrate-shards")
+@click.option("--source", default=DATA_FILE, show_default=True, help="Arquivo data.json de origem.")
+@click.option("--target", default=SHARD_DIR, show_default=True, help="Diretório dos shards de destino.")
+@click.option("--force", is_flag=True, help="Sobrescreve os shards de destino se já houver dados.")
+def migrate_shards_command(source, target, force):
+    """Divide o data.json em um shard por competição (use DATA_BACKEND=sharded em seguida)."""
+    try:
+        counts = migrate_json_to_shards(source, target, force=force)
+    except StorageError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Migração concluída para {target}: " + ", ".join(f"{n} {kind}" for kind, n in counts.items()))
+
+@click.command("compact-journal")
+def compact_journal_command():
+    """Incorpora o journal ao snapshot (apenas com DATA_BACKEND=journal)."""
+    if storage_backend.name != "journal":
+        raise click.ClickException("O backend configurado não usa journal (defina DATA_BACKEND=journal).")
+    storage_backend.compact(wait=True)
+    click.echo(f"Journal incorporado ao snapshot {storage_backend.path}.")
+
+@click.command("build-snapshot")
+def build_snapshot_command():
+    """Grava o snapshot binário do data.json (rodar no deploy: os workers iniciam sem decodificar o JSON)."""
+    if not DATA_SNAPSHOT or storage_backend.source_id() is None:
+        raise click.ClickException("Snapshot disponível apenas com DATA_BACKEND=json, DATA_SNAPSHOT=1 e o data.json existente.")
+    save_data(wait=True) # Grava alterações pendentes antes do snapshot
+    size = write_data_snapshot()
+    if size is None:
+        raise click.ClickException("Não foi possível gravar o snapshot (ver avisos acima).")
+    click.echo(f"Snapshot gravado em {SNAPSHOT_FILE} ({size / 1024:.0f} KiB).")
+
+@click.command("export-sumulas")
+@click.option("--competition", "competition_id", type=int, required=True, help="Competição das súmulas.")
+@click.option("--group", "group_id", type=int, default=None, help="Apenas as partidas deste grupo.")
+@click.option("--round", "round_number", type=int, default=None, help="Apenas as partidas desta rodada.")
+@click.option("--knockout-round", default=None, help='Apenas esta fase do mata-mata (ex.: "Semifinal").')
+@click.option("--format", "output_format", type=click.Choice(["zip", "pdf"]), default="zip", show_default=True)
+@click.option("--output", type=click.Path(dir_okay=False), required=True, help="Arquivo de saída.")
+@click.option("--workers", type=int, default=None, help="Processos para renderizar (padrão: SUMULA_EXPORT_WORKERS).")
+@with_appcontext
+def export_sumulas_command(competition_id, group_id, round_number, knockout_round, output_format, output, workers):
+    """Exporta as súmulas das partidas finalizadas em um ZIP ou em um único PDF."""
+    if not get_competition(competition_id):
+        raise click.ClickException(f"Competição {competition_id} não encontrada.")
+    match_ids = [m.id for m in export_matches(competition_id, group_id, round_number, knockout_round)]
+    if not match_ids:
+        raise click.ClickException("Nenhuma partida finalizada para exportar.")
+    with open(output, "wb") as f:
+        if output_format == "pdf":
+            f.write(render_merged_pdf(match_ids, APP_NAME))
+        else:
+            for chunk in iter_sumulas_zip(match_ids, APP_NAME, workers):
+                f.write(chunk)
+    click.echo(f"{len(match_ids)} súmula(s) exportada(s) para {output}.")
+
+@click.command("import-teams")
+@click.option("--competition", "competition_id", type=int, required=True, help="Competição que recebe os times.")
+@click.option("--format", "file_format", type=click.Choice(["csv", "json"]), default=None, help="Padrão: pela extensão do arquivo.")
+@click.option("--dry-run", is_flag=True, help="Apenas valida, sem gravar.")
+@click.argument("source", type=click.File("rb"))
+@with_appcontext
+def import_teams_command(competition_id, file_format, dry_run, source):
+    """Importa times e jogadores de um CSV (team,player) ou JSON, com uma única gravação."""
+    file_format = file_format or detect_format(source.name)
+    if not file_format:
+        raise click.ClickException("Formato não reconhecido: use --format csv ou --format json.")
+    begin_write() # Com MULTI_WORKER, não concorre com gravações dos workers
+    try:
+        competition = get_competition(competition_id)
+        if not competition:
+            raise click.ClickException(f"Competição {competition_id} não encontrada.")
+        report = import_teams(competition, iter_rows(source, file_format), dry_run=dry_run)
+        if not dry_run: save_data(wait=True)
+    except ImportFormatError as e:
+        raise click.ClickException(str(e))
+    finally:
+        end_write()
+    for line, message in report.errors:
+        click.echo(f"Linha {line}: {message}", err=True)
+    action = "Validados" if dry_run else "Importados"
+    click.echo(f"{action}: {report.teams_created} time(s) e {report.players_created} jogador(es); {len(report.errors)} linha(s) com erro.")
+
+def register_commands(app):
+    """Registra os comandos no CLI do Flask."""
+    app.cli.add_command(verify_standings_command)
+    app.cli.add_command(verify_stats_command)
+    app.cli.add_command(migrate_sqlite_command)
+    app.cli.add_command(migrate_shards_command)
+    app.cli.add_command(compact_journal_command)
+    app.cli.add_command(build_snapshot_command)
+    app.cli.add_command(export_sumulas_command)
+    app.cli.add_command(import_teams_command)
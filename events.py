@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Armazenamento compacto (colunar) dos eventos de uma partida.
+
+Cada partida guarda seus eventos em arrays tipados (id, jogador, tipo, minuto e lado do time) em vez
+de uma lista de objetos. O acesso continua pela API de `MatchEvent` (iteração, índice, `len`), com os
+objetos criados sob demanda; `match_id` e `team_id` são derivados da própria partida.
+"""
+
+from array import array
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass(slots=True)
+class MatchEvent:
+    id: int
+    match_id: int
+    team_id: int
+    player_id: int
+    event_type: str # "goal", "yellow_card", "red_card"
+    minute: Optional[str] = None
+
+EVENT_TYPES = ("goal", "yellow_card", "red_card") # Código do tipo = posição na tupla
+_TYPE_CODES = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+_IRREGULAR = 255 # Tipo/lado fora do padrão: valor original em `_extra`
+_MINUTE_IRREGULAR = -1 # Minuto vazio ou não numérico ("45+2"): valor original em `_extra`
+_MAX_MINUTE = 32767
+_SIDE_NONE, _SIDE_TEAM1, _SIDE_TEAM2 = 0, 1, 2
+
+class EventList:
+    """Lista de eventos de uma partida em colunas `array`; os arrays só são criados no primeiro evento."""
+
+    __slots__ = ("_match", "_ids", "_players", "_types", "_minutes", "_sides", "_extra")
+
+    def __init__(self, match, events=()):
+        self._match = match
+        self.clear()
+        self.extend(events)
+
+    def clear(self):
+        self._ids = self._players = self._types = self._minutes = self._sides = None
+        self._extra = None # posição -> {campo: valor original} para valores que não cabem nas colunas
+
+    def _columns(self):
+        if self._ids is None:
+            self._ids, self._players = array("q"), array("q")
+            self._types, self._minutes, self._sides = array("B"), array("h"), array("B")
+
+    def _set_extra(self, position, name, value):
+        if self._extra is None: self._extra = {}
+        self._extra.setdefault(position, {})[name] = value
+
+    def append(self, event):
+        """Adiciona um evento (MatchEvent ou dict no formato do data.json)."""
+        if isinstance(event, dict): event = MatchEvent(**event)
+        self._columns()
+        position = len(self._ids)
+        self._ids.append(event.id)
+        self._players.append(event.player_id)
+
+        code = _TYPE_CODES.get(event.event_type, _IRREGULAR)
+        if code == _IRREGULAR: self._set_extra(position, "event_type", event.event_type)
+        self._types.append(code)
+
+        minute = event.minute
+        if isinstance(minute, str) and minute.isdigit() and str(int(minute)) == minute and int(minute) <= _MAX_MINUTE:
+            self._minutes.append(int(minute))
+        else:
+            self._minutes.append(_MINUTE_IRREGULAR)
+            self._set_extra(position, "minute", minute)
+
+        match = self._match
+        if event.team_id is None: side = _SIDE_NONE
+        elif event.team_id == match.team1_id: side = _SIDE_TEAM1
+        elif event.team_id == match.team2_id: side = _SIDE_TEAM2
+        else:
+            side = _IRREGULAR
+            self._set_extra(position, "team_id", event.team_id)
+        self._sides.append(side)
+
+    def extend(self, events):
+        for event in events:
+            self.append(event)
+
+    def __len__(self):
+        return len(self._ids) if self._ids is not None else 0
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if self._ids is None: raise IndexError("índice de evento fora do intervalo")
+        if position < 0: position += len(self._ids)
+        extra = self._extra.get(position, {}) if self._extra and position >= 0 else {}
+        match = self._match
+        code = self._types[position]
+        side = self._sides[position]
+        minute = self._minutes[position]
+        return MatchEvent(
+            id=self._ids[position],
+            match_id=match.id,
+            team_id=match.team1_id if side == _SIDE_TEAM1 else match.team2_id if side == _SIDE_TEAM2 else extra.get("team_id"),
+            player_id=self._players[position],
+            event_type=EVENT_TYPES[code] if code != _IRREGULAR else extra["event_type"],
+            minute=str(minute) if minute != _MINUTE_IRREGULAR else extra["minute"],
+        )
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def __eq__(self, other):
+        if isinstance(other, EventList): other = list(other)
+        return list(self) == other if isinstance(other, list) else NotImplemented
+
+    def __repr__(self):
+        return f"EventList({list(self)!r})"
+
+    def to_dicts(self):
+        """Eventos no formato do data.json (lista de dicts)."""
+        return [{"id": e.id, "match_id": e.match_id, "team_id": e.team_id, "player_id": e.player_id,
+                 "event_type": e.event_type, "minute": e.minute} for e in self]
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Conjunto ordenado de ids usado nas listas de ids das entidades (times, partidas, jogadores).
+
+Como nos índices secundários (indexes.py), um dict sem valores guarda os ids na ordem de inserção:
+`in`, inclusão e remoção custam O(1), e a iteração mantém a ordem das antigas listas. No data.json o
+conjunto continua sendo uma lista (`to_list`), então os arquivos existentes não mudam.
+"""
+
+class OrderedIdSet:
+    """Ids únicos na ordem de inserção, com a API de lista usada pelo código (append/extend/remove)."""
+
+    __slots__ = ("_ids",)
+
+    def __init__(self, ids=()):
+        self._ids = dict.fromkeys(ids)
+
+    def add(self, entity_id):
+        self._ids[entity_id] = None
+
+    append = add # Compatível com o uso como lista
+
+    def extend(self, ids):
+        self._ids.update(dict.fromkeys(ids))
+
+    update = extend
+
+    def remove(self, entity_id):
+        """Remove o id; ValueError se não existir (como `list.remove`)."""
+        if self._ids.pop(entity_id, _MISSING) is _MISSING:
+            raise ValueError(f"id {entity_id} não está no conjunto")
+
+    def discard(self, entity_id):
+        self._ids.pop(entity_id, None)
+
+    def difference_update(self, ids):
+        """Remoção em lote: custo proporcional a `ids`, não ao tamanho do conjunto."""
+        pop = self._ids.pop
+        for entity_id in ids:
+            pop(entity_id, None)
+
+    def clear(self):
+        self._ids.clear()
+
+    def copy(self):
+        return OrderedIdSet(self._ids)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy() # Ids são imutáveis
+
+    def __contains__(self, entity_id):
+        return entity_id in self._ids
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __reversed__(self):
+        return reversed(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, position):
+        """Acesso por posição (O(n)); prefira iterar."""
+        return list(self._ids)[position]
+
+    def __eq__(self, other):
+        if isinstance(other, OrderedIdSet): return list(self._ids) == list(other._ids)
+        return list(self._ids) == list(other) if isinstance(other, (list, tuple)) else NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"OrderedIdSet({list(self._ids)!r})"
+
+    def to_list(self):
+        """Formato do data.json."""
+        return list(self._ids)
+
+_MISSING = object()
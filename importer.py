@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""Importação em lote de times e jogadores (CSV ou JSON) para uma competição.
+
+O arquivo é lido e validado em uma passada (o CSV linha a linha, sem carregar tudo), os IDs são
+reservados em bloco e tudo é gravado com um único `save_data()`. Linhas inválidas são ignoradas e
+relatadas com o número da linha; importar de novo o mesmo arquivo não duplica times nem jogadores.
+
+Formatos aceitos:
+*   CSV com cabeçalho `team,player` (ou `time,jogador`); linha sem jogador cria só o time. Separado por vírgula
+    ou ponto e vírgula, em UTF-8 ou, linha a linha, cp1252 (CSV exportado pelo Excel em pt-BR).
+*   JSON: `[{"team": "Nome", "players": ["Jogador", ...]}, ...]` (ou `{"teams": [...]}`; aceita `name`/`time`).
+"""
+
+import codecs
+import csv
+import itertools
+import json
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+from .models import (
+    Team, Player, data_storage, reserve_ids, insert_player, touch, bump_version, save_data,
+    get_competition_teams, get_team_players
+)
+
+MAX_NAME_LENGTH = 100
+TEAM_COLUMNS = ("team", "time")
+PLAYER_COLUMNS = ("player", "jogador")
+CSV_FALLBACK_ENCODING = "cp1252" # Linhas que não são UTF-8 válido
+CSV_DELIMITERS = ",;"
+
+class ImportFormatError(ValueError):
+    """Arquivo que não pode ser lido no formato informado (cabeçalho ou JSON inválido)."""
+
+@dataclass(slots=True)
+class ImportReport:
+    teams_created: int = 0
+    players_created: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list) # (linha/item, mensagem)
+
+# --- Leitura ---
+
+def _pick(row, columns):
+    for column in columns:
+        if row.get(column) is not None:
+            return row[column]
+    return None
+
+def _decode_lines(stream):
+    """Linhas de um CSV em bytes como texto: UTF-8 (com ou sem BOM), ou cp1252 (planilhas do Excel)."""
+    for number, line in enumerate(stream, 1):
+        if number == 1 and line.startswith(codecs.BOM_UTF8): line = line[len(codecs.BOM_UTF8):]
+        try:
+            yield line.decode("utf-8")
+        except UnicodeDecodeError:
+            try:
+                yield line.decode(CSV_FALLBACK_ENCODING)
+            except UnicodeDecodeError:
+                raise ImportFormatError(f"Linha {number}: codificação não reconhecida (salve o CSV em UTF-8).")
+
+def iter_csv_rows(stream):
+    """(linha, time, jogador) de um CSV em bytes ou texto, lido linha a linha."""
+    lines = _decode_lines(stream) if not isinstance(stream.read(0), str) else iter(stream)
+    first_line = next(lines, "")
+    try: # Excel em pt-BR grava com ';'; do Sniffer só vale o separador (aspas seguem o padrão do Excel)
+        delimiter = csv.Sniffer().sniff(first_line, CSV_DELIMITERS).delimiter
+    except csv.Error: # Uma coluna só
+        delimiter = ","
+    reader = csv.DictReader(itertools.chain((first_line,), lines), delimiter=delimiter)
+    header = [name.strip().lower() for name in reader.fieldnames or ()]
+    if not any(name in header for name in TEAM_COLUMNS):
+        raise ImportFormatError("Cabeçalho do CSV precisa da coluna 'team' (ou 'time').")
+    reader.fieldnames = header
+    for row in reader:
+        yield reader.line_num, _pick(row, TEAM_COLUMNS), _pick(row, PLAYER_COLUMNS)
+
+def iter_json_rows(stream):
+    """(item, time, jogador) de um JSON de times com lista de jogadores."""
+    try:
+        data = json.load(stream)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ImportFormatError(f"JSON inválido: {e}")
+    if isinstance(data, dict): data = data.get("teams")
+    if not isinstance(data, list):
+        raise ImportFormatError("JSON precisa ser uma lista de times (ou um objeto com a chave 'teams').")
+    for position, item in enumerate(data, 1):
+        if not isinstance(item, dict):
+            yield position, None, None
+            continue
+        team_name = item.get("team", item.get("name", item.get("time")))
+        players = item.get("players", item.get("jogadores")) or []
+        if not isinstance(players, list):
+            yield position, team_name, players # Valida (e rejeita) como jogador inválido
+            continue
+        if not players:
+            yield position, team_name, None
+        for player_name in players:
+            yield position, team_name, player_name
+
+def iter_rows(stream, file_format):
+    if file_format == "csv": return iter_csv_rows(stream)
+    if file_format == "json": return iter_json_rows(stream)
+    raise ImportFormatError(f"Formato desconhecido: {file_format} (use csv ou json).")
+
+def detect_format(filename):
+    """Formato pela extensão do arquivo (None se não reconhecida)."""
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    return extension if extension in ("csv", "json") else None
+
+# --- Validação e Gravação ---
+
+def _clean_name(value):
+    if not isinstance(value, str): return None
+    value = " ".join(value.split())
+    return value if 0 < len(value) <= MAX_NAME_LENGTH else None
+
+def import_teams(competition, rows, dry_run=False):
+    """Valida as linhas (time, jogador) e cria os times/jogadores novos da competição de uma vez.
+
+    Times existentes (mesmo nome, sem diferenciar maiúsculas) recebem os jogadores; jogadores já
+    cadastrados no time são ignorados com erro. Times novos só podem ser criados no planejamento.
+    Com `dry_run=True` apenas valida. Retorna um ImportReport (o chamador não precisa salvar).
+    """
+    report = ImportReport()
+    teams_by_key = {team.name.casefold(): team for team in get_competition_teams(competition.id)}
+    existing_players = {} # chave do time -> {nome do jogador}
+    new_teams = {} # chave -> nome (ordem do arquivo)
+    new_players = [] # (chave do time, nome do jogador)
+
+    for line, raw_team, raw_player in rows:
+        team_name = _clean_name(raw_team)
+        if team_name is None:
+            report.errors.append((line, "Nome do time vazio ou inválido."))
+            continue
+        key = team_name.casefold()
+        if key not in teams_by_key and key not in new_teams:
+            if competition.status != "planning":
+                report.errors.append((line, f"Time '{team_name}' não existe e a competição já começou."))
+                continue
+            new_teams[key] = team_name
+        if raw_player is None or raw_player == "":
+            continue # Linha só com o time
+        player_name = _clean_name(raw_player)
+        if player_name is None:
+            report.errors.append((line, f"Nome de jogador inválido no time '{team_name}'."))
+            continue
+        if key not in existing_players:
+            team = teams_by_key.get(key)
+            existing_players[key] = {p.name.casefold() for p in get_team_players(team.id)} if team else set()
+        if player_name.casefold() in existing_players[key]:
+            report.errors.append((line, f"Jogador '{player_name}' já cadastrado no time '{team_name}'."))
+            continue
+        existing_players[key].add(player_name.casefold())
+        new_players.append((key, player_name))
+
+    report.teams_created = len(new_teams)
+    report.players_created = len(new_players)
+    if dry_run or (not new_teams and not new_players):
+        return report
+
+    for team_id, (key, name) in zip(reserve_ids("team", len(new_teams)), new_teams.items()):
+        team = Team(id=team_id, name=name, competition_id=competition.id)
+        data_storage["teams"][team_id] = team
+        competition.teams.append(team_id)
+        teams_by_key[key] = team
+        touch("teams", team_id)
+    for player_id, (key, name) in zip(reserve_ids("player", len(new_players)), new_players):
+        team = teams_by_key[key]
+        insert_player(Player(id=player_id, name=name, team_id=team.id))
+        team.players.append(player_id)
+        touch("teams", team.id)
+    bump_version(competition)
+    save_data() # Uma gravação para o lote inteiro
+    return report
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Índices secundários em memória sobre o data_storage (partidas, eventos e jogadores).
+
+Cada índice mapeia uma chave para um dict usado como conjunto ordenado (ordem de inserção), então as
+consultas custam O(tamanho do resultado). Os índices são atualizados pelas funções de alteração de
+models.py (insert_match, update_match, delete_match/delete_matches, insert_player) e reconstruídos ao carregar/recarregar.
+"""
+
+from collections import defaultdict
+
+class DataIndexes:
+    """Índices de partidas (por competição, grupo, rodada, fase, time e status), eventos (por jogador e
+    time) e jogadores (por time)."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.matches_by_competition = defaultdict(dict) # competition_id -> {match_id: None}
+        self.matches_by_group = defaultdict(dict) # group_id -> {match_id: None}
+        self.matches_by_round = defaultdict(dict) # (competition_id, round_number) -> {match_id: None}
+        self.matches_by_knockout_round = defaultdict(dict) # (competition_id, knockout_round) -> {match_id: None}
+        self.matches_by_team = defaultdict(dict) # team_id -> {match_id: None}
+        self.matches_by_status = defaultdict(dict) # (competition_id, status) -> {match_id: None}
+        self.events_by_player = defaultdict(dict) # player_id -> {(match_id, posição do evento): None}
+        self.events_by_team = defaultdict(dict) # team_id -> {(match_id, posição do evento): None}
+        self.players_by_team = defaultdict(dict) # team_id -> {player_id: None}
+        self._match_keys = {} # match_id -> [(índice, chave, item)] indexados para a partida
+        self._player_team = {} # player_id -> team_id indexado
+
+    def rebuild(self, storage):
+        """Reconstrói todos os índices a partir do data_storage."""
+        self.clear()
+        for match in storage["matches"].values():
+            self.index_match(match)
+        for player in storage["players"].values():
+            self.index_player(player)
+
+    # --- Partidas e Eventos ---
+
+    @staticmethod
+    def _match_entries(match):
+        match_id = match.id
+        entries = [("matches_by_competition", match.competition_id, match_id),
+                   ("matches_by_status", (match.competition_id, match.status), match_id)]
+        if match.group_id is not None:
+            entries.append(("matches_by_group", match.group_id, match_id))
+        if match.round_number is not None:
+            entries.append(("matches_by_round", (match.competition_id, match.round_number), match_id))
+        if match.knockout_round is not None:
+            entries.append(("matches_by_knockout_round", (match.competition_id, match.knockout_round), match_id))
+        for team_id in (match.team1_id, match.team2_id):
+            if team_id is not None:
+                entries.append(("matches_by_team", team_id, match_id))
+        for position, event in enumerate(match.events):
+            entries.append(("events_by_player", event.player_id, (match_id, position)))
+            if event.team_id is not None:
+                entries.append(("events_by_team", event.team_id, (match_id, position)))
+        return entries
+
+    def index_match(self, match):
+        """Indexa (ou reindexa, após alterações) uma partida e seus eventos."""
+        self.unindex_match(match.id)
+        entries = self._match_entries(match)
+        for index_name, key, item in entries:
+            getattr(self, index_name)[key][item] = None
+        self._match_keys[match.id] = entries
+
+    def unindex_match(self, match_id):
+        """Remove a partida e seus eventos de todos os índices."""
+        for index_name, key, item in self._match_keys.pop(match_id, ()):
+            index = getattr(self, index_name)
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(item, None)
+                if not bucket:
+                    del index[key]
+
+    # --- Jogadores ---
+
+    def index_player(self, player):
+        self.unindex_player(player.id)
+        if player.team_id is not None:
+            self.players_by_team[player.team_id][player.id] = None
+            self._player_team[player.id] = player.team_id
+
+    def unindex_player(self, player_id):
+        team_id = self._player_team.pop(player_id, None)
+        if team_id is not None:
+            bucket = self.players_by_team.get(team_id)
+            if bucket is not None:
+                bucket.pop(player_id, None)
+                if not bucket:
+                    del self.players_by_team[team_id]
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Chaveamento do mata-mata como árvore de partidas.
+
+Todas as partidas de todas as fases são criadas de uma vez ao configurar o mata-mata; as das fases
+seguintes nascem sem times. Cada partida aponta para a partida seguinte (`next_match_id`) e para a vaga
+que seu vencedor ocupa nela (`next_slot`: 1 = time 1, 2 = time 2), então registrar um resultado avança
+o vencedor em O(1). `KnockoutStage.bracket` guarda a árvore por nível, pronta para exibição.
+"""
+
+from .models import (
+    Match, KnockoutStage, reserve_ids, insert_match, update_match, get_match, get_team
+)
+
+ROUND_NAMES = {32: "16 avos", 16: "Oitavas", 8: "Quartas", 4: "Semifinal", 2: "Final"} # Times na fase -> nome
+QUALIFY_PER_GROUP = 2 # Classificados de cada grupo para o mata-mata
+
+def create_bracket(competition, team_ids):
+    """Cria a árvore completa do mata-mata para os times (na ordem do chaveamento; potência de 2).
+
+    Retorna o novo KnockoutStage; a primeira fase já tem os confrontos, as demais aguardam os vencedores.
+    """
+    stage = KnockoutStage(competition_id=competition.id, bracket=[])
+    sizes = []
+    teams_in_round = len(team_ids)
+    while teams_in_round >= 2:
+        sizes.append(teams_in_round // 2)
+        teams_in_round //= 2
+    all_ids = iter(reserve_ids("match", sum(sizes)))
+
+    level_ids = [[next(all_ids) for _ in range(size)] for size in sizes]
+    for level, match_ids in enumerate(level_ids):
+        round_name = ROUND_NAMES.get(len(match_ids) * 2, "Fase Desconhecida")
+        next_ids = level_ids[level + 1] if level + 1 < len(level_ids) else None
+        for position, match_id in enumerate(match_ids):
+            team1_id, team2_id = (team_ids[2 * position], team_ids[2 * position + 1]) if level == 0 else (None, None)
+            insert_match(Match(id=match_id, competition_id=competition.id, team1_id=team1_id, team2_id=team2_id,
+                               knockout_round=round_name,
+                               next_match_id=next_ids[position // 2] if next_ids else None,
+                               next_slot=position % 2 + 1 if next_ids else None))
+        stage.rounds[round_name] = list(match_ids)
+        stage.bracket.append(list(match_ids))
+        competition.matches.extend(match_ids)
+    return stage
+
+def match_winner(match):
+    """Vencedor de uma partida finalizada (pênaltis decidem empates); None se indefinido."""
+    if match.status != "finished" or match.team1_score is None or match.team2_score is None: return None
+    if match.team1_score != match.team2_score:
+        return match.team1_id if match.team1_score > match.team2_score else match.team2_id
+    if match.team1_penalties is None or match.team2_penalties is None or match.team1_penalties == match.team2_penalties:
+        return None
+    return match.team1_id if match.team1_penalties > match.team2_penalties else match.team2_id
+
+def advance_winner(match):
+    """Coloca o vencedor da partida na vaga dela na partida seguinte (ou esvazia a vaga se indefinido).
+
+    Retorna a partida seguinte alterada, ou None se nada mudou. Não altera uma partida seguinte já
+    finalizada com outro time: registra um aviso e retorna None.
+    """
+    if match.next_match_id is None: return None
+    following = get_match(match.next_match_id)
+    if not following:
+        print(f"Aviso: Partida seguinte {match.next_match_id} da partida {match.id} não encontrada.")
+        return None
+    winner = match_winner(match)
+    slot = "team1_id" if match.next_slot == 1 else "team2_id"
+    if getattr(following, slot) == winner: return None
+    if following.status == "finished":
+        print(f"Aviso: Partida {following.id} já finalizada; vencedor da partida {match.id} não foi alterado nela.")
+        return None
+    setattr(following, slot, winner)
+    update_match(following) # Reindexa por time e marca para gravação
+    return following
+
+def bracket_rounds(competition):
+    """Árvore do mata-mata para exibição: [(nome da fase, [(partida, time1, time2), ...]), ...]."""
+    stage = competition.knockout_stage
+    if not stage: return []
+    levels = stage.bracket or list(stage.rounds.values()) # Chaveamentos antigos não têm a árvore
+    names = {match_id: name for name, match_ids in stage.rounds.items() for match_id in match_ids}
+    rounds = []
+    for match_ids in levels:
+        matches = [m for m in (get_match(match_id) for match_id in match_ids) if m]
+        if not matches: continue
+        rounds.append((names.get(matches[0].id, matches[0].knockout_round),
+                       [(m, get_team(m.team1_id) if m.team1_id else None, get_team(m.team2_id) if m.team2_id else None)
+                        for m in matches]))
+    return rounds
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Atualizações ao vivo (Server-Sent Events) por competição.
+
+Cada competição tem um canal com os últimos eventos publicados (numerados) e uma `Condition`. Publicar
+serializa o evento uma única vez e acorda os assinantes; assinantes ociosos apenas esperam na
+`Condition`, sem fila própria nem trabalho a cada publicação. O id de cada evento permite retomar do
+ponto certo após reconexão (`Last-Event-ID`).
+
+Cada conexão aberta ocupa uma thread do worker (gthread): `LIVE_MAX_SUBSCRIBERS` limita as conexões por
+worker bem abaixo do número de threads, e as excedentes recebem 503 com `Retry-After`. Assim os streams
+nunca tomam todas as threads e as páginas e gravações continuam sendo atendidas.
+
+Com MULTI_WORKER, quem registrou o resultado pode estar em outro worker: a cada intervalo de keepalive
+o canal confere a versão da competição e, se mudou sem evento local, publica um evento `version`
+para o cliente buscar os dados pela API.
+"""
+
+import json
+import os
+import threading
+from collections import deque
+
+from .models import get_competition, get_player, refresh_data, MULTI_WORKER
+from .serializers import match_json, standings_json
+from .stats import player_stats_row
+
+LIVE_BACKLOG = int(os.environ.get("LIVE_BACKLOG", "50")) # Eventos guardados por competição (retomada)
+LIVE_KEEPALIVE = float(os.environ.get("LIVE_KEEPALIVE", "15")) # Segundos entre comentários de keepalive
+WEB_THREADS = int(os.environ.get("WEB_THREADS", "64")) # Threads por worker (mesma variável do Procfile)
+LIVE_MAX_SUBSCRIBERS = int(os.environ.get("LIVE_MAX_SUBSCRIBERS", max(WEB_THREADS // 2, 1))) # Streams por worker
+LIVE_RETRY_AFTER = int(os.environ.get("LIVE_RETRY_AFTER", "30")) # Segundos sugeridos ao recusar por limite
+
+class LiveChannel:
+    """Eventos recentes de uma competição e a Condition em que os assinantes esperam."""
+
+    def __init__(self, version=None):
+        self.condition = threading.Condition()
+        self.backlog = deque(maxlen=LIVE_BACKLOG) # (seq, mensagem SSE já formatada)
+        self.seq = 0
+        self.subscribers = 0
+        self.version = version # Última versão da competição anunciada
+
+    def publish(self, event, data):
+        with self.condition:
+            self.seq += 1
+            payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+            self.backlog.append((self.seq, f"id: {self.seq}\nevent: {event}\ndata: {payload}\n\n"))
+            if "version" in data: self.version = data["version"]
+            self.condition.notify_all()
+
+    def messages_after(self, seq):
+        return [message for message_seq, message in self.backlog if message_seq > seq]
+
+class LiveHub:
+    """Canais por competição (criados na primeira assinatura)."""
+
+    def __init__(self):
+        self._channels = {} # competition_id -> LiveChannel
+        self._lock = threading.Lock()
+        self.active = 0 # Conexões abertas neste worker (todas as competições)
+
+    def try_subscribe(self):
+        """Reserva uma vaga de stream; False se o worker já está no limite (responder 503).
+
+        Chamar antes de criar a resposta e liberar com `unsubscribe` quando ela for fechada.
+        """
+        with self._lock:
+            if self.active >= LIVE_MAX_SUBSCRIBERS: return False
+            self.active += 1
+            return True
+
+    def unsubscribe(self):
+        with self._lock:
+            self.active -= 1
+
+    def has_subscribers(self, competition_id):
+        channel = self._channels.get(competition_id)
+        return bool(channel and channel.subscribers)
+
+    def publish(self, competition_id, event, data):
+        """Envia um evento aos assinantes da competição (nada acontece se não houver canal)."""
+        channel = self._channels.get(competition_id)
+        if channel: channel.publish(event, data)
+
+    def _channel(self, competition_id, version):
+        with self._lock:
+            channel = self._channels.get(competition_id)
+            if channel is None:
+                channel = self._channels[competition_id] = LiveChannel(version)
+            return channel
+
+    def stream(self, competition_id, version, last_event_id=0):
+        """Gerador de mensagens SSE para um assinante; termina quando o cliente desconecta."""
+        channel = self._channel(competition_id, version)
+        with channel.condition:
+            channel.subscribers += 1
+            seq = last_event_id if 0 < last_event_id <= channel.seq else channel.seq
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                with channel.condition:
+                    if channel.seq == seq:
+                        channel.condition.wait(LIVE_KEEPALIVE)
+                    messages = channel.messages_after(seq)
+                    seq = channel.seq
+                if messages:
+                    yield "".join(messages)
+                    continue
+                yield ": keepalive\n\n"
+                if MULTI_WORKER: _check_version(channel, competition_id)
+        finally:
+            with channel.condition:
+                channel.subscribers -= 1
+
+live_hub = LiveHub()
+
+def _check_version(channel, competition_id):
+    """Anuncia alterações feitas por outros workers (a competição mudou sem evento neste processo)."""
+    refresh_data()
+    competition = get_competition(competition_id)
+    if competition and competition.version != channel.version:
+        channel.publish("version", {"competition_id": competition_id, "version": competition.version})
+
+def publish_result(competition, match, sorted_standings, previous_order, player_ids):
+    """Publica o diff de um resultado registrado: a partida, as linhas da classificação dos dois times e
+    das que mudaram de posição (`previous_order`: team_ids na ordem anterior) e os jogadores com eventos
+    na partida (antes ou depois da edição)."""
+    previous_positions = {team_id: position for position, team_id in enumerate(previous_order or (), 1)}
+    changed = {match.team1_id, match.team2_id}
+    changed.update(s.team_id for position, s in enumerate(sorted_standings or (), 1)
+                   if previous_positions.get(s.team_id) != position)
+    live_hub.publish(competition.id, "result", {
+        "competition_id": competition.id,
+        "version": competition.version,
+        "match": match_json(match),
+        "group_id": match.group_id,
+        "standings": standings_json(sorted_standings, changed) if sorted_standings else [],
+        "players": [{"player_id": player_id, **player_stats_row(player_id, competition.id)}
+                    for player_id in sorted(player_ids) if get_player(player_id)],
+    })
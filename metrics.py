@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""Métricas de desempenho no formato de texto do Prometheus (`/metrics`) e cabeçalho `Server-Timing`.
+
+Contadores e histogramas ficam em memória em cada processo (com vários workers do gunicorn, cada um
+expõe os próprios números: o Prometheus deve coletar cada worker ou somar as séries). Valores que já
+existem em outros módulos (acertos de cache, bytes gravados, gravações agrupadas) são lidos apenas na
+coleta, sem custo nas requisições.
+
+Com SERVER_TIMING=1 cada resposta leva `Server-Timing` com o tempo total e as etapas medidas durante a
+requisição (templates, classificação, carga/serialização/gravação dos dados, PDF), visível no DevTools.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request, abort, before_render_template, template_rendered
+
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN") # Se definido, /metrics exige "Authorization: Bearer <token>"
+STARTUP_REPORT = os.environ.get("STARTUP_REPORT", "0") == "1" # Imprime o tempo de inicialização de cada processo
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0) # Segundos
+
+# --- Tipos de Métrica ---
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labelnames, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra: pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Contador monotônico com rótulos."""
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {} if labelnames else {(): 0} # valores dos rótulos -> total
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def lines(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in sorted(values)]
+
+class Histogram:
+    """Histograma com buckets fixos (em segundos) e rótulos."""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {} # valores dos rótulos -> [contagens por bucket (+Inf no fim), soma]
+        self._lock = threading.Lock()
+        if not labelnames: self._values[()] = [[0] * (len(self.buckets) + 1), 0.0] # Série exposta desde o início
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][position] += 1
+            entry[1] += value
+
+    def lines(self):
+        with self._lock:
+            values = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in sorted(values):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                bucket = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, bucket)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total:.6f}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = [] # Funções chamadas na coleta: [(nome, tipo, descrição, [(rótulos, valor)])]
+
+    def counter(self, *args, **kwargs):
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs):
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        out = []
+        for metric in self._metrics:
+            out += [f"# HELP {metric.name} {metric.documentation}", f"# TYPE {metric.name} {metric.kind}", *metric.lines()]
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e: # Uma fonte com problema não derruba a coleta inteira
+                print(f"Aviso: falha ao coletar métricas de {collector.__name__}: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                out += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+                out += [f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {value}" for labels, value in samples]
+        return "\n".join(out) + "\n"
+
+registry = Registry()
+
+# --- Métricas da Aplicação ---
+
+REQUEST_SECONDS = registry.histogram("http_request_duration_seconds", "Duração das requisições por rota.",
+                                     ("endpoint", "method", "status"))
+TEMPLATE_SECONDS = registry.histogram("template_render_seconds", "Tempo de renderização dos templates Jinja.", ("template",))
+PERSISTENCE_SECONDS = registry.histogram("persistence_duration_seconds",
+                                         "Carga e gravação dos dados (load, load_shard, refresh, serialize, write).",
+                                         ("operation", "backend"))
+STANDINGS_SECONDS = registry.histogram("standings_duration_seconds", "Recálculo completo e ordenação de classificações.", ("operation",))
+STANDINGS_RECOMPUTES = registry.counter("standings_recomputes_total", "Recálculos completos de classificação (modo de reparo).")
+STANDINGS_DELTAS = registry.counter("standings_deltas_total", "Resultados aplicados à classificação de forma incremental.")
+STATS_REBUILDS = registry.counter("stats_rebuilds_total", "Recálculos completos das estatísticas de uma competição.")
+SUMULA_RENDER_SECONDS = registry.histogram("sumula_render_seconds", "Geração de súmulas em PDF (sem cache).")
+
+@contextmanager
+def timed(histogram, timing=None, **labels):
+    """Mede o bloco no histograma e, com SERVER_TIMING, soma a duração à etapa `timing` da requisição atual."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram.observe(elapsed, **labels)
+        if timing and SERVER_TIMING and has_request_context():
+            add_timing(timing, elapsed)
+
+def add_timing(name, seconds):
+    timings = g.setdefault("server_timings", {})
+    timings[name] = timings.get(name, 0.0) + seconds
+
+# --- Inicialização ---
+
+startup_phases = {} # etapa -> segundos ("data", "indexes", "create_app"), uma vez por processo
+startup_info = {} # Detalhes do relatório ("data_source": "snapshot" ou o nome do backend)
+
+@contextmanager
+def startup_phase(name):
+    """Mede uma etapa da inicialização do processo (relatório de inicialização e /metrics)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_phases[name] = startup_phases.get(name, 0.0) + time.perf_counter() - start
+
+def startup_report():
+    """Resumo em uma linha da inicialização deste processo."""
+    phases = ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in startup_phases.items())
+    source = startup_info.get("data_source")
+    return f"Inicialização (pid {os.getpid()}): {phases}" + (f"; dados carregados de {source}" if source else "")
+
+# --- Coletores (valores mantidos por outros módulos) ---
+
+def _collect_persistence():
+    from . import models
+    backend = models.storage_backend
+    labels = {"backend": backend.name}
+    stats = models.persistence_stats()
+    families = [("persistence_read_bytes_total", "counter", "Bytes lidos do backend de dados.", [(labels, backend.bytes_read)]),
+                ("persistence_written_bytes_total", "counter", "Bytes gravados no backend de dados.", [(labels, backend.bytes_written)])]
+    if stats:
+        families += [("save_requests_total", "counter", "Chamadas a save_data (gravação em grupo).", [({}, stats.get("save_requests", 0))]),
+                     ("save_flushes_total", "counter", "Gravações executadas pela gravação em grupo.", [({}, stats.get("flushes", 0))])]
+    return families
+
+def _collect_caches():
+    from .cache import view_cache, page_cache
+    from .sumula import sumula_cache
+    sumula = sumula_cache.stats()
+    caches = (("view", view_cache.hits, view_cache.misses), ("page", page_cache.hits, page_cache.misses),
+              ("sumula", sumula["hits"] + sumula["disk_hits"], sumula["misses"]))
+    return [("cache_hits_total", "counter", "Acertos dos caches em memória.", [({"cache": name}, hits) for name, hits, _ in caches]),
+            ("cache_misses_total", "counter", "Faltas dos caches em memória.", [({"cache": name}, misses) for name, _, misses in caches])]
+
+def _collect_startup():
+    return [("startup_duration_seconds", "gauge", "Etapas da inicialização do processo (create_app inclui as importações).",
+             [({"phase": name}, f"{seconds:.6f}") for name, seconds in startup_phases.items()])]
+
+registry.add_collector(_collect_persistence)
+registry.add_collector(_collect_caches)
+registry.add_collector(_collect_startup)
+
+# --- Integração com o Flask ---
+
+def _before_request():
+    g.request_start = time.perf_counter()
+
+def _after_request(response):
+    start = g.pop("request_start", None)
+    if start is None: return response
+    elapsed = time.perf_counter() - start
+    REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or "unmatched", method=request.method,
+                            status=response.status_code)
+    if SERVER_TIMING:
+        entries = [f"total;dur={elapsed * 1000:.2f}"]
+        entries += [f"{name};dur={seconds * 1000:.2f}" for name, seconds in g.pop("server_timings", {}).items()]
+        response.headers["Server-Timing"] = ", ".join(entries)
+    return response
+
+def _template_started(sender, template, context, **extra):
+    g.setdefault("template_starts", []).append(time.perf_counter())
+
+def _template_finished(sender, template, context, **extra):
+    starts = g.get("template_starts")
+    if not starts: return
+    elapsed = time.perf_counter() - starts.pop()
+    TEMPLATE_SECONDS.observe(elapsed, template=template.name or "?")
+    if SERVER_TIMING: add_timing("template", elapsed)
+
+def metrics_view():
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        abort(401)
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+def init_app(app):
+    """Registra a medição das requisições e dos templates e a rota /metrics.
+
+    Chamar antes de registrar as rotas: o tempo medido inclui a espera pela trava de escrita.
+    """
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
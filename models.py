@@ -3,28 +3,49 @@
 
 import json
 import os
-from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Any
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields, asdict
+from typing import List, Dict, Optional
 
-DATA_FILE = "/var/data/data.json" # Caminho para disco persistente no Render
+from .storage import create_backend, ENTITY_KINDS, DEFAULT_NEXT_IDS
+from .writer import GroupCommitWriter
+from .shared import ProcessLock
+from .indexes import DataIndexes
+from .events import MatchEvent, EventList
+from .idsets import OrderedIdSet
+from .shards import LazyTable, entity_owner, shard_member_ids
+from .cache import view_cache, page_cache
+from .metrics import timed, startup_phase, startup_info, PERSISTENCE_SECONDS
+from .snapshot import read_snapshot, write_snapshot
+
+DATA_FILE = os.environ.get("DATA_FILE", "/var/data/data.json") # Caminho para disco persistente no Render
+DATABASE_FILE = os.environ.get("DATABASE_FILE", "/var/data/data.db") # Usado com DATA_BACKEND=sqlite
+DATA_BACKEND = os.environ.get("DATA_BACKEND", "json") # "json", "sqlite", "journal" ou "sharded"
+SHARD_DIR = os.environ.get("SHARD_DIR", os.path.join(os.path.dirname(DATA_FILE), "shards")) # Usado com DATA_BACKEND=sharded
+SHARD_CACHE_SIZE = int(os.environ.get("SHARD_CACHE_SIZE", "64")) # Competições mantidas em memória antes de descartar as finalizadas
+SAVE_INTERVAL = float(os.environ.get("SAVE_INTERVAL", "0.5")) # Segundos entre gravações em grupo (0 = gravação síncrona)
+MULTI_WORKER = os.environ.get("MULTI_WORKER", "0") == "1" # Vários workers do gunicorn compartilhando os dados
+DATA_SNAPSHOT = os.environ.get("DATA_SNAPSHOT", "1") == "1" # Snapshot binário para carregar sem decodificar o JSON (snapshot.py)
+SNAPSHOT_FILE = os.environ.get("SNAPSHOT_FILE", DATA_FILE + ".snapshot")
 
 # --- Estruturas de Dados (Dataclasses) ---
+# slots=True: sem __dict__ por instância (menos memória em cada worker). MatchEvent e o armazenamento
+# colunar dos eventos da partida ficam em events.py; as listas de ids são OrderedIdSet (idsets.py).
 
-@dataclass
-class MatchEvent:
-    id: int
-    match_id: int
-    team_id: int
-    player_id: int
-    event_type: str # "goal", "yellow_card", "red_card"
-    minute: Optional[str] = None
+def _id_sets(entity, *names):
+    """Converte listas de ids (data.json ou construtor) em OrderedIdSet."""
+    for name in names:
+        value = getattr(entity, name)
+        if not isinstance(value, OrderedIdSet):
+            setattr(entity, name, OrderedIdSet(value if isinstance(value, (list, tuple)) else ()))
 
-@dataclass
+@dataclass(slots=True)
 class Match:
     id: int
     competition_id: int
-    team1_id: int
-    team2_id: int
+    team1_id: Optional[int] # None no mata-mata enquanto a partida anterior não define o time
+    team2_id: Optional[int]
     status: str = "scheduled" # "scheduled", "finished"
     team1_score: Optional[int] = None
     team2_score: Optional[int] = None
@@ -32,9 +53,17 @@ class Match:
     round_number: Optional[int] = None # Para pontos corridos
     knockout_round: Optional[str] = None # "oitavas", "quartas", "semifinal", "final"
     date: Optional[str] = None
-    events: List[MatchEvent] = field(default_factory=list)
+    next_match_id: Optional[int] = None # Mata-mata: partida para a qual o vencedor avança
+    next_slot: Optional[int] = None # Vaga do vencedor na partida seguinte (1 = time 1, 2 = time 2)
+    team1_penalties: Optional[int] = None # Disputa de pênaltis (mata-mata empatado)
+    team2_penalties: Optional[int] = None
+    events: EventList = field(default_factory=list) # Aceita lista de MatchEvent/dicts; convertida em EventList
 
-@dataclass
+    def __post_init__(self):
+        if not isinstance(self.events, EventList):
+            self.events = EventList(self, self.events if isinstance(self.events, list) else ())
+
+@dataclass(slots=True)
 class Standing:
     team_id: int
     competition_id: int
@@ -49,131 +78,422 @@ class Standing:
     points: int = 0
     yellow_cards: int = 0 # Total do time na competição/grupo
     red_cards: int = 0 # Total do time na competição/grupo
+    head_to_head: Dict[int, List[int]] = field(default_factory=dict) # adversário -> [jogos, pontos, gols pró, gols contra]
+
+    def __post_init__(self):
+        # Chaves viram string no JSON
+        self.head_to_head = {int(k): list(v) for k, v in self.head_to_head.items()} if isinstance(self.head_to_head, dict) else {}
 
-@dataclass
+@dataclass(slots=True)
 class Group:
     id: int
     competition_id: int
     name: str
-    teams: List[int] = field(default_factory=list)
-    matches: List[int] = field(default_factory=list)
+    teams: OrderedIdSet = field(default_factory=OrderedIdSet)
+    matches: OrderedIdSet = field(default_factory=OrderedIdSet)
     standings: Dict[int, Standing] = field(default_factory=dict) # team_id -> Standing
     is_finished: bool = False
 
-@dataclass
+    def __post_init__(self):
+        _id_sets(self, "teams", "matches")
+
+@dataclass(slots=True)
 class KnockoutStage:
     competition_id: int
     rounds: Dict[str, List[int]] = field(default_factory=dict) # "oitavas" -> [match_id, ...]
-    bracket: Optional[Any] = None # Poderia ser uma estrutura mais complexa para visualização
+    bracket: Optional[List[List[int]]] = None # Árvore por nível: bracket[n][i] alimenta bracket[n + 1][i // 2]
 
-@dataclass
+@dataclass(slots=True)
 class Player:
     id: int
     name: str
     team_id: Optional[int] = None # Time atual na competição
     competition_stats: Dict[int, Dict[str, int]] = field(default_factory=dict) # competition_id -> {"goals": 0, ...}
 
-@dataclass
+@dataclass(slots=True)
 class Team:
     id: int
     name: str
     competition_id: Optional[int] = None # Competição atual
-    players: List[int] = field(default_factory=list)
+    players: OrderedIdSet = field(default_factory=OrderedIdSet)
+    competition_stats: Dict[int, Dict[str, int]] = field(default_factory=dict) # competition_id -> {"goals_conceded": 0, "matches_played": 0}
+
+    def __post_init__(self):
+        _id_sets(self, "players")
 
-@dataclass
+@dataclass(slots=True)
 class Competition:
     id: int
     name: str
     type: str # "futebol", "futsal", "fut7", "suico"
     format: str # "groups_knockout", "round_robin"
-    teams: List[int] = field(default_factory=list)
+    teams: OrderedIdSet = field(default_factory=OrderedIdSet)
     groups: List[int] = field(default_factory=list) # IDs dos grupos
-    matches: List[int] = field(default_factory=list) # IDs das partidas (geral ou round-robin)
+    matches: OrderedIdSet = field(default_factory=OrderedIdSet) # IDs das partidas (geral ou round-robin)
     standings: Dict[int, Standing] = field(default_factory=dict) # Para round-robin
     knockout_stage: Optional[KnockoutStage] = None
     status: str = "planning" # "planning", "group_stage", "knockout_stage", "finished"
+    version: int = 0 # Incrementada a cada alteração (invalida caches de classificação/estatísticas)
+    stats_ready: bool = False # competition_stats de jogadores/times já materializados (ver stats.py)
+
+    def __post_init__(self):
+        _id_sets(self, "teams", "matches")
+
+@dataclass(slots=True)
+class CompetitionSummary:
+    """Dados da competição mostrados na listagem (disponíveis no índice sem carregar o shard)."""
+    id: int
+    name: str
+    type: str
+    format: str
+    status: str
 
 # --- Armazenamento de Dados (Simulando um Banco de Dados Simples) ---
 
+def _empty_storage():
+    return {kind: {} for kind in ENTITY_KINDS} | {"next_ids": dict(DEFAULT_NEXT_IDS)}
+
+def _storage_from_raw(raw_data):
+    """Recria os objetos a partir dos dicts crus (formato do data.json)."""
+    storage = {
+        "competitions": {int(k): Competition(**v) for k, v in raw_data.get("competitions", {}).items()},
+        "teams": {int(k): Team(**v) for k, v in raw_data.get("teams", {}).items()},
+        "players": {int(k): Player(**v) for k, v in raw_data.get("players", {}).items()},
+        "groups": {int(k): Group(**v) for k, v in raw_data.get("groups", {}).items()},
+        "matches": {int(k): Match(**v) for k, v in raw_data.get("matches", {}).items()},
+        "next_ids": raw_data.get("next_ids", dict(DEFAULT_NEXT_IDS))
+    }
+    # Restaurar tipos complexos dentro dos objetos
+    for comp in storage["competitions"].values():
+        comp.standings = {int(k): Standing(**v) for k, v in comp.standings.items()} if isinstance(comp.standings, dict) else {}
+        if comp.knockout_stage and isinstance(comp.knockout_stage, dict):
+             comp.knockout_stage = KnockoutStage(**comp.knockout_stage)
+    for group in storage["groups"].values():
+         group.standings = {int(k): Standing(**v) for k, v in group.standings.items()} if isinstance(group.standings, dict) else {}
+    for entity in (*storage["players"].values(), *storage["teams"].values()):
+        entity.competition_stats = {int(k): v for k, v in entity.competition_stats.items()}
+    return storage
+
+def _plain_dict(pairs):
+    return {name: value.to_list() if isinstance(value, OrderedIdSet) else value for name, value in pairs}
+
+def entity_to_dict(entity):
+    """Converte uma entidade em dict serializável (cópia profunda; não modifica o data_storage)."""
+    if isinstance(entity, Match):
+        data = {f.name: getattr(entity, f.name) for f in fields(Match) if f.name != "events"}
+        data["events"] = entity.events.to_dicts()
+        return data
+    return asdict(entity, dict_factory=_plain_dict)
+
 def load_data():
-    """Carrega os dados do arquivo JSON."""
-    if os.path.exists(DATA_FILE):
+    """Carrega os dados do backend configurado (arquivo JSON por padrão).
+
+    Com backend em shards nada é lido aqui além do índice: as tabelas carregam cada competição na primeira consulta.
+    """
+    with timed(PERSISTENCE_SECONDS, "load", operation="load", backend=storage_backend.name):
+        return _load_storage()
+
+def _snapshot_key():
+    """Versão do arquivo de dados no disco + campos das classes (mudar os modelos invalida os snapshots antigos).
+
+    None se o snapshot estiver desativado ou o backend não oferecer suporte (só o JSON).
+    """
+    source_id = storage_backend.source_id() if DATA_SNAPSHOT else None
+    if source_id is None: return None
+    classes = (Competition, Team, Player, Group, Match, MatchEvent, Standing, KnockoutStage)
+    schema = tuple((cls.__name__, tuple(f.name for f in fields(cls))) for cls in classes)
+    return (source_id, schema, EventList.__slots__, OrderedIdSet.__slots__)
+
+def _load_storage():
+    if LAZY_LOADING:
         try:
-            with open(DATA_FILE, "r", encoding="utf-8") as f:
-                raw_data = json.load(f)
-            # Recriar objetos a partir dos dicts crus
-            storage = {
-                "competitions": {int(k): Competition(**v) for k, v in raw_data.get("competitions", {}).items()},
-                "teams": {int(k): Team(**v) for k, v in raw_data.get("teams", {}).items()},
-                "players": {int(k): Player(**v) for k, v in raw_data.get("players", {}).items()},
-                "groups": {int(k): Group(**v) for k, v in raw_data.get("groups", {}).items()},
-                "matches": {int(k): Match(**v) for k, v in raw_data.get("matches", {}).items()},
-                "next_ids": raw_data.get("next_ids", {"competition": 1, "team": 1, "player": 1, "group": 1, "match": 1, "event": 1})
-            }
-            # Restaurar tipos complexos dentro dos objetos
-            for comp in storage["competitions"].values():
-                comp.standings = {int(k): Standing(**v) for k, v in comp.standings.items()} if isinstance(comp.standings, dict) else {}
-                if comp.knockout_stage and isinstance(comp.knockout_stage, dict):
-                     comp.knockout_stage = KnockoutStage(**comp.knockout_stage)
-            for group in storage["groups"].values():
-                 group.standings = {int(k): Standing(**v) for k, v in group.standings.items()} if isinstance(group.standings, dict) else {}
-            for match in storage["matches"].values():
-                 match.events = [MatchEvent(**e) for e in match.events] if isinstance(match.events, list) else []
+            next_ids = storage_backend.next_ids()
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Erro ao carregar {storage_backend.path}: {e}. Iniciando com dados vazios.")
+            next_ids = dict(DEFAULT_NEXT_IDS)
+        return {kind: LazyTable(kind, _load_shard) for kind in ENTITY_KINDS} | {"next_ids": next_ids}
+    snapshot_key = _snapshot_key()
+    if snapshot_key is not None:
+        storage = read_snapshot(SNAPSHOT_FILE, snapshot_key)
+        if storage is not None:
+            startup_info["data_source"] = "snapshot"
             return storage
-        except (json.JSONDecodeError, TypeError, KeyError) as e:
-            print(f"Erro ao carregar ou desserializar {DATA_FILE}: {e}. Iniciando com dados vazios.")
-            # Fallback para dados vazios se o arquivo estiver corrompido ou mal formatado
-            return {
-                "competitions": {},
-                "teams": {},
-                "players": {},
-                "groups": {},
-                "matches": {},
-                "next_ids": {"competition": 1, "team": 1, "player": 1, "group": 1, "match": 1, "event": 1}
-            }
-    else:
+    startup_info["data_source"] = storage_backend.name
+    try:
+        raw_data = storage_backend.load_raw()
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"Erro ao carregar {storage_backend.path}: {e}. Iniciando com dados vazios.")
+        return _empty_storage()
+    if raw_data is None:
         # Retorna estrutura vazia se o arquivo não existe
-        return {
-            "competitions": {},
-            "teams": {},
-            "players": {},
-            "groups": {},
-            "matches": {},
-            "next_ids": {"competition": 1, "team": 1, "player": 1, "group": 1, "match": 1, "event": 1}
-        }
-
-def save_data():
-    """Salva os dados atuais no arquivo JSON."""
-    # Converte objetos dataclass para dicts antes de salvar
-    # Usa uma cópia profunda ou conversão manual para evitar modificar o data_storage original
-    serializable_data = {
-        "competitions": {k: v.__dict__ for k, v in data_storage["competitions"].items()},
-        "teams": {k: v.__dict__ for k, v in data_storage["teams"].items()},
-        "players": {k: v.__dict__ for k, v in data_storage["players"].items()},
-        "groups": {k: v.__dict__ for k, v in data_storage["groups"].items()},
-        "matches": {k: v.__dict__ for k, v in data_storage["matches"].items()},
-        "next_ids": data_storage["next_ids"]
-    }
-    # Serializa sub-objetos manualmente
-    for comp_dict in serializable_data["competitions"].values():
-        comp_dict["standings"] = {k: v.__dict__ for k, v in comp_dict["standings"].items()}
-        if comp_dict["knockout_stage"]:
-             comp_dict["knockout_stage"] = comp_dict["knockout_stage"].__dict__
-    for group_dict in serializable_data["groups"].values():
-        group_dict["standings"] = {k: v.__dict__ for k, v in group_dict["standings"].items()}
-    for match_dict in serializable_data["matches"].values():
-        match_dict["events"] = [e.__dict__ for e in match_dict["events"]]
+        return _empty_storage()
+    try:
+        storage = _storage_from_raw(raw_data)
+    except (TypeError, KeyError, ValueError) as e:
+        print(f"Erro ao desserializar {storage_backend.path}: {e}. Iniciando com dados vazios.")
+        # Fallback para dados vazios se o arquivo estiver corrompido ou mal formatado
+        return _empty_storage()
+    if snapshot_key is not None:
+        write_snapshot(SNAPSHOT_FILE, snapshot_key, storage) # Próximos processos carregam do snapshot
+    return storage
 
+def write_data_snapshot():
+    """Regrava o snapshot a partir do data_storage (sem alterações pendentes). Retorna o tamanho ou None."""
+    with data_lock:
+        snapshot_key = _snapshot_key()
+        if snapshot_key is None or _dirty: return None
+        return write_snapshot(SNAPSHOT_FILE, snapshot_key, data_storage)
+
+def touch(kind, *entity_ids):
+    """Marca entidades como alteradas (ou removidas) para a próxima gravação.
+
+    O backend SQLite grava apenas as entidades marcadas; o JSON reescreve o arquivo inteiro de qualquer forma.
+    """
+    for entity_id in entity_ids:
+        _dirty.add((kind, entity_id))
+
+def _prepare_pending(full=False):
+    """Serializa as alterações pendentes (chamar com data_lock). Retorna (dirty, payload) ou None."""
+    dirty = None if full else set(_dirty)
     try:
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(serializable_data, f, indent=4, ensure_ascii=False)
-    except IOError as e:
-        print(f"Erro ao salvar dados em {DATA_FILE}: {e}")
+        with timed(PERSISTENCE_SECONDS, "serialize", operation="serialize", backend=storage_backend.name):
+            payload = storage_backend.prepare(data_storage, dirty, entity_to_dict)
     except TypeError as e:
-         print(f"Erro de tipo ao serializar dados para JSON: {e}")
+        print(f"Erro de tipo ao serializar dados: {e}")
+        return None
+    if dirty is None:
+        _dirty.clear()
+    else:
+        _dirty.difference_update(dirty)
+    return dirty, payload
+
+def _write_payload(dirty, payload):
+    try:
+        with timed(PERSISTENCE_SECONDS, "write", operation="write", backend=storage_backend.name):
+            storage_backend.write(payload)
+        return True
+    except IOError as e:
+        print(f"Erro ao salvar dados em {storage_backend.path}: {e}")
+        with data_lock:
+            _dirty.update(dirty or ()) # Tenta de novo na próxima gravação
+        return False
+
+def _flush_pending(full=False):
+    """Serializa (com data_storage travado) e grava as alterações pendentes. Retorna True se gravou.
+
+    A trava de E/S é obtida antes de soltar data_lock, garantindo que as gravações cheguem ao disco
+    na mesma ordem em que foram serializadas.
+    """
+    global _seen_generation
+    if process_lock is not None:
+        # Vários workers: grava sob a trava entre processos e registra a geração resultante
+        with data_lock, process_lock.hold():
+            prepared = _prepare_pending(full)
+            if prepared is None or not _write_payload(*prepared):
+                return False
+            _seen_generation = storage_backend.generation()
+            return True
+    with data_lock:
+        prepared = _prepare_pending(full)
+        if prepared is None:
+            return False
+        _io_lock.acquire()
+    try:
+        return _write_payload(*prepared)
+    finally:
+        _io_lock.release()
+
+def save_data(full=False, wait=False):
+    """Solicita a persistência das alterações pendentes (full=True grava todas as entidades).
 
-# Inicializa o armazenamento carregando do arquivo
-data_storage = load_data()
+    Com SAVE_INTERVAL > 0 a gravação é agrupada pela thread de gravação (várias solicitações viram uma
+    única gravação atômica); wait=True só retorna com os dados no disco. Com SAVE_INTERVAL=0 ou
+    MULTI_WORKER=1 grava na hora (com vários workers a gravação precisa acontecer dentro da trava).
+    """
+    if save_writer is None:
+        _flush_pending(full)
+    else:
+        save_writer.request(full=full, wait=wait)
+
+# --- Shards por Competição (DATA_BACKEND=sharded) ---
+
+def _load_shard(kind, entity_id):
+    """Carrega para o data_storage o shard (competição) dono de um id ausente. Retorna True se carregou."""
+    competition_id = storage_backend.owner_of(kind, entity_id)
+    if competition_id is None or dict.__contains__(data_storage["competitions"], competition_id):
+        return False # Id desconhecido, ou o shard já está em memória (a entidade não existe mais)
+    with data_lock:
+        if dict.__contains__(data_storage["competitions"], competition_id):
+            return False
+        try:
+            with timed(PERSISTENCE_SECONDS, "load", operation="load_shard", backend=storage_backend.name):
+                shard = _storage_from_raw(storage_backend.load_shard(competition_id) or {})
+        except (json.JSONDecodeError, IOError, TypeError, KeyError, ValueError) as e:
+            print(f"Erro ao carregar o shard da competição {competition_id}: {e}")
+            return False
+        if competition_id not in shard["competitions"]:
+            return False
+        for table in ENTITY_KINDS:
+            dict.update(data_storage[table], shard[table])
+        for match in shard["matches"].values():
+            indexes.index_match(match)
+        for player in shard["players"].values():
+            indexes.index_player(player)
+        _loaded_shards[competition_id] = None
+        _evict_shards()
+    return True
+
+def _unload_shard(competition_id):
+    """Remove do data_storage (e dos índices/caches) as entidades de uma competição já gravada."""
+    global reload_count
+    competition = dict.get(data_storage["competitions"], competition_id)
+    if competition is not None:
+        for kind, entity_ids in shard_member_ids(data_storage, competition).items():
+            for entity_id in entity_ids:
+                dict.pop(data_storage[kind], entity_id, None)
+                if kind == "matches": indexes.unindex_match(entity_id)
+                elif kind == "players": indexes.unindex_player(entity_id)
+    _loaded_shards.pop(competition_id, None)
+    view_cache.invalidate(competition_id)
+    page_cache.invalidate(competition_id) # HTML da página também sai da memória
+    reload_count += 1
+
+def _evict_shards():
+    """LRU: com mais de SHARD_CACHE_SIZE competições em memória, descarta as finalizadas menos usadas
+    (nunca uma com alterações ainda não gravadas)."""
+    excess = len(_loaded_shards) - SHARD_CACHE_SIZE
+    if excess <= 0:
+        return
+    pending = {entity_owner(data_storage, kind, entity_id) for kind, entity_id in _dirty}
+    for competition_id in list(_loaded_shards)[:-1]: # Do menos para o mais recente (mantém o último carregado)
+        if excess <= 0:
+            break
+        competition = dict.get(data_storage["competitions"], competition_id)
+        if competition is None or (competition.status == "finished" and competition_id not in pending):
+            _unload_shard(competition_id)
+            excess -= 1
+
+def list_competitions():
+    """Resumo (id, nome, tipo, formato e status) de todas as competições, sem carregar shards."""
+    loaded = {c.id: c for c in list(data_storage["competitions"].values())}
+    summaries = [CompetitionSummary(c.id, c.name, c.type, c.format, c.status) for c in loaded.values()]
+    if LAZY_LOADING:
+        summaries += [CompetitionSummary(cid, s["name"], s["type"], s["format"], s["status"])
+                      for cid, s in storage_backend.competition_summaries().items() if cid not in loaded]
+    return sorted(summaries, key=lambda c: c.id)
+
+# --- Vários Workers (MULTI_WORKER=1) ---
+
+def _replace_storage(raw_data):
+    """Substitui o conteúdo do data_storage mantendo os mesmos dicts (importados por outros módulos)."""
+    global reload_count
+    reload_count += 1
+    fresh = _storage_from_raw(raw_data) if raw_data else _empty_storage()
+    for kind in ENTITY_KINDS:
+        data_storage[kind].clear()
+        data_storage[kind].update(fresh[kind])
+    data_storage["next_ids"].clear()
+    data_storage["next_ids"].update(fresh["next_ids"])
+    indexes.rebuild(data_storage)
+
+def _apply_changes(changes, next_ids):
+    """Aplica no data_storage apenas as entidades alteradas/removidas por outro processo."""
+    global reload_count
+    reload_count += 1
+    partial_raw = {kind: {} for kind in ENTITY_KINDS}
+    for kind, entity_id, data in changes:
+        if data is None:
+            data_storage[kind].pop(int(entity_id), None)
+            partial_raw[kind].pop(str(entity_id), None)
+            if kind == "matches": indexes.unindex_match(int(entity_id))
+            elif kind == "players": indexes.unindex_player(int(entity_id))
+        else:
+            partial_raw[kind][str(entity_id)] = data
+    for kind, entities in _storage_from_raw(partial_raw).items():
+        if kind in ENTITY_KINDS:
+            data_storage[kind].update(entities)
+    for match in _iter_values(data_storage["matches"], partial_raw["matches"]):
+        indexes.index_match(match)
+    for player in _iter_values(data_storage["players"], partial_raw["players"]):
+        indexes.index_player(player)
+    if next_ids:
+        data_storage["next_ids"].clear()
+        data_storage["next_ids"].update(next_ids)
+
+def _iter_values(table, raw_ids):
+    return (table[int(k)] for k in raw_ids if int(k) in table)
+
+def refresh_data():
+    """Aplica as alterações gravadas por outros workers desde a última leitura (apenas com MULTI_WORKER).
+
+    Compara o número de geração do backend com o último visto; se mudou, recarrega só as entidades
+    alteradas (ou tudo, quando o backend não consegue dizer o que mudou). Retorna True se recarregou.
+    """
+    global _seen_generation
+    if process_lock is None or storage_backend.generation() == _seen_generation:
+        return False
+    with data_lock, process_lock.hold(shared=True):
+        generation = storage_backend.generation()
+        if generation == _seen_generation:
+            return False
+        try:
+            with timed(PERSISTENCE_SECONDS, "load", operation="refresh", backend=storage_backend.name):
+                result = storage_backend.changes_since(_seen_generation)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Erro ao recarregar {storage_backend.path}: {e}")
+            return False
+        if result[0] == "full":
+            _replace_storage(result[1])
+        elif result[0] == "shards":
+            # Shards regravados por outro worker: descarta os que estão em memória (recarregam sob demanda)
+            for competition_id in result[1]:
+                if dict.__contains__(data_storage["competitions"], competition_id):
+                    _unload_shard(competition_id)
+            data_storage["next_ids"].clear()
+            data_storage["next_ids"].update(result[2])
+        else:
+            _apply_changes(result[1], result[2])
+        _seen_generation = generation
+    return True
+
+def begin_write():
+    """Início de uma requisição que altera dados: trava threads e outros workers e aplica o que eles gravaram."""
+    data_lock.acquire()
+    if process_lock is not None:
+        process_lock.acquire()
+        refresh_data()
+
+def end_write():
+    if process_lock is not None:
+        process_lock.release()
+    data_lock.release()
+
+def persistence_stats():
+    """Contadores da gravação em grupo (solicitações, gravações executadas e agrupadas)."""
+    return save_writer.stats() if save_writer else {}
+
+# Inicializa o armazenamento carregando do backend configurado
+storage_backend = create_backend(DATA_BACKEND, DATA_FILE, DATABASE_FILE, SHARD_DIR)
+LAZY_LOADING = getattr(storage_backend, "lazy", False) # Shards carregados sob demanda
+_loaded_shards = OrderedDict() # competition_id -> None, da menos para a mais recentemente usada (backend em shards)
+_dirty = set() # (tipo, id) alterados desde a última gravação
+data_lock = threading.RLock() # Protege data_storage entre as rotas que alteram dados e a thread de gravação
+_io_lock = threading.Lock() # Serializa as escritas no backend
+process_lock = ProcessLock(storage_backend.path + ".lock") if MULTI_WORKER else None
+storage_backend.process_lock = process_lock
+save_writer = GroupCommitWriter(_flush_pending, SAVE_INTERVAL) if SAVE_INTERVAL > 0 and not MULTI_WORKER else None
+with startup_phase("data"):
+    if process_lock is not None:
+        with process_lock.hold(shared=True):
+            _seen_generation = storage_backend.generation()
+            data_storage = load_data()
+    else:
+        _seen_generation = storage_backend.generation()
+        data_storage = load_data()
+reload_count = 0 # Incrementado quando outro worker altera o data_storage (invalida estruturas derivadas)
+indexes = DataIndexes() # Índices secundários, mantidos pelas funções de alteração abaixo
+with startup_phase("indexes"):
+    indexes.rebuild(data_storage)
 
 # --- Funções de Acesso e Manipulação ---
 
@@ -184,32 +504,115 @@ def get_next_id(type_key):
     # Não salva aqui, salva quando a entidade for criada
     return next_id
 
-# Funções get_... permanecem as mesmas (acessam data_storage)
-def get_competition(id): return data_storage["competitions"].get(id)
+def reserve_ids(type_key, count):
+    """Reserva `count` IDs consecutivos de um tipo de uma vez (criação em lote). Retorna um range."""
+    first_id = data_storage["next_ids"].get(type_key, 1)
+    data_storage["next_ids"][type_key] = first_id + count
+    return range(first_id, first_id + count)
+
+def bump_version(competition):
+    """Marca a competição como alterada, invalidando dados derivados em cache."""
+    competition.version += 1
+    touch("competitions", competition.id)
+
+# Funções get_... (acessam data_storage)
+def get_competition(id):
+    competition = data_storage["competitions"].get(id)
+    if competition is not None and id in _loaded_shards:
+        _loaded_shards.move_to_end(id) # Uso recente (LRU dos shards)
+    return competition
+
 def get_team(id): return data_storage["teams"].get(id)
 def get_player(id): return data_storage["players"].get(id)
 def get_group(id): return data_storage["groups"].get(id)
 def get_match(id): return data_storage["matches"].get(id)
 
+def _ensure_shard(kind, entity_id):
+    """Backend em shards: carrega a competição dona do id antes de consultar os índices (que só cobrem o que está em memória)."""
+    if LAZY_LOADING and not dict.__contains__(data_storage[kind], entity_id):
+        data_storage[kind].get(entity_id)
+
+def _resolve(table, ids):
+    return [table[i] for i in list(ids) if i in table]
+
 def get_team_players(team_id):
-    team = get_team(team_id)
-    return [get_player(p_id) for p_id in team.players if get_player(p_id)] if team else []
+    _ensure_shard("teams", team_id)
+    return _resolve(data_storage["players"], indexes.players_by_team.get(team_id, ()))
 
 def get_competition_teams(competition_id):
     comp = get_competition(competition_id)
-    return [get_team(t_id) for t_id in comp.teams if get_team(t_id)] if comp else []
+    return _resolve(data_storage["teams"], comp.teams) if comp else []
 
 def get_competition_matches(competition_id):
-    comp = get_competition(competition_id)
-    return [get_match(m_id) for m_id in comp.matches if get_match(m_id)] if comp else []
+    _ensure_shard("competitions", competition_id)
+    return _resolve(data_storage["matches"], indexes.matches_by_competition.get(competition_id, ()))
 
 def get_group_matches(group_id):
-    group = get_group(group_id)
-    return [get_match(m_id) for m_id in group.matches if get_match(m_id)] if group else []
+    _ensure_shard("groups", group_id)
+    return _resolve(data_storage["matches"], indexes.matches_by_group.get(group_id, ()))
 
 def get_group_teams(group_id):
      group = get_group(group_id)
-     return [get_team(t_id) for t_id in group.teams if get_team(t_id)] if group else []
+     return _resolve(data_storage["teams"], group.teams) if group else []
+
+# Consultas pelos índices secundários (custo proporcional ao resultado)
+def get_matches_by_status(competition_id, status):
+    _ensure_shard("competitions", competition_id)
+    return _resolve(data_storage["matches"], indexes.matches_by_status.get((competition_id, status), ()))
+
+def get_round_matches(competition_id, round_number):
+    _ensure_shard("competitions", competition_id)
+    return _resolve(data_storage["matches"], indexes.matches_by_round.get((competition_id, round_number), ()))
+
+def get_knockout_round_matches(competition_id, knockout_round):
+    _ensure_shard("competitions", competition_id)
+    return _resolve(data_storage["matches"], indexes.matches_by_knockout_round.get((competition_id, knockout_round), ()))
+
+def get_team_matches(team_id):
+    _ensure_shard("teams", team_id)
+    return _resolve(data_storage["matches"], indexes.matches_by_team.get(team_id, ()))
+
+def _resolve_events(keys):
+    matches = data_storage["matches"]
+    return [(matches[match_id], matches[match_id].events[position]) for match_id, position in list(keys) if match_id in matches]
+
+def get_player_events(player_id):
+    """Lista de (partida, evento) do jogador."""
+    _ensure_shard("players", player_id)
+    return _resolve_events(indexes.events_by_player.get(player_id, ()))
+
+def get_team_events(team_id):
+    """Lista de (partida, evento) do time."""
+    _ensure_shard("teams", team_id)
+    return _resolve_events(indexes.events_by_team.get(team_id, ()))
+
+# Funções de alteração: mantêm os índices e marcam as entidades para gravação (o chamador salva)
+def insert_match(match):
+    data_storage["matches"][match.id] = match
+    indexes.index_match(match)
+    touch("matches", match.id)
+    return match
+
+def update_match(match):
+    """Chamar após alterar status, placar, rodada ou eventos de uma partida."""
+    indexes.index_match(match)
+    touch("matches", match.id)
+
+def delete_match(match_id):
+    match = data_storage["matches"].pop(match_id, None)
+    indexes.unindex_match(match_id)
+    touch("matches", match_id)
+    return match
+
+def delete_matches(match_ids):
+    """Remove várias partidas de uma vez. Retorna os ids que existiam (para `difference_update` nas listas de ids)."""
+    return [match_id for match_id in list(match_ids) if delete_match(match_id) is not None]
+
+def insert_player(player):
+    data_storage["players"][player.id] = player
+    indexes.index_player(player)
+    touch("players", player.id)
+    return player
 
 # Exemplo: Qualquer função que modifica dados agora deve chamar save_data()
 # Exemplo (simplificado):
@@ -221,6 +624,8 @@ def add_team_to_competition(competition_id, team_name):
     new_team = Team(id=team_id, name=team_name, competition_id=competition_id)
     data_storage["teams"][team_id] = new_team
     competition.teams.append(team_id)
+    touch("teams", team_id)
+    bump_version(competition)
     save_data() # Salva após a modificação
     return new_team
 
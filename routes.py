@@ -1,276 +1,185 @@
 # -*- coding: utf-8 -*-
 """Define as rotas e a lógica de visualização do aplicativo."""
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, make_response
+from flask import Blueprint, render_template, request, redirect, url_for, flash, make_response, g, session, Response, stream_with_context
 # Importar todos os modelos e funções auxiliares de models.py
 from .models import (
-    data_storage, get_next_id, save_data, # Adicionado save_data
-    Competition, Team, Player, Group, Match, Standing, KnockoutStage, MatchEvent,
+    data_storage, get_next_id, reserve_ids, save_data, bump_version, touch,
+    begin_write, end_write, refresh_data, list_competitions,
+    get_matches_by_status, get_knockout_round_matches, get_round_matches,
+    insert_match, update_match, delete_matches, insert_player,
+    Competition, Team, Player, Group, Match, MatchEvent,
     get_competition, get_team, get_player, get_group, get_match, 
     get_team_players, get_competition_teams, get_competition_matches, 
-    get_group_matches, get_group_teams
+    get_group_matches
 )
-import itertools
-import operator # Para ordenação complexa
-from collections import defaultdict # Para estatísticas
-from fpdf import FPDF
-import datetime
-import os # Para path de fontes
+from .standings import (
+    sort_standings, ensure_standings, empty_standings,
+    result_snapshot, apply_result_delta
+)
+from .stats import calculate_stats, stats_snapshot, apply_stats_delta, discard_match_stats
+from .cache import view_cache, page_cache
+from .events import EVENT_TYPES
+from .sumula import get_sumula_pdf, export_matches, iter_sumulas_zip, render_merged_pdf
+from .scheduling import schedule_matches
+from .live import live_hub, publish_result
+from .importer import import_teams, iter_rows, detect_format, ImportFormatError
+from .knockout import ROUND_NAMES, QUALIFY_PER_GROUP, create_bracket, advance_winner, match_winner, bracket_rounds
 import random # Para sorteio e chaveamento
 
 bp = Blueprint("routes", __name__)
 
 # --- Constantes ---
 APP_NAME = "TS Sant'ana Gerenciador de Competições"
-FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf" 
 
 # --- Funções Auxiliares de Lógica (Cálculos, etc.) ---
 
-def calculate_standings(competition_id, group_id=None):
-    """Recalcula a classificação de um grupo ou geral (round-robin)."""
-    competition = get_competition(competition_id)
-    if not competition:
-        return
-
-    target_standings = None
-    relevant_matches = []
-    relevant_teams = []
-    should_save = False # Flag para salvar apenas se houver cálculo
-
-    if competition.format == "groups_knockout" and group_id:
-        group = get_group(group_id)
-        if not group: return
-        target_standings = group.standings
-        relevant_matches = get_group_matches(group_id)
-        relevant_teams = group.teams
-        # Reset group standings
-        group.standings = {}
-        for team_id in relevant_teams:
-            if get_team(team_id):
-                group.standings[team_id] = Standing(team_id, competition_id, group_id=group_id)
-            else:
-                print(f"Aviso: Time ID {team_id} não encontrado ao inicializar standings para o grupo {group_id}.")
-        target_standings = group.standings # Aponta para o dict recém-criado
-        should_save = True
-    
-    elif competition.format == "round_robin":
-        target_standings = competition.standings
-        relevant_matches = get_competition_matches(competition_id)
-        relevant_teams = competition.teams
-        # Reset competition standings
-        competition.standings = {}
-        for team_id in relevant_teams:
-             if get_team(team_id):
-                competition.standings[team_id] = Standing(team_id, competition_id)
-             else:
-                 print(f"Aviso: Time ID {team_id} não encontrado ao inicializar standings gerais para a competição {competition_id}.")
-        target_standings = competition.standings # Aponta para o dict recém-criado
-        should_save = True
+def create_schedule(competition, team_ids, group=None, double=False):
+    """Cria todas as partidas de pontos corridos (turno ou turno e returno) com rodadas numeradas."""
+    fixtures = schedule_matches(team_ids, double=double)
+    group_id = group.id if group else None
+    new_ids = []
+    for match_id, (round_number, team1_id, team2_id) in zip(reserve_ids("match", len(fixtures)), fixtures):
+        insert_match(Match(id=match_id, competition_id=competition.id, team1_id=team1_id, team2_id=team2_id,
+                           group_id=group_id, round_number=round_number))
+        new_ids.append(match_id)
+    if group: group.matches.extend(new_ids)
+    competition.matches.extend(new_ids)
+    return new_ids
+
+def remove_matches(competition, match_ids):
+    """Remove partidas em lote (estatísticas, índices e ids da competição), em tempo linear."""
+    match_ids = list(match_ids)
+    for match_id in match_ids:
+        discard_match_stats(match_id)
+    competition.matches.difference_update(delete_matches(match_ids))
+
+def is_competition_finished(competition):
+    """Pontos corridos: todas as partidas finalizadas. Grupos + mata-mata: final disputada."""
+    if competition.format == "round_robin":
+        total = len(get_competition_matches(competition.id))
+        return total > 0 and len(get_matches_by_status(competition.id, "finished")) == total
+    if competition.knockout_stage and "Final" in competition.knockout_stage.rounds:
+        finals = get_knockout_round_matches(competition.id, "Final")
+        return bool(finals) and all(m.status == "finished" for m in finals)
+    return False
+
+# --- Registro de Resultados (individual e em lote) ---
+
+def validate_result(match, score1, score2, events, penalties=(None, None)):
+    """Confere um resultado antes de aplicar. Retorna a mensagem de erro ou None.
+
+    `events` são (tipo, player_id, minuto); o jogador precisa ser de um dos dois times da partida.
+    """
+    def valid_count(value): return type(value) is int and value >= 0
+    if match.team1_id is None or match.team2_id is None:
+        return "Times da partida ainda não definidos."
+    if not valid_count(score1) or not valid_count(score2):
+        return "Placar inválido."
+    if any(p is not None and not valid_count(p) for p in penalties):
+        return "Pênaltis inválidos."
+    for event_type, player_id, minute in events:
+        if event_type not in EVENT_TYPES:
+            return f"Tipo de evento inválido: {event_type}."
+        if minute is not None and not isinstance(minute, str):
+            return f"Minuto inválido: {minute}."
+        player = get_player(player_id) if type(player_id) is int else None
+        if not player or player.team_id not in (match.team1_id, match.team2_id):
+            return f"Jogador {player_id} não pertence a nenhum dos times da partida."
+    return None
+
+def apply_match_result(match, score1, score2, events, match_date=None, penalties=(None, None)):
+    """Registra placar, eventos e pênaltis e aplica os deltas de classificação e estatísticas e o avanço
+    no mata-mata. Não incrementa a versão nem salva: o chamador usa `commit_results` uma vez por lote.
+
+    Retorna os jogadores com eventos na partida antes ou depois da alteração (diff ao vivo).
+    """
+    previous = result_snapshot(match) # Contribuição antiga para a classificação (delta)
+    previous_stats = stats_snapshot(match) # Contribuição antiga para artilharia/cartões/goleiros
+    match.team1_score = score1
+    match.team2_score = score2
+    match.status = "finished"
+    match.date = match_date if match_date else match.date # Atualiza data se fornecida
+    # Pênaltis só valem em empate no mata-mata
+    tied = score1 == score2 and match.knockout_round
+    match.team1_penalties = penalties[0] if tied else None
+    match.team2_penalties = penalties[1] if tied else None
+    match.events.clear() # Limpa eventos antigos antes de adicionar novos
+    for event_id, (event_type, player_id, minute) in zip(reserve_ids("event", len(events)), events):
+        match.events.append(MatchEvent(id=event_id, match_id=match.id, team_id=get_player(player_id).team_id,
+                                       player_id=player_id, event_type=event_type, minute=minute))
+
+    # Atualiza apenas as duas linhas afetadas da classificação (subtrai o resultado antigo, soma o novo)
+    apply_result_delta(match, previous)
+    update_match(match) # Reindexa status/eventos e marca para gravação
+    apply_stats_delta(match, previous_stats) # Depois de reindexar: o recálculo inicial usa o índice de status
+    if match.next_match_id is not None:
+        advance_winner(match) # Vencedor ocupa sua vaga na partida seguinte do chaveamento
+    return {e.player_id for e in match.events} | {p for p, _ in (previous_stats[4] if previous_stats else ())}
+
+def _standings_group(competition, match):
+    return match.group_id if competition.format == "groups_knockout" else None
+
+def live_standings_before(competition, matches):
+    """Ordem das classificações afetadas antes dos resultados (None se ninguém acompanha ao vivo)."""
+    if not live_hub.has_subscribers(competition.id): return None
+    groups = {_standings_group(competition, m) for m in matches if not m.knockout_round}
+    return {group_id: [s.team_id for s in get_sorted_standings(competition, group_id)] for group_id in groups}
+
+def commit_results(competition, results, previous_orders=None):
+    """Fecha um ou mais resultados aplicados: status da competição, versão e uma única gravação; depois
+    publica os diffs ao vivo. `results` é [(partida, player_ids de apply_match_result)]."""
+    if competition.status != "finished" and is_competition_finished(competition):
+        competition.status = "finished" # Competições finalizadas podem sair da memória (shards)
+    bump_version(competition)
+    save_data() # Salva resultados, eventos e standings de uma vez
+    if previous_orders is None: return
+    for match, player_ids in results:
+        group_id = _standings_group(competition, match)
+        standings = get_sorted_standings(competition, group_id) if group_id in previous_orders and not match.knockout_round else None
+        publish_result(competition, match, standings, previous_orders.get(group_id), player_ids)
+
+def get_sorted_standings(competition, group_id=None):
+    """Classificação ordenada do grupo/geral, em cache pela versão da competição (leitura pura, não salva)."""
+    def build():
+        standings = ensure_standings(competition.id, group_id=group_id, save=False)
+        return sort_standings(standings, competition.id, group_id=group_id) if standings is not None else []
+    return view_cache.get_or_build(competition, ("standings", group_id), build)
+
+def get_bracket(competition):
+    """Chaveamento do mata-mata para exibição, em cache pela versão da competição."""
+    return view_cache.get_or_build(competition, ("bracket",), lambda: bracket_rounds(competition))
+
+def get_competition_stats(competition):
+    """Estatísticas da competição, em cache pela versão da competição."""
+    return view_cache.get_or_build(competition, "stats", lambda: calculate_stats(competition.id))
+
+# --- Controle de Concorrência ---
+
+@bp.before_app_request
+def lock_data_for_writes():
+    """Requisições POST alteram o data_storage: seguram a trava durante toda a requisição (threads e,
+    com MULTI_WORKER, outros workers). As demais só aplicam o que outros workers gravaram."""
+    if request.method == "POST":
+        begin_write()
+        g.holds_data_lock = True
     else:
-        return # Formato inválido ou grupo não especificado quando necessário
-
-    if not target_standings: return # Sai se não conseguiu inicializar
-
-    # Recalcular cartões totais do time varrendo todas as partidas finalizadas relevantes
-    team_yellow_cards = defaultdict(int)
-    team_red_cards = defaultdict(int)
-    for match in relevant_matches:
-         if match.status == "finished":
-            for event in match.events:
-                # Verifica se o jogador pertence a um time relevante para esta classificação
-                player = get_player(event.player_id)
-                if player and player.team_id in relevant_teams:
-                    if event.event_type == "yellow_card":
-                        team_yellow_cards[event.team_id] += 1
-                    elif event.event_type == "red_card":
-                        team_red_cards[event.team_id] += 1
-
-    # Processar partidas finalizadas para calcular pontos, gols, etc.
-    for match in relevant_matches:
-        # Verifica se os times da partida ainda existem e estão nos standings sendo calculados
-        if match.status == "finished" and match.team1_score is not None and match.team2_score is not None and \
-           match.team1_id in target_standings and match.team2_id in target_standings:
-            
-            s1 = target_standings[match.team1_id]
-            s2 = target_standings[match.team2_id]
-
-            s1.played += 1
-            s2.played += 1
-            s1.goals_for += match.team1_score
-            s1.goals_against += match.team2_score
-            s2.goals_for += match.team2_score
-            s2.goals_against += match.team1_score
-            s1.goal_difference = s1.goals_for - s1.goals_against
-            s2.goal_difference = s2.goals_for - s2.goals_against
-
-            if match.team1_score > match.team2_score:
-                s1.points += 3; s1.wins += 1; s2.losses += 1
-            elif match.team1_score < match.team2_score:
-                s2.points += 3; s2.wins += 1; s1.losses += 1
-            else:
-                s1.points += 1; s2.points += 1; s1.draws += 1; s2.draws += 1
-                
-            # Atribui o total de cartões recalculado (baseado em todos os jogos)
-            s1.yellow_cards = team_yellow_cards.get(match.team1_id, 0)
-            s1.red_cards = team_red_cards.get(match.team1_id, 0)
-            s2.yellow_cards = team_yellow_cards.get(match.team2_id, 0)
-            s2.red_cards = team_red_cards.get(match.team2_id, 0)
-
-        elif match.status == "finished":
-             print(f"Aviso: Partida {match.id} finalizada mas um dos times ({match.team1_id} ou {match.team2_id}) não está nos standings relevantes.")
-    
-    if should_save:
-        save_data() # Salva os standings atualizados
+        refresh_data()
 
-def sort_standings(standings_dict, competition_id, group_id=None):
-    """Ordena a classificação (de grupo ou geral) usando critérios de desempate."""
-    standings_list = list(standings_dict.values())
-    
-    # Função de comparação para sort
-    def compare_teams(s1, s2):
-        # 1. Pontos
-        if s1.points != s2.points: return s2.points - s1.points
-        # TODO: Implementar confronto direto (requer filtrar partidas entre os times empatados)
-        # 2. Saldo de Gols (Geral)
-        if s1.goal_difference != s2.goal_difference: return s2.goal_difference - s1.goal_difference
-        # 3. Gols Pró (Geral)
-        if s1.goals_for != s2.goals_for: return s2.goals_for - s1.goals_for
-        # 4. Menos Cartões Vermelhos (Geral)
-        if s1.red_cards != s2.red_cards: return s1.red_cards - s2.red_cards
-        # 5. Menos Cartões Amarelos (Geral)
-        if s1.yellow_cards != s2.yellow_cards: return s1.yellow_cards - s2.yellow_cards
-        # 6. Sorteio (não implementado)
-        return 0
-
-    from functools import cmp_to_key
-    standings_list.sort(key=cmp_to_key(compare_teams))
-    return standings_list
-
-def calculate_stats(competition_id):
-    """Calcula estatísticas gerais da competição (artilharia, cartões, goleiros)."""
-    competition = get_competition(competition_id)
-    if not competition: return {"top_scorers": [], "discipline": [], "goalkeepers": []}
-
-    player_stats = defaultdict(lambda: {"name": "Desconhecido", "team_id": None, "team_name": "Desconhecido", "goals": 0, "yellow_cards": 0, "red_cards": 0})
-    team_goals_conceded = defaultdict(int)
-    team_matches_played = defaultdict(int)
-    matches = get_competition_matches(competition_id)
-
-    for match in matches:
-        if match.status == "finished":
-            if match.team1_id:
-                team_goals_conceded[match.team1_id] += match.team2_score
-                team_matches_played[match.team1_id] += 1
-            if match.team2_id:
-                team_goals_conceded[match.team2_id] += match.team1_score
-                team_matches_played[match.team2_id] += 1
-            for event in match.events:
-                player_id = event.player_id
-                if player_id not in player_stats:
-                    player = get_player(player_id)
-                    if player:
-                        team = get_team(player.team_id)
-                        player_stats[player_id]["name"] = player.name
-                        player_stats[player_id]["team_id"] = player.team_id
-                        player_stats[player_id]["team_name"] = team.name if team else "Desconhecido"
-                    else: continue
-                if event.event_type == "goal": player_stats[player_id]["goals"] += 1
-                elif event.event_type == "yellow_card": player_stats[player_id]["yellow_cards"] += 1
-                elif event.event_type == "red_card": player_stats[player_id]["red_cards"] += 1
-
-    top_scorers = sorted([s for s in player_stats.values() if s["goals"] > 0], key=lambda x: x["goals"], reverse=True)
-    discipline = sorted([s for s in player_stats.values() if s["yellow_cards"] > 0 or s["red_cards"] > 0], key=lambda x: (x["red_cards"], x["yellow_cards"]), reverse=True)
-    goalkeepers_stats = []
-    for team in get_competition_teams(competition_id):
-        matches_played = team_matches_played.get(team.id, 0)
-        if matches_played > 0:
-            goals_conceded = team_goals_conceded.get(team.id, 0)
-            avg_conceded = goals_conceded / matches_played
-            goalkeepers_stats.append({"team_name": team.name, "goals_conceded": goals_conceded, "matches_played": matches_played, "avg_conceded": avg_conceded})
-    goalkeepers_stats.sort(key=lambda x: (x["avg_conceded"], x["goals_conceded"]))
-    return {"top_scorers": top_scorers, "discipline": discipline, "goalkeepers": goalkeepers_stats}
-
-# --- Função para Gerar Súmula PDF (sem alterações) ---
-class PDF(FPDF):
-    def header(self):
-        try: self.add_font("DejaVu", "", FONT_PATH, uni=True); self.set_font("DejaVu", "B", 12)
-        except RuntimeError: print(f"Aviso: Fonte DejaVu não encontrada em {FONT_PATH}. Usando Arial."); self.set_font("Arial", "B", 12)
-        self.cell(0, 10, APP_NAME, 0, 1, "C")
-        self.set_font(self.font_family, "", 10)
-        self.cell(0, 10, "Súmula da Partida", 0, 1, "C")
-        self.ln(5)
-    def footer(self):
-        self.set_y(-15)
-        try: self.set_font("DejaVu", "I", 8)
-        except RuntimeError: self.set_font("Arial", "I", 8)
-        self.cell(0, 10, f"Página {self.page_no()}/{{nb}}", 0, 0, "C")
-
-def generate_sumula_pdf(match_id):
-    match = get_match(match_id)
-    if not match or match.status != "finished": return None
-    competition = get_competition(match.competition_id)
-    team1 = get_team(match.team1_id); team2 = get_team(match.team2_id)
-    if not competition or not team1 or not team2: return None # Verifica se tudo existe
-    players1 = get_team_players(match.team1_id); players2 = get_team_players(match.team2_id)
-    pdf = PDF(); pdf.alias_nb_pages(); pdf.add_page()
-    try: pdf.add_font("DejaVu", "", FONT_PATH, uni=True); pdf.set_font("DejaVu", "", 10)
-    except RuntimeError: pdf.set_font("Arial", "", 10)
-    pdf.set_font(pdf.font_family, "B", 11)
-    pdf.cell(0, 7, f"Competição: {competition.name} ({competition.type.capitalize()}) - Formato: {"Pontos Corridos" if competition.format == "round_robin" else "Grupos + Mata-Mata"}", 0, 1)
-    phase = ""
-    if match.group_id: group = get_group(match.group_id); phase = f"Fase de Grupos - {group.name}" if group else "Grupo Desconhecido"
-    elif match.knockout_round: phase = f"Fase Eliminatória - {match.knockout_round}"
-    elif match.round_number: phase = f"Rodada {match.round_number}"
-    pdf.cell(0, 7, f"Fase/Rodada: {phase}", 0, 1)
-    pdf.cell(0, 7, f"Data: {match.date if match.date else "Não informada"}", 0, 1); pdf.ln(5)
-    pdf.set_font(pdf.font_family, "B", 14)
-    pdf.cell(0, 10, f"{team1.name}  {match.team1_score}  x  {match.team2_score}  {team2.name}", 0, 1, "C"); pdf.ln(5)
-    pdf.set_font(pdf.font_family, "B", 11); pdf.cell(0, 7, "Jogadores Relacionados", 0, 1)
-    col_width = pdf.w / 2 - 15
-    pdf.set_font(pdf.font_family, "B", 10)
-    pdf.cell(col_width, 6, team1.name, border=1, ln=0, align="C")
-    pdf.cell(10, 6, "", border=0, ln=0)
-    pdf.cell(col_width, 6, team2.name, border=1, ln=1, align="C")
-    pdf.set_font(pdf.font_family, "", 9)
-    max_players = max(len(players1), len(players2))
-    for i in range(max_players):
-        player1_name = players1[i].name if i < len(players1) else ""
-        player2_name = players2[i].name if i < len(players2) else ""
-        pdf.cell(col_width, 5, player1_name, border=1, ln=0)
-        pdf.cell(10, 5, "", border=0, ln=0)
-        pdf.cell(col_width, 5, player2_name, border=1, ln=1)
-    pdf.ln(5)
-    pdf.set_font(pdf.font_family, "B", 11); pdf.cell(0, 7, "Eventos da Partida", 0, 1)
-    pdf.set_font(pdf.font_family, "B", 9)
-    pdf.cell(20, 6, "Minuto", border=1, ln=0, align="C"); pdf.cell(25, 6, "Tipo", border=1, ln=0, align="C")
-    pdf.cell(70, 6, "Jogador", border=1, ln=0, align="C"); pdf.cell(70, 6, "Time", border=1, ln=1, align="C")
-    pdf.set_font(pdf.font_family, "", 9)
-    sorted_events = sorted(match.events, key=lambda e: (int(e.minute) if e.minute and e.minute.isdigit() else 999, e.event_type))
-    event_type_map = {"goal": "Gol", "yellow_card": "Cartão Amarelo", "red_card": "Cartão Vermelho"}
-    for event in sorted_events:
-        player = get_player(event.player_id); team = get_team(event.team_id)
-        pdf.cell(20, 5, str(event.minute) if event.minute else "-", border=1, ln=0, align="C")
-        pdf.cell(25, 5, event_type_map.get(event.event_type, event.event_type), border=1, ln=0, align="C")
-        pdf.cell(70, 5, player.name if player else f"ID {event.player_id}", border=1, ln=0)
-        pdf.cell(70, 5, team.name if team else f"ID {event.team_id}", border=1, ln=1)
-    pdf.ln(10)
-    pdf.set_font(pdf.font_family, "", 10)
-    pdf.cell(pdf.w / 3, 10, "_________________________", 0, 0, "C"); pdf.cell(pdf.w / 3, 10, "_________________________", 0, 0, "C"); pdf.cell(pdf.w / 3, 10, "_________________________", 0, 1, "C")
-    pdf.cell(pdf.w / 3, 5, "Árbitro", 0, 0, "C"); pdf.cell(pdf.w / 3, 5, "Representante Time 1", 0, 0, "C"); pdf.cell(pdf.w / 3, 5, "Representante Time 2", 0, 1, "C")
-    pdf_bytes = pdf.output(dest="S")
-    # Tenta decodificar como latin-1, se falhar, usa utf-8 com replace
-    try:
-        return pdf_bytes.decode("latin-1")
-    except UnicodeDecodeError:
-        print("Aviso: Erro ao decodificar PDF como latin-1, tentando utf-8 com replace.")
-        return pdf_bytes.decode("utf-8", errors="replace")
+@bp.teardown_app_request
+def release_data_lock(exc):
+    if g.pop("holds_data_lock", False):
+        end_write()
 
 # --- Rotas Principais ---
 
 @bp.route("/")
 def index():
-    competitions = list(data_storage["competitions"].values())
-    return render_template("index.html", competitions=competitions, app_name=APP_NAME)
+    competitions = list_competitions() # Resumos do índice: não carrega competições antigas
+    # Chave pelo conteúdo da listagem: qualquer competição nova, renomeada ou com outro status gera outra página
+    summary_key = tuple((c.id, c.name, c.type, c.status) for c in competitions)
+    return cached_page(("index",), summary_key,
+                       lambda: render_template("index.html", competitions=competitions, app_name=APP_NAME))
 
 @bp.route("/competition/new", methods=["GET", "POST"])
 def create_competition():
@@ -286,51 +195,70 @@ def create_competition():
         competition_id = get_next_id("competition")
         new_competition = Competition(id=competition_id, name=name, type=type, format=format)
         data_storage["competitions"][competition_id] = new_competition
+        bump_version(new_competition)
         save_data() # Salva a nova competição
         format_text = "Pontos Corridos" if format == "round_robin" else "Grupos + Mata-Mata"
         flash(f"Competição 	'{name}' ({type.capitalize()} - {format_text}) criada com sucesso!", "success")
         return redirect(url_for("routes.view_competition", competition_id=competition_id))
     return render_template("create_competition.html", app_name=APP_NAME)
 
-@bp.route("/competition/<int:competition_id>")
-def view_competition(competition_id):
-    competition = get_competition(competition_id)
-    if not competition: flash("Competição não encontrada.", "error"); return redirect(url_for("routes.index"))
-    teams = get_competition_teams(competition_id)
+def competition_view_model(competition):
+    """Dados prontos para view_competition.html: nomes por id, classificações ordenadas e partidas já
+    agrupadas (grupo/rodada/fase) e ordenadas, para o template não consultar nada."""
+    teams = get_competition_teams(competition.id)
+    team_names = {team.id: team.name for team in teams}
     groups_data = []
+    rounds = []
     knockout_matches = []
     round_robin_standings = []
-    all_matches = sorted(get_competition_matches(competition_id), key=lambda m: (m.group_id or 999, m.knockout_round or "", m.round_number or 999, m.id))
+    round_robin_chances = False
 
     if competition.format == "groups_knockout":
-        if competition.groups:
-            for group_id in competition.groups:
-                group = get_group(group_id)
-                if group:
-                    calculate_standings(competition_id, group_id=group_id) # Recalcula antes de exibir
-                    sorted_standings_list = sort_standings(group.standings, competition_id, group_id=group_id)
-                    group_matches = get_group_matches(group_id)
-                    groups_data.append({"group": group, "standings": sorted_standings_list, "matches": group_matches})
+        for group_id in competition.groups:
+            group = get_group(group_id)
+            if group:
+                group_matches = sorted(get_group_matches(group_id), key=lambda m: (m.round_number or 0, m.id))
+                # Chance de classificação: só a coluna; os valores vêm da API de probabilidades (simulação fora da página)
+                groups_data.append({"group": group, "standings": get_sorted_standings(competition, group_id=group_id),
+                                    "matches": group_matches,
+                                    "chances": competition.status == "group_stage" and any(m.status != "finished" for m in group_matches)})
         if competition.knockout_stage:
-             for round_name, match_ids in competition.knockout_stage.rounds.items():
-                 round_matches = [get_match(m_id) for m_id in match_ids if get_match(m_id)]
-                 knockout_matches.append({"round_name": round_name, "matches": round_matches})
-    
+            # Árvore pré-computada (em cache); cada fase lista as partidas na ordem do chaveamento
+            knockout_matches = [{"round_name": round_name, "matches": [m for m, _, _ in entries]}
+                                for round_name, entries in get_bracket(competition)]
     elif competition.format == "round_robin":
-        calculate_standings(competition_id) # Recalcula antes de exibir
-        round_robin_standings = sort_standings(competition.standings, competition_id)
-
-    stats = calculate_stats(competition_id)
+        round_robin_standings = get_sorted_standings(competition)
+        by_round = {}
+        for match in get_competition_matches(competition.id):
+            by_round.setdefault(match.round_number or 0, []).append(match)
+        rounds = [{"round_number": number, "matches": sorted(matches, key=lambda m: m.id)}
+                  for number, matches in sorted(by_round.items())]
+        # Chance de título: só a coluna; os valores vêm da API de probabilidades
+        round_robin_chances = competition.status != "finished" and any(m.status != "finished" for r in rounds for m in r["matches"])
+
+    qualified = QUALIFY_PER_GROUP * len(groups_data)
+    return {"teams": teams, "team_names": team_names, "groups_data": groups_data, "rounds": rounds,
+            "knockout_matches": knockout_matches, "round_robin_standings": round_robin_standings,
+            "round_robin_chances": round_robin_chances,
+            "knockout_sizes": [n for n in sorted(ROUND_NAMES) if n <= qualified],
+            "groups_finished": bool(groups_data) and all(m.status == "finished" for g in groups_data for m in g["matches"]),
+            "stats": get_competition_stats(competition)}
+
+def cached_page(key, version, render):
+    """HTML da página em cache pela versão; requisições com mensagens flash pendentes renderizam direto
+    (o HTML em cache nunca contém mensagens)."""
+    if session.get("_flashes"):
+        return render()
+    return page_cache.get_or_build_versioned(key, version, render)
 
-    return render_template("view_competition.html", 
-                           competition=competition, 
-                           teams=teams, 
-                           groups_data=groups_data, 
-                           knockout_matches=knockout_matches,
-                           round_robin_standings=round_robin_standings,
-                           all_matches=all_matches,
-                           stats=stats,
-                           app_name=APP_NAME)
+@bp.route("/competition/<int:competition_id>")
+def view_competition(competition_id):
+    competition = get_competition(competition_id)
+    if not competition: flash("Competição não encontrada.", "error"); return redirect(url_for("routes.index"))
+    def render():
+        return render_template("view_competition.html", competition=competition, app_name=APP_NAME,
+                               **view_cache.get_or_build(competition, "view_model", lambda: competition_view_model(competition)))
+    return cached_page((competition.id, "page"), competition.version, render) # (competição, chave), como no view_cache
 
 @bp.route("/competition/<int:competition_id>/add_team", methods=["GET", "POST"])
 def add_team(competition_id):
@@ -345,11 +273,40 @@ def add_team(competition_id):
             new_team = Team(id=team_id, name=team_name, competition_id=competition_id)
             data_storage["teams"][team_id] = new_team
             competition.teams.append(team_id)
+            touch("teams", team_id)
+            bump_version(competition)
             save_data() # Salva após adicionar time
             flash(f"Time '{team_name}' adicionado à competição '{competition.name}'.", "success")
             return redirect(url_for("routes.view_competition", competition_id=competition_id))
     return render_template("add_team.html", competition=competition, app_name=APP_NAME)
 
+@bp.route("/competition/<int:competition_id>/import_teams", methods=["GET", "POST"])
+def import_teams_view(competition_id):
+    """Importa times e jogadores de um arquivo CSV/JSON (uma gravação para o lote)."""
+    competition = get_competition(competition_id)
+    if not competition: flash("Competição não encontrada.", "error"); return redirect(url_for("routes.index"))
+    report = None
+    if request.method == "POST":
+        upload = request.files.get("file")
+        file_format = request.form.get("format") or detect_format(upload.filename if upload else None)
+        if not upload or not upload.filename:
+            flash("Selecione um arquivo CSV ou JSON.", "error")
+        elif not file_format:
+            flash("Formato não reconhecido: use um arquivo .csv ou .json.", "error")
+        else:
+            try:
+                report = import_teams(competition, iter_rows(upload.stream, file_format),
+                                      dry_run=bool(request.form.get("dry_run")))
+            except ImportFormatError as e:
+                flash(str(e), "error")
+            else:
+                action = "Validados" if request.form.get("dry_run") else "Importados"
+                flash(f"{action}: {report.teams_created} time(s) e {report.players_created} jogador(es); "
+                      f"{len(report.errors)} linha(s) com erro.", "warning" if report.errors else "success")
+                if not report.errors:
+                    return redirect(url_for("routes.view_competition", competition_id=competition_id))
+    return render_template("import_teams.html", competition=competition, report=report, app_name=APP_NAME)
+
 @bp.route("/competition/<int:competition_id>/team/<int:team_id>")
 def view_team(competition_id, team_id):
     competition = get_competition(competition_id); team = get_team(team_id)
@@ -368,8 +325,10 @@ def add_player(competition_id, team_id):
         else:
             player_id = get_next_id("player")
             new_player = Player(id=player_id, name=player_name, team_id=team_id)
-            data_storage["players"][player_id] = new_player
+            insert_player(new_player)
             team.players.append(player_id)
+            touch("teams", team_id)
+            bump_version(competition)
             save_data() # Salva após adicionar jogador
             flash(f"Jogador '{player_name}' adicionado ao time '{team.name}'.", "success")
             return redirect(url_for("routes.view_team", competition_id=competition_id, team_id=team_id))
@@ -386,6 +345,7 @@ def setup_groups(competition_id):
     if request.method == "POST":
         num_groups = int(request.form.get("num_groups", 0))
         teams_per_group = int(request.form.get("teams_per_group", 0))
+        double_round_robin = bool(request.form.get("double_round_robin"))
         if num_groups <= 0 or num_groups > 16 or teams_per_group <= 1 or teams_per_group > 16 or num_groups * teams_per_group > len(teams):
             flash("Número inválido de grupos ou times por grupo.", "error")
             return render_template("setup_groups.html", competition=competition, teams=teams, app_name=APP_NAME)
@@ -393,11 +353,9 @@ def setup_groups(competition_id):
         # Limpa grupos e partidas existentes da fase de grupos
         for group_id in list(competition.groups): # Itera sobre cópia
             if group_id in data_storage["groups"]:
-                for match_id in data_storage["groups"][group_id].matches:
-                    if match_id in data_storage["matches"]:
-                        del data_storage["matches"][match_id]
-                        if match_id in competition.matches: competition.matches.remove(match_id)
+                remove_matches(competition, data_storage["groups"][group_id].matches)
                 del data_storage["groups"][group_id]
+                touch("groups", group_id)
         competition.groups = []
         competition.standings = {} # Limpa standings gerais se houver
         competition.knockout_stage = None # Reseta mata-mata
@@ -408,9 +366,9 @@ def setup_groups(competition_id):
         group_teams_assignment = [[] for _ in range(num_groups)]
         team_idx = 0
         for i in range(teams_per_group):
-            for g in range(num_groups):
+            for group_index in range(num_groups):
                 if team_idx < len(shuffled_teams):
-                    group_teams_assignment[g].append(shuffled_teams[team_idx].id)
+                    group_teams_assignment[group_index].append(shuffled_teams[team_idx].id)
                     team_idx += 1
 
         # Cria grupos e gera partidas
@@ -418,18 +376,16 @@ def setup_groups(competition_id):
             if not team_ids: continue # Pula se grupo ficou vazio
             group_id = get_next_id("group")
             group_name = f"Grupo {chr(ord('A') + i)}"
-            new_group = Group(id=group_id, competition_id=competition_id, name=group_name, teams=team_ids)
+            new_group = Group(id=group_id, competition_id=competition_id, name=group_name, teams=team_ids,
+                              standings=empty_standings(team_ids, competition_id, group_id=group_id))
             data_storage["groups"][group_id] = new_group
             competition.groups.append(group_id)
+            touch("groups", group_id)
             
-            # Gera partidas (todos contra todos)
-            for team1_id, team2_id in itertools.combinations(team_ids, 2):
-                match_id = get_next_id("match")
-                new_match = Match(id=match_id, competition_id=competition_id, team1_id=team1_id, team2_id=team2_id, group_id=group_id)
-                data_storage["matches"][match_id] = new_match
-                new_group.matches.append(match_id)
-                competition.matches.append(match_id)
+            # Gera partidas (todos contra todos, em rodadas)
+            create_schedule(competition, team_ids, group=new_group, double=double_round_robin)
         
+        bump_version(competition)
         save_data() # Salva após criar grupos e partidas
         flash(f"{num_groups} grupos criados e partidas geradas.", "success")
         return redirect(url_for("routes.view_competition", competition_id=competition_id))
@@ -449,23 +405,15 @@ def generate_round_robin_matches(competition_id):
         return redirect(url_for("routes.view_competition", competition_id=competition_id))
 
     # Limpa partidas existentes
-    for match_id in list(competition.matches): # Itera sobre cópia
-        if match_id in data_storage["matches"]:
-            del data_storage["matches"][match_id]
-    competition.matches = []
-    competition.standings = {} # Reseta standings
+    remove_matches(competition, competition.matches)
+    competition.matches.clear() # Inclusive ids sem partida correspondente
+    competition.standings = empty_standings([t.id for t in teams], competition_id) # Reseta standings
     competition.status = "round_robin_stage" # Ou um status apropriado
 
-    # Gera partidas (todos contra todos - turno único)
-    round_num = 1
-    for team1_id, team2_id in itertools.combinations([t.id for t in teams], 2):
-        match_id = get_next_id("match")
-        new_match = Match(id=match_id, competition_id=competition_id, team1_id=team1_id, team2_id=team2_id, round_number=round_num)
-        data_storage["matches"][match_id] = new_match
-        competition.matches.append(match_id)
-        # Simplesmente incrementa rodada, pode ser melhorado com algoritmos de tabela
-        # round_num += 1 
+    # Gera a tabela (todos contra todos em rodadas; returno opcional)
+    create_schedule(competition, [t.id for t in teams], double=bool(request.form.get("double_round_robin")))
 
+    bump_version(competition)
     save_data() # Salva após gerar partidas
     flash("Partidas do formato Pontos Corridos geradas.", "success")
     return redirect(url_for("routes.view_competition", competition_id=competition_id))
@@ -475,65 +423,207 @@ def record_result(match_id):
     match = get_match(match_id)
     if not match: flash("Partida não encontrada.", "error"); return redirect(url_for("routes.index"))
     competition = get_competition(match.competition_id)
+    if match.knockout_round and (match.team1_id is None or match.team2_id is None):
+        flash("Os times desta partida ainda não foram definidos (aguardando a fase anterior).", "warning")
+        return redirect(url_for("routes.view_competition", competition_id=match.competition_id))
     team1 = get_team(match.team1_id); team2 = get_team(match.team2_id)
     if not competition or not team1 or not team2: flash("Erro ao carregar dados da partida.", "error"); return redirect(url_for("routes.index"))
     players1 = get_team_players(match.team1_id); players2 = get_team_players(match.team2_id)
+    def render_form():
+        return render_template("record_result.html", match=match, competition=competition, team1=team1, team2=team2,
+                               players1=players1, players2=players2, get_group=get_group, app_name=APP_NAME)
 
     if request.method == "POST":
         try:
             score1 = int(request.form.get("score1"))
             score2 = int(request.form.get("score2"))
             match_date = request.form.get("match_date")
+            penalties1 = request.form.get("penalties1", type=int) if match.knockout_round else None
+            penalties2 = request.form.get("penalties2", type=int) if match.knockout_round else None
         except (ValueError, TypeError):
             flash("Placar inválido.", "error")
-            return render_template("record_result.html", match=match, competition=competition, team1=team1, team2=team2, players1=players1, players2=players2, app_name=APP_NAME)
-
-        match.team1_score = score1
-        match.team2_score = score2
-        match.status = "finished"
-        match.date = match_date if match_date else match.date # Atualiza data se fornecida
-        match.events = [] # Limpa eventos antigos antes de adicionar novos
-
-        # Processar eventos
-        event_count = int(request.form.get("event_count", 0))
-        for i in range(event_count):
-            event_type = request.form.get(f"event_type_{i}")
-            player_id = int(request.form.get(f"player_id_{i}", 0))
-            minute = request.form.get(f"minute_{i}")
-            player = get_player(player_id)
-            if event_type and player_id and player:
-                event_id = get_next_id("event")
-                team_id = player.team_id
-                new_event = MatchEvent(id=event_id, match_id=match_id, team_id=team_id, player_id=player_id, event_type=event_type, minute=minute)
-                match.events.append(new_event)
-            else:
-                 print(f"Aviso: Evento {i} ignorado por dados inválidos (tipo={event_type}, player_id={player_id})")
+            return render_form()
 
-        save_data() # Salva o resultado e eventos da partida
+        # Processar eventos (linhas sem tipo ou jogador são linhas vazias do formulário)
+        events = []
+        try:
+            event_count = int(request.form.get("event_count") or 0)
+            for i in range(event_count):
+                event_type = request.form.get(f"event_type_{i}")
+                player_id = int(request.form.get(f"player_id_{i}") or 0)
+                minute = request.form.get(f"minute_{i}")
+                if event_type and player_id:
+                    events.append((event_type, player_id, minute))
+        except ValueError:
+            error = "Eventos inválidos: jogador ou quantidade de eventos não numéricos."
+        else:
+            # Mesmas regras do lançamento em lote (tipos de evento, jogadores dos times, placar e pênaltis)
+            error = validate_result(match, score1, score2, events, (penalties1, penalties2))
+        if error:
+            flash(error, "error")
+            return render_form()
+
+        previous_orders = live_standings_before(competition, [match])
+        player_ids = apply_match_result(match, score1, score2, events, match_date, (penalties1, penalties2))
+        if match.next_match_id is not None and match_winner(match) is None:
+            flash("Empate no mata-mata: informe os pênaltis para definir quem avança.", "warning")
+        commit_results(competition, [(match, player_ids)], previous_orders)
         flash(f"Resultado da partida {team1.name} x {team2.name} registrado.", "success")
-        # Recalcular standings após registrar resultado
-        if match.group_id:
-            calculate_standings(competition.id, group_id=match.group_id)
-        elif competition.format == "round_robin":
-             calculate_standings(competition.id)
-        # Não salva aqui de novo, calculate_standings já salva
         return redirect(url_for("routes.view_competition", competition_id=competition.id))
 
-    return render_template("record_result.html", match=match, competition=competition, team1=team1, team2=team2, players1=players1, players2=players2, app_name=APP_NAME)
+    return render_form()
+
+def _matchday_matches(competition_id, round_number=None, knockout_round=None):
+    """Partidas de uma rodada (de todos os grupos) ou fase do mata-mata, em ordem de grupo e id."""
+    if knockout_round:
+        matches = get_knockout_round_matches(competition_id, knockout_round)
+    else:
+        matches = get_round_matches(competition_id, round_number)
+    return sorted(matches, key=lambda m: (m.group_id or 0, m.id))
+
+def _parse_batch_form(matches):
+    """Resultados preenchidos no formulário da rodada: [(partida, placar1, placar2, eventos, pênaltis)] e erros.
+
+    Partidas com os dois placares vazios são ignoradas; os eventos vêm das quantidades por jogador.
+    """
+    entries, errors = [], []
+    counters = (("goals", "goal"), ("yellow", "yellow_card"), ("red", "red_card"))
+    for match in matches:
+        raw1, raw2 = request.form.get(f"score1_{match.id}", ""), request.form.get(f"score2_{match.id}", "")
+        if raw1 == "" and raw2 == "": continue
+        score1 = int(raw1) if raw1.isdigit() else None
+        score2 = int(raw2) if raw2.isdigit() else None
+        if score1 is None or score2 is None:
+            errors.append((match, "Placar incompleto ou inválido."))
+            continue
+        events = []
+        for player in get_team_players(match.team1_id) + get_team_players(match.team2_id):
+            for field_name, event_type in counters:
+                count = request.form.get(f"{field_name}_{match.id}_{player.id}", 0, type=int) or 0
+                events.extend((event_type, player.id, None) for _ in range(max(count, 0)))
+        penalties = (request.form.get(f"penalties1_{match.id}", type=int), request.form.get(f"penalties2_{match.id}", type=int))
+        entries.append((match, score1, score2, events, penalties))
+    return entries, errors
+
+def _parse_batch_json(competition_id, data):
+    """Resultados de um JSON {"results": [{"match_id", "score1", "score2", "events": [...]}, ...]}."""
+    results = data.get("results") if isinstance(data, dict) else None
+    if not isinstance(results, list):
+        return [], [(None, 'JSON inválido: esperado um objeto {"results": [...]}.')]
+    entries, errors = [], []
+    for position, item in enumerate(results, 1):
+        if not isinstance(item, dict):
+            errors.append((None, f"Item {position} do lote não é um objeto."))
+            continue
+        match_id = item.get("match_id")
+        match = get_match(match_id) if type(match_id) is int else None
+        if not match or match.competition_id != competition_id:
+            errors.append((None, f"Partida {match_id!r} não encontrada nesta competição."))
+            continue
+        events = item.get("events")
+        if events is None: events = []
+        if not isinstance(events, list) or not all(isinstance(e, dict) for e in events):
+            errors.append((match, "'events' deve ser uma lista de objetos."))
+            continue
+        match_date = item.get("date")
+        if match_date is not None and not isinstance(match_date, str):
+            errors.append((match, "Data inválida."))
+            continue
+        entries.append((match, item.get("score1"), item.get("score2"),
+                        [(e.get("event_type"), e.get("player_id"), e.get("minute")) for e in events],
+                        (item.get("penalties1"), item.get("penalties2")), match_date))
+    return entries, errors
+
+@bp.route("/competition/<int:competition_id>/batch_results", methods=["GET", "POST"])
+def batch_results(competition_id):
+    """Resultados de uma rodada inteira de uma vez: tudo ou nada, uma gravação e um incremento de versão.
+
+    Aceita o formulário da rodada ou JSON (`{"results": [...]}`, responde em JSON).
+    """
+    competition = get_competition(competition_id)
+    if not competition: flash("Competição não encontrada.", "error"); return redirect(url_for("routes.index"))
+    round_number = request.args.get("round", type=int)
+    knockout_round = request.args.get("knockout_round") or None
+    if round_number is None and not knockout_round:
+        # Padrão: primeira rodada com partidas pendentes
+        pending = [m.round_number for m in get_matches_by_status(competition_id, "scheduled") if m.round_number is not None]
+        round_number = min(pending) if pending else 1
+    matches = _matchday_matches(competition_id, round_number, knockout_round)
+
+    if request.method == "POST":
+        if request.is_json:
+            entries, errors = _parse_batch_json(competition_id, request.get_json(silent=True))
+        else:
+            entries, errors = _parse_batch_form([m for m in matches if m.status != "finished"])
+            entries = [entry + (None,) for entry in entries]
+        seen = set()
+        for match, score1, score2, events, penalties, match_date in entries:
+            error = "Partida repetida no lote." if match.id in seen else validate_result(match, score1, score2, events, penalties)
+            seen.add(match.id)
+            if error: errors.append((match, error))
+
+        if not errors and entries:
+            previous_orders = live_standings_before(competition, [entry[0] for entry in entries])
+            results = [(match, apply_match_result(match, score1, score2, events, match_date, penalties))
+                       for match, score1, score2, events, penalties, match_date in entries]
+            commit_results(competition, results, previous_orders)
+
+        if request.is_json:
+            payload = {"applied": 0 if errors else len(entries),
+                       "errors": [{"match_id": m.id if m else None, "error": message} for m, message in errors]}
+            return payload, 400 if errors else 200
+        if errors:
+            for match, message in errors:
+                flash(f"Partida {match.id if match else '?'}: {message}", "error")
+            flash("Nenhum resultado foi registrado: corrija os erros e envie novamente.", "error")
+        elif not entries:
+            flash("Nenhum placar preenchido.", "warning")
+        else:
+            flash(f"{len(entries)} resultado(s) registrado(s).", "success")
+            return redirect(url_for("routes.view_competition", competition_id=competition_id))
+
+    rows = [{"match": m, "team1": get_team(m.team1_id), "team2": get_team(m.team2_id),
+             "players1": get_team_players(m.team1_id), "players2": get_team_players(m.team2_id)}
+            for m in matches if m.team1_id is not None and m.team2_id is not None]
+    return render_template("batch_results.html", competition=competition, rows=rows, round_number=round_number,
+                           knockout_round=knockout_round, app_name=APP_NAME)
 
 @bp.route("/match/<int:match_id>/generate_sumula")
 def generate_sumula(match_id):
-    pdf_content = generate_sumula_pdf(match_id)
+    pdf_content, fingerprint = get_sumula_pdf(match_id, APP_NAME)
     if pdf_content:
         response = make_response(pdf_content)
         response.headers["Content-Type"] = "application/pdf"
         response.headers["Content-Disposition"] = f"inline; filename=sumula_partida_{match_id}.pdf"
-        return response
+        response.set_etag(fingerprint) # Download repetido da mesma versão responde 304
+        return response.make_conditional(request)
     else:
         flash("Não foi possível gerar a súmula. Verifique se a partida está finalizada.", "error")
         match = get_match(match_id)
         return redirect(url_for("routes.view_competition", competition_id=match.competition_id if match else 0))
 
+@bp.route("/competition/<int:competition_id>/export_sumulas")
+def export_sumulas(competition_id):
+    """Súmulas de todas as partidas finalizadas (ou de um grupo, rodada ou fase) em ZIP ou em um único PDF."""
+    competition = get_competition(competition_id)
+    if not competition: flash("Competição não encontrada.", "error"); return redirect(url_for("routes.index"))
+    matches = export_matches(competition_id, group_id=request.args.get("group_id", type=int),
+                             round_number=request.args.get("round", type=int),
+                             knockout_round=request.args.get("knockout_round") or None)
+    if not matches:
+        flash("Nenhuma partida finalizada para exportar.", "warning")
+        return redirect(url_for("routes.view_competition", competition_id=competition_id))
+    match_ids = [m.id for m in matches]
+    if request.args.get("format") == "pdf":
+        response = make_response(render_merged_pdf(match_ids, APP_NAME))
+        response.headers["Content-Type"] = "application/pdf"
+        response.headers["Content-Disposition"] = f"inline; filename=sumulas_competicao_{competition_id}.pdf"
+        return response
+    # ZIP enviado aos poucos, à medida que as súmulas são renderizadas
+    response = Response(stream_with_context(iter_sumulas_zip(match_ids, APP_NAME)), mimetype="application/zip")
+    response.headers["Content-Disposition"] = f"attachment; filename=sumulas_competicao_{competition_id}.zip"
+    return response
+
 @bp.route("/competition/<int:competition_id>/setup_knockout", methods=["GET", "POST"])
 def setup_knockout(competition_id):
     competition = get_competition(competition_id)
@@ -552,20 +642,15 @@ def setup_knockout(competition_id):
         group = get_group(group_id)
         if not group: continue
         group_finished = all(m.status == "finished" for m in get_group_matches(group_id))
-        group.is_finished = group_finished
         if not group_finished:
             all_groups_finished = False
         else:
-            # Pega os classificados (ex: 2 primeiros)
-            num_qualify = 2 # TODO: Tornar configurável
-            calculate_standings(competition_id, group_id=group_id)
-            sorted_standings = sort_standings(group.standings, competition_id, group_id=group_id)
-            qualified_teams_map[group_id] = [s.team_id for s in sorted_standings[:num_qualify]]
+            # Pega os classificados (os QUALIFY_PER_GROUP primeiros)
+            sorted_standings = get_sorted_standings(competition, group_id=group_id)
+            qualified_teams_map[group_id] = [s.team_id for s in sorted_standings[:QUALIFY_PER_GROUP]]
 
     if not all_groups_finished:
         flash("A fase de grupos ainda não terminou. Finalize todas as partidas.", "warning")
-        # Salva o status de finalização dos grupos
-        save_data()
         return redirect(url_for("routes.view_competition", competition_id=competition_id))
 
     qualified_teams_flat = [team_id for teams in qualified_teams_map.values() for team_id in teams]
@@ -582,29 +667,21 @@ def setup_knockout(competition_id):
 
             # Limpa partidas de mata-mata existentes
             if competition.knockout_stage:
-                 for round_name, match_ids in competition.knockout_stage.rounds.items():
-                     for match_id in match_ids:
-                         if match_id in data_storage["matches"]:
-                             del data_storage["matches"][match_id]
-                             if match_id in competition.matches: competition.matches.remove(match_id)
+                 for match_ids in competition.knockout_stage.rounds.values():
+                     remove_matches(competition, match_ids)
             
-            competition.knockout_stage = KnockoutStage(competition_id=competition_id)
+            for group_id in qualified_teams_map: # Só aqui (POST) grava o status de finalização dos grupos
+                group = get_group(group_id)
+                if not group.is_finished:
+                    group.is_finished = True
+                    touch("groups", group_id)
+
+            # Cria a árvore completa (todas as fases); os vencedores avançam ao registrar os resultados
+            competition.knockout_stage = create_bracket(competition, teams_for_knockout)
             competition.status = "knockout_stage"
-            
-            round_map = {32: "16 avos", 16: "Oitavas", 8: "Quartas", 4: "Semifinal", 2: "Final"}
-            current_round_name = round_map.get(num_teams_knockout, "Fase Desconhecida")
-            competition.knockout_stage.rounds[current_round_name] = []
-
-            # Gera partidas da primeira fase do mata-mata
-            for i in range(0, num_teams_knockout, 2):
-                team1_id = teams_for_knockout[i]
-                team2_id = teams_for_knockout[i+1]
-                match_id = get_next_id("match")
-                new_match = Match(id=match_id, competition_id=competition_id, team1_id=team1_id, team2_id=team2_id, knockout_round=current_round_name)
-                data_storage["matches"][match_id] = new_match
-                competition.matches.append(match_id)
-                competition.knockout_stage.rounds[current_round_name].append(match_id)
-            
+            current_round_name = ROUND_NAMES.get(num_teams_knockout, "Fase Desconhecida")
+
+            bump_version(competition)
             save_data() # Salva o mata-mata configurado
             flash(f"Fase eliminatória ({current_round_name}) configurada com {num_teams_knockout} times.", "success")
             return redirect(url_for("routes.view_competition", competition_id=competition_id))
@@ -614,6 +691,3 @@ def setup_knockout(competition_id):
                            qualified_teams_map=qualified_teams_map,
                            num_qualified=num_qualified,
                            app_name=APP_NAME)
-
-# TODO: Adicionar rota para avançar no mata-mata após registrar resultados
-
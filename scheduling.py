@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""Geração de tabelas de pontos corridos (método do círculo / tabela de Berger).
+
+Cada rodada tem n/2 jogos e todos os times jogam uma vez por rodada; com número ímpar de times, um time
+folga em cada rodada. A ordem mando/visitante segue a orientação canônica de de Werra, que alterna os
+mandos e produz o mínimo de quebras (dois jogos seguidos em casa ou fora): n-2 no total.
+"""
+
+def round_robin_rounds(team_ids, double=False):
+    """Retorna a lista de rodadas; cada rodada é uma lista de (mandante, visitante).
+
+    Com `double=True` gera o returno: as mesmas rodadas com os mandos invertidos, na mesma ordem.
+    """
+    teams = list(team_ids)
+    if len(teams) < 2: return []
+    if len(teams) % 2: teams.append(None) # Folga: quem enfrenta None não joga na rodada
+    n = len(teams)
+    fixed = teams[-1]
+    rotating = teams[:-1]
+    size = n - 1
+
+    rounds = []
+    for r in range(size):
+        pairs = []
+        # Jogo do time fixo: alterna o mando a cada rodada
+        pairs.append((rotating[r], fixed) if r % 2 == 0 else (fixed, rotating[r]))
+        for i in range(1, n // 2):
+            a, b = rotating[(r + i) % size], rotating[(r - i) % size]
+            pairs.append((a, b) if i % 2 else (b, a))
+        rounds.append([(home, away) for home, away in pairs if home is not None and away is not None])
+
+    if double:
+        rounds += [[(away, home) for home, away in games] for games in rounds]
+    return rounds
+
+def schedule_matches(team_ids, double=False, first_round=1):
+    """Tabela como lista plana de (rodada, mandante, visitante), rodadas numeradas a partir de `first_round`."""
+    return [(first_round + r, home, away)
+            for r, games in enumerate(round_robin_rounds(team_ids, double=double))
+            for home, away in games]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""Representação JSON das entidades, compartilhada pela API e pelas atualizações ao vivo."""
+
+from .models import get_team
+
+def team_name(team_id):
+    team = get_team(team_id) if team_id is not None else None
+    return team.name if team else None
+
+def standings_json(standings, team_ids=None):
+    """Linhas da classificação ordenada, com a posição; `team_ids` restringe às linhas desses times."""
+    return [{"position": position, "team_id": s.team_id, "team_name": team_name(s.team_id),
+             "played": s.played, "wins": s.wins, "draws": s.draws, "losses": s.losses,
+             "goals_for": s.goals_for, "goals_against": s.goals_against, "goal_difference": s.goal_difference,
+             "points": s.points, "yellow_cards": s.yellow_cards, "red_cards": s.red_cards}
+            for position, s in enumerate(standings, 1) if team_ids is None or s.team_id in team_ids]
+
+def match_json(match):
+    return {"id": match.id, "status": match.status, "date": match.date,
+            "group_id": match.group_id, "round_number": match.round_number, "knockout_round": match.knockout_round,
+            "team1_id": match.team1_id, "team1_name": team_name(match.team1_id), "team1_score": match.team1_score,
+            "team2_id": match.team2_id, "team2_name": team_name(match.team2_id), "team2_score": match.team2_score,
+            "team1_penalties": match.team1_penalties, "team2_penalties": match.team2_penalties,
+            "next_match_id": match.next_match_id}
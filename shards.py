@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Apoio ao armazenamento em shards por competição (DATA_BACKEND=sharded).
+
+Cada competição e suas entidades (times, jogadores, grupos e partidas) formam um shard. O data_storage
+passa a usar `LazyTable`, que carrega o shard dono de um id na primeira consulta; `IdRanges` guarda no
+índice global qual competição é dona de cada id, em faixas contíguas (os ids são sequenciais).
+"""
+
+from bisect import bisect_right
+
+class IdRanges:
+    """Faixas [início, fim, competition_id] ordenadas; consulta por bisect."""
+
+    def __init__(self, ranges=()):
+        self._ranges = sorted(list(r) for r in ranges)
+        self._starts = [r[0] for r in self._ranges]
+
+    def _find(self, entity_id):
+        return bisect_right(self._starts, entity_id) - 1
+
+    def owner(self, entity_id):
+        i = self._find(entity_id)
+        if i >= 0 and self._ranges[i][1] >= entity_id:
+            return self._ranges[i][2]
+        return None
+
+    def assign(self, entity_id, owner):
+        """Registra o dono de um id, estendendo uma faixa vizinha quando possível."""
+        i = self._find(entity_id)
+        if i >= 0 and self._ranges[i][1] >= entity_id:
+            start, end, current = self._ranges[i]
+            if current == owner: return
+            # Id já pertencia a outra competição: divide a faixa
+            pieces = [p for p in ([start, entity_id - 1, current], [entity_id, entity_id, owner], [entity_id + 1, end, current])
+                      if p[0] <= p[1]]
+            self._ranges[i:i + 1] = pieces
+            self._starts[i:i + 1] = [p[0] for p in pieces]
+            return
+        previous = self._ranges[i] if i >= 0 else None
+        following = self._ranges[i + 1] if i + 1 < len(self._ranges) else None
+        if previous and previous[1] == entity_id - 1 and previous[2] == owner:
+            previous[1] = entity_id
+            if following and following[0] == entity_id + 1 and following[2] == owner:
+                previous[1] = following[1]
+                del self._ranges[i + 1], self._starts[i + 1]
+        elif following and following[0] == entity_id + 1 and following[2] == owner:
+            following[0] = entity_id
+            self._starts[i + 1] = entity_id
+        else:
+            self._ranges.insert(i + 1, [entity_id, entity_id, owner])
+            self._starts.insert(i + 1, entity_id)
+
+    def to_list(self):
+        return [list(r) for r in self._ranges]
+
+    def __len__(self):
+        return len(self._ranges)
+
+class LazyTable(dict):
+    """dict do data_storage que, ao consultar um id ausente, pede ao `loader` o shard dono dele.
+
+    Iterar (`values()`, `items()`, `len`) vê apenas as entidades já carregadas.
+    """
+
+    def __init__(self, kind, loader):
+        super().__init__()
+        self.kind = kind
+        self._loader = loader # loader(tipo, id) -> True se carregou o shard que contém o id
+
+    def __missing__(self, key):
+        if self._loader(self.kind, key) and dict.__contains__(self, key):
+            return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or (self._loader(self.kind, key) and dict.__contains__(self, key))
+
+    def get(self, key, default=None):
+        if dict.__contains__(self, key) or self._loader(self.kind, key):
+            return dict.get(self, key, default)
+        return default
+
+def entity_owner(storage, kind, entity_id):
+    """Competição dona de uma entidade carregada (None se ela não estiver em memória)."""
+    entity = dict.get(storage[kind], entity_id)
+    if entity is None: return None
+    if kind == "competitions": return entity.id
+    if kind == "players":
+        team = dict.get(storage["teams"], entity.team_id)
+        return team.competition_id if team else None
+    return entity.competition_id
+
+def shard_member_ids(storage, competition):
+    """Ids por tipo das entidades carregadas que pertencem ao shard da competição (sem carregar nada)."""
+    get = dict.get
+    teams = [t for t in competition.teams if get(storage["teams"], t) is not None]
+    groups = [g for g in competition.groups if get(storage["groups"], g) is not None]
+    matches = dict.fromkeys(competition.matches)
+    for group_id in groups:
+        matches.update(dict.fromkeys(storage["groups"][group_id].matches))
+    players = dict.fromkeys(p for t in teams for p in storage["teams"][t].players)
+    return {"competitions": [competition.id], "teams": teams, "groups": groups,
+            "matches": [m for m in matches if get(storage["matches"], m) is not None],
+            "players": [p for p in players if get(storage["players"], p) is not None]}
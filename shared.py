@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Suporte a vários processos (workers do gunicorn) compartilhando o mesmo armazenamento."""
+
+import fcntl
+import os
+from contextlib import contextmanager
+
+class ProcessLock:
+    """Trava entre processos baseada em flock sobre um arquivo `.lock`.
+
+    Reentrante dentro do processo: deve ser usada sempre com `models.data_lock` já obtida, que
+    serializa as threads do próprio processo.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._pid = None
+        self._depth = 0
+        self._shared = False
+
+    def _file(self):
+        # Descritor próprio por processo: o flock do master (gunicorn --preload) não vale para os workers
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+            self._depth = 0
+        return self._fd
+
+    def acquire(self, shared=False):
+        fd = self._file()
+        if self._depth == 0:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            self._shared = shared
+        elif self._shared and not shared:
+            raise RuntimeError("Não é possível promover uma trava compartilhada para exclusiva.")
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def hold(self, shared=False):
+        self.acquire(shared=shared)
+        try:
+            yield
+        finally:
+            self.release()
+
+def read_generation(path):
+    """Lê o número de geração gravado em `path` (0 se não existir)."""
+    try:
+        with open(path, "r", encoding="ascii") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def write_generation(path, generation):
+    """Grava o número de geração de forma atômica (arquivo temporário + rename)."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="ascii") as f:
+        f.write(str(generation))
+    os.replace(tmp_path, path)
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""Probabilidades de classificação por simulação de Monte Carlo das partidas restantes.
+
+Os gols de cada partida agendada são sorteados de uma Poisson com média pela força dos times (ataque e
+defesa pelos gols pró/contra até agora, puxados para a média da competição enquanto há poucos jogos). Cada
+simulação soma os resultados à classificação atual e ordena com os mesmos critérios de `sort_standings`:
+pontos, confronto direto (mini-liga repetida entre os que continuam empatados), saldo, gols pró, vermelhos,
+amarelos e a ordem original. Cartões não são simulados (ficam os atuais).
+
+Com NumPy as simulações rodam em lotes vetorizados (SIMULATION_RUNS, padrão 20000); sem NumPy cada
+simulação usa o próprio `sort_standings` (SIMULATION_RUNS_FALLBACK, padrão 2000). O resultado fica em cache
+pelo estado do grupo (classificação e partidas restantes). A simulação leva dezenas de ms: só a API
+(/api/competition/<id>/odds) a executa; a página da competição busca as probabilidades depois de carregar.
+"""
+
+import hashlib
+import math
+import os
+import random
+from dataclasses import dataclass, replace
+from typing import Dict, List
+
+
+from .models import get_group_matches, get_competition_matches
+from .cache import view_cache
+from .standings import apply_snapshot, ensure_standings, sort_standings
+from .knockout import QUALIFY_PER_GROUP
+
+SIMULATION_RUNS = int(os.environ.get("SIMULATION_RUNS", "20000")) # Simulações com NumPy
+SIMULATION_RUNS_FALLBACK = int(os.environ.get("SIMULATION_RUNS_FALLBACK", "2000")) # Simulações sem NumPy
+SIMULATION_BATCH = 5000 # Simulações por lote vetorizado (limita a memória das matrizes de confronto direto)
+DEFAULT_GOALS = 1.3 # Gols por time por jogo quando ainda não há resultados
+PRIOR_GAMES = 2 # Jogos "fictícios" na média da competição somados a cada time (suaviza o início)
+
+@dataclass(slots=True)
+class QualificationOdds:
+    runs: int
+    positions: Dict[int, List[float]] # team_id -> probabilidade de terminar em cada posição (1ª, 2ª, ...)
+    qualify: Dict[int, float] # team_id -> probabilidade de ficar entre os `qualify_count` primeiros
+    remaining: int # Partidas simuladas
+
+# --- Modelo de Gols ---
+
+def expected_goals(standings_dict, fixtures):
+    """Média de gols (mandante, visitante) de cada partida restante pela força atual dos times."""
+    played = sum(s.played for s in standings_dict.values())
+    mean = sum(s.goals_for for s in standings_dict.values()) / played if played else DEFAULT_GOALS
+    mean = max(mean, 0.1)
+    def rate(goals, s): return (goals + PRIOR_GAMES * mean) / (s.played + PRIOR_GAMES)
+    rates = []
+    for team1_id, team2_id in fixtures:
+        s1, s2 = standings_dict[team1_id], standings_dict[team2_id]
+        rates.append((min(max(rate(s1.goals_for, s1) * rate(s2.goals_against, s2) / mean, 0.1), 6.0),
+                      min(max(rate(s2.goals_for, s2) * rate(s1.goals_against, s1) / mean, 0.1), 6.0)))
+    return rates
+
+def remaining_fixtures(standings_dict, matches):
+    """(mandante, visitante) das partidas ainda não finalizadas entre times da classificação."""
+    return [(m.team1_id, m.team2_id) for m in matches
+            if m.status != "finished" and m.team1_id in standings_dict and m.team2_id in standings_dict]
+
+def simulation_state(standings_dict, fixtures):
+    """Tudo o que determina o resultado da simulação (chave de cache e semente)."""
+    return (tuple(fixtures), tuple((s.team_id, s.points, s.goals_for, s.goals_against, s.red_cards, s.yellow_cards,
+                                    tuple(sorted((k, tuple(v)) for k, v in s.head_to_head.items())))
+                                   for s in standings_dict.values()))
+
+def _seed(state):
+    """Semente derivada do estado: a mesma classificação gera sempre as mesmas probabilidades."""
+    return int.from_bytes(hashlib.sha1(repr(state).encode("utf-8")).digest()[:8], "big")
+
+# --- Simulação Vetorizada (NumPy) ---
+
+np = None # Importado na primeira simulação (a importação custa dezenas de ms na inicialização do worker)
+_numpy_checked = False
+
+def _numpy():
+    """O módulo numpy, ou None se não estiver instalado (dependência opcional: simulação em Python puro)."""
+    global np, _numpy_checked
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            np = None
+    return np
+
+def _rank_batch(points, goal_difference, goals_for, pair_points, pair_goals, red, yellow):
+    """Ordem final de cada simulação ([simulação, posição] -> índice do time), critérios de `sort_standings`.
+
+    `pair_points[s, i, j]`/`pair_goals[s, i, j]`: pontos/gols de i contra j. Mini-ligas: `tied[s, i, j]` diz
+    se j está no grupo de empate de i; o confronto direto é recalculado enquanto separar alguém.
+    """
+    size = points.shape[1]
+    pair_conceded = pair_goals.transpose(0, 2, 1)
+    tied = points[:, :, None] == points[:, None, :]
+    head_to_head_keys = []
+    for _ in range(size):
+        weights = tied.astype(pair_points.dtype)
+        h2h_points = np.einsum("sij,sij->si", pair_points, weights)
+        h2h_goals = np.einsum("sij,sij->si", pair_goals, weights)
+        h2h_difference = h2h_goals - np.einsum("sij,sij->si", pair_conceded, weights)
+        head_to_head_keys += [-h2h_points, -h2h_difference, -h2h_goals]
+        still_tied = tied
+        for key in (h2h_points, h2h_difference, h2h_goals):
+            still_tied = still_tied & (key[:, :, None] == key[:, None, :])
+        if np.array_equal(still_tied, tied): break
+        tied = still_tied
+    keys = [-points, *head_to_head_keys, -goal_difference, -goals_for,
+            np.broadcast_to(red, points.shape), np.broadcast_to(yellow, points.shape),
+            np.broadcast_to(np.arange(size), points.shape)] # Empate total: ordem original (sort estável)
+    return np.lexsort(keys[::-1], axis=-1) # lexsort usa a última chave como principal
+
+def _simulate_numpy(standings_dict, fixtures, rates, runs, seed):
+    """Contagens [time, posição] de `runs` simulações, em lotes."""
+    team_ids = list(standings_dict)
+    size = len(team_ids)
+    index = {team_id: i for i, team_id in enumerate(team_ids)}
+    rows = list(standings_dict.values())
+    # Valores inteiros em float64: produtos de matrizes pelo BLAS, exatos para estas grandezas
+    base_points = np.array([s.points for s in rows], dtype=np.float64)
+    base_gf = np.array([s.goals_for for s in rows], dtype=np.float64)
+    base_ga = np.array([s.goals_against for s in rows], dtype=np.float64)
+    red = np.array([s.red_cards for s in rows])
+    yellow = np.array([s.yellow_cards for s in rows])
+    h2h_points = np.zeros((size, size)) # [i, j] = pontos de i contra j
+    h2h_goals = np.zeros((size, size)) # [i, j] = gols de i contra j
+    for i, s in enumerate(rows):
+        for opponent_id, (_, points, goals_for, _) in s.head_to_head.items():
+            if opponent_id in index:
+                h2h_points[i, index[opponent_id]] = points
+                h2h_goals[i, index[opponent_id]] = goals_for
+    # Incidência partida -> time e partida -> par (i, j): somas por time e confrontos diretos viram produtos de matrizes
+    matches = len(fixtures)
+    home = [index[team1_id] for team1_id, _ in fixtures]
+    away = [index[team2_id] for _, team2_id in fixtures]
+    home_onehot = np.zeros((matches, size)); home_onehot[np.arange(matches), home] = 1
+    away_onehot = np.zeros((matches, size)); away_onehot[np.arange(matches), away] = 1
+    pair_home = np.zeros((matches, size * size)); pair_home[np.arange(matches), [h * size + a for h, a in zip(home, away)]] = 1
+    pair_away = np.zeros((matches, size * size)); pair_away[np.arange(matches), [a * size + h for h, a in zip(home, away)]] = 1
+    lam = np.array(rates, dtype=np.float64) # [partida, (mandante, visitante)]
+
+    rng = np.random.default_rng(seed)
+    counts = np.zeros((size, size), dtype=np.int64)
+    done = 0
+    while done < runs:
+        batch = min(SIMULATION_BATCH, runs - done)
+        goals1 = rng.poisson(lam[:, 0], size=(batch, matches)).astype(np.float64)
+        goals2 = rng.poisson(lam[:, 1], size=(batch, matches)).astype(np.float64)
+        points1 = np.where(goals1 > goals2, 3.0, np.where(goals1 == goals2, 1.0, 0.0))
+        points2 = np.where(goals2 > goals1, 3.0, np.where(goals1 == goals2, 1.0, 0.0))
+
+        points = base_points + points1 @ home_onehot + points2 @ away_onehot # [simulação, time]
+        goals_for = base_gf + goals1 @ home_onehot + goals2 @ away_onehot
+        goals_against = base_ga + goals2 @ home_onehot + goals1 @ away_onehot
+        pair_points = (h2h_points + (points1 @ pair_home + points2 @ pair_away).reshape(batch, size, size))
+        pair_goals = (h2h_goals + (goals1 @ pair_home + goals2 @ pair_away).reshape(batch, size, size))
+        ranking = _rank_batch(points, goals_for - goals_against, goals_for, pair_points, pair_goals, red, yellow)
+        counts += np.bincount((ranking * size + np.arange(size)).ravel(), minlength=size * size).reshape(size, size)
+        done += batch
+    return team_ids, counts
+
+# --- Simulação em Python Puro (sem NumPy) ---
+
+def _poisson(rng, lam):
+    """Sorteio de Poisson (método de Knuth; médias pequenas, como gols)."""
+    limit, k, p = math.exp(-lam), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit: return k
+        k += 1
+
+def _simulate_python(standings_dict, fixtures, rates, runs, seed, competition_id, group_id):
+    team_ids = list(standings_dict)
+    position_of = {team_id: i for i, team_id in enumerate(team_ids)}
+    counts = [[0] * len(team_ids) for _ in team_ids]
+    rng = random.Random(seed)
+    for _ in range(runs):
+        table = {team_id: replace(s, head_to_head={k: list(v) for k, v in s.head_to_head.items()})
+                 for team_id, s in standings_dict.items()}
+        for (team1_id, team2_id), (lam1, lam2) in zip(fixtures, rates):
+            apply_snapshot(table, (team1_id, team2_id, _poisson(rng, lam1), _poisson(rng, lam2), ()), 1)
+        for position, s in enumerate(sort_standings(table, competition_id, group_id)):
+            counts[position_of[s.team_id]][position] += 1
+    return team_ids, counts
+
+# --- Consulta ---
+
+def simulate_standings(standings_dict, fixtures, competition_id, group_id=None, runs=None, qualify_count=QUALIFY_PER_GROUP):
+    """Simula as partidas `fixtures` ((mandante, visitante)) sobre a classificação atual. Retorna QualificationOdds."""
+    if not fixtures:
+        ordered = [s.team_id for s in sort_standings(standings_dict, competition_id, group_id)]
+        positions = {team_id: [float(p == position) for p in range(len(ordered))] for position, team_id in enumerate(ordered)}
+        return QualificationOdds(runs=0, positions=positions, remaining=0,
+                                 qualify={team_id: float(position < qualify_count) for position, team_id in enumerate(ordered)})
+    rates = expected_goals(standings_dict, fixtures)
+    seed = _seed(simulation_state(standings_dict, fixtures))
+    if _numpy() is not None:
+        runs = runs or SIMULATION_RUNS
+        team_ids, counts = _simulate_numpy(standings_dict, fixtures, rates, runs, seed)
+        counts = counts.tolist()
+    else:
+        runs = runs or SIMULATION_RUNS_FALLBACK
+        team_ids, counts = _simulate_python(standings_dict, fixtures, rates, runs, seed, competition_id, group_id)
+    positions = {team_id: [count / runs for count in row] for team_id, row in zip(team_ids, counts)}
+    return QualificationOdds(runs=runs, positions=positions, remaining=len(fixtures),
+                             qualify={team_id: sum(row[:qualify_count]) for team_id, row in positions.items()})
+
+def qualification_odds(competition, group_id=None):
+    """Probabilidades do grupo (ou da classificação geral de pontos corridos); None se não houver classificação.
+
+    Em cache pelo estado do próprio grupo: um resultado em outro grupo não refaz esta simulação. Requisições
+    simultâneas para o mesmo estado esperam a simulação em andamento em vez de repeti-la.
+    """
+    standings = ensure_standings(competition.id, group_id=group_id, save=False)
+    if not standings: return None
+    if competition.format == "groups_knockout":
+        matches = get_group_matches(group_id)
+    else:
+        matches = get_competition_matches(competition.id)
+    fixtures = remaining_fixtures(standings, matches)
+    return view_cache.get_or_build_shared((competition.id, ("qualification", group_id)), simulation_state(standings, fixtures),
+                                          lambda: simulate_standings(standings, fixtures, competition.id, group_id))
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Snapshot binário do data_storage para a inicialização rápida dos workers (backend JSON).
+
+Carregar o data.json exige decodificar o JSON e recriar cada dataclass. O snapshot guarda o grafo de
+objetos já montado (pickle) ao lado do arquivo de dados (`data.json.snapshot`) e é gravado na primeira carga
+depois de cada alteração do data.json: só o primeiro worker após uma gravação paga a carga completa (ou
+nenhum, com `flask --app src.main build-snapshot` no deploy).
+
+Formato: cabeçalho mágico, SHA-1 do restante e dois pickles em sequência: a chave (versão do data.json no
+disco e campos das dataclasses) e o data_storage. Arquivo truncado, corrompido, de outra versão dos dados ou
+de outro esquema é ignorado e a carga volta ao JSON. Como qualquer pickle, só deve ser lido de um diretório
+confiável (o mesmo do data.json).
+"""
+
+import gc
+import hashlib
+import io
+import os
+import pickle
+
+_MAGIC = b"TSSNAP1\n"
+_HEADER_SIZE = len(_MAGIC) + hashlib.sha1().digest_size
+
+def read_snapshot(path, key):
+    """Objetos gravados por `write_snapshot` com a mesma `key`, ou None (ausente, inválido ou desatualizado)."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        print(f"Aviso: falha ao ler o snapshot {path}: {e}. Carregando do arquivo de dados.")
+        return None
+    payload = memoryview(data)[_HEADER_SIZE:]
+    if not data.startswith(_MAGIC) or hashlib.sha1(payload).digest() != data[len(_MAGIC):_HEADER_SIZE]:
+        print(f"Aviso: snapshot {path} inválido (checksum). Carregando do arquivo de dados.")
+        return None
+    stream = io.BytesIO(payload)
+    gc_enabled = gc.isenabled()
+    gc.disable() # Milhares de objetos novos: sem coletas do GC no meio da carga
+    try:
+        if pickle.load(stream) != key:
+            return None # Dados ou esquema mudaram desde a gravação do snapshot
+        return pickle.load(stream)
+    except Exception as e: # Classe renomeada/removida, pickle de outra versão do Python...
+        print(f"Aviso: snapshot {path} ilegível ({e}). Carregando do arquivo de dados.")
+        return None
+    finally:
+        if gc_enabled: gc.enable()
+
+def write_snapshot(path, key, objects):
+    """Grava o snapshot (arquivo temporário + rename). Retorna o tamanho em bytes, ou None em caso de falha.
+
+    Sem fsync: uma queda que deixe o arquivo incompleto é detectada pelo checksum na próxima carga.
+    """
+    try:
+        payload = pickle.dumps(key, pickle.HIGHEST_PROTOCOL) + pickle.dumps(objects, pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError) as e:
+        print(f"Aviso: falha ao serializar o snapshot: {e}")
+        return None
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC + hashlib.sha1(payload).digest())
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Aviso: falha ao gravar o snapshot {path}: {e}")
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        return None
+    return _HEADER_SIZE + len(payload)
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""Motor de classificação: aplicação incremental de resultados e recálculo completo (verificação/reparo)."""
+
+from .models import (
+    save_data, touch, Standing,
+    get_competition, get_team, get_group,
+    get_competition_matches, get_group_matches
+)
+from .metrics import timed, STANDINGS_SECONDS, STANDINGS_RECOMPUTES, STANDINGS_DELTAS
+
+CARD_EVENTS = ("yellow_card", "red_card")
+
+# --- Estado da Partida que Afeta a Classificação ---
+
+def result_snapshot(match):
+    """Captura o que a partida contribui para a classificação (None se não finalizada).
+
+    Deve ser chamada ANTES de alterar a partida, para que o delta possa subtrair a contribuição antiga.
+    """
+    if match.status != "finished" or match.team1_score is None or match.team2_score is None:
+        return None
+    cards = tuple((e.team_id, e.event_type) for e in match.events if e.event_type in CARD_EVENTS)
+    return (match.team1_id, match.team2_id, match.team1_score, match.team2_score, cards)
+
+def empty_standings(team_ids, competition_id, group_id=None):
+    """Cria linhas zeradas de classificação para os times informados."""
+    return {team_id: Standing(team_id, competition_id, group_id=group_id) for team_id in team_ids}
+
+def _touch_owner(competition, group_id=None):
+    """Marca como alterada a entidade dona do dict de standings (grupo ou competição)."""
+    if competition.format == "groups_knockout" and group_id:
+        touch("groups", group_id)
+    else:
+        touch("competitions", competition.id)
+
+def target_standings(competition, group_id=None):
+    """Retorna o dict de standings afetado por uma partida do grupo/competição (None se não houver)."""
+    if competition.format == "groups_knockout" and group_id:
+        group = get_group(group_id)
+        return group.standings if group else None
+    elif competition.format == "round_robin":
+        return competition.standings
+    return None # Partidas de mata-mata não afetam classificação
+
+def _apply_head_to_head(standing, opponent_id, sign, points, goals_for, goals_against):
+    """Atualiza a linha da matriz de confrontos diretos do time contra um adversário."""
+    row = standing.head_to_head.setdefault(opponent_id, [0, 0, 0, 0])
+    row[0] += sign; row[1] += sign * points; row[2] += sign * goals_for; row[3] += sign * goals_against
+    if row[0] <= 0: del standing.head_to_head[opponent_id] # Mantém igual ao recálculo completo
+
+def apply_snapshot(standings, snapshot, sign):
+    """Soma (sign=1) ou subtrai (sign=-1) a contribuição de uma partida nas duas linhas afetadas."""
+    team1_id, team2_id, score1, score2, cards = snapshot
+    s1 = standings.get(team1_id)
+    s2 = standings.get(team2_id)
+    if s1 and s2:
+        s1.played += sign
+        s2.played += sign
+        s1.goals_for += sign * score1
+        s1.goals_against += sign * score2
+        s2.goals_for += sign * score2
+        s2.goals_against += sign * score1
+        s1.goal_difference = s1.goals_for - s1.goals_against
+        s2.goal_difference = s2.goals_for - s2.goals_against
+
+        if score1 > score2:
+            s1.points += sign * 3; s1.wins += sign; s2.losses += sign
+            points1, points2 = 3, 0
+        elif score1 < score2:
+            s2.points += sign * 3; s2.wins += sign; s1.losses += sign
+            points1, points2 = 0, 3
+        else:
+            s1.points += sign; s2.points += sign; s1.draws += sign; s2.draws += sign
+            points1 = points2 = 1
+        _apply_head_to_head(s1, team2_id, sign, points1, score1, score2)
+        _apply_head_to_head(s2, team1_id, sign, points2, score2, score1)
+    else:
+        print(f"Aviso: Partida {team1_id} x {team2_id} finalizada mas um dos times não está nos standings relevantes.")
+
+    for team_id, event_type in cards:
+        standing = standings.get(team_id)
+        if not standing: continue
+        if event_type == "yellow_card": standing.yellow_cards += sign
+        elif event_type == "red_card": standing.red_cards += sign
+
+def apply_result_delta(match, previous):
+    """Atualiza a classificação após registrar/editar uma partida, aplicando apenas o delta.
+
+    `previous` é o `result_snapshot` da partida antes da alteração. Se a classificação estiver
+    incompleta (time sem linha), cai no recálculo completo como reparo.
+    Retorna True se alguma classificação foi alterada (o chamador é responsável por salvar).
+    """
+    competition = get_competition(match.competition_id)
+    if not competition: return False
+    group_id = match.group_id if competition.format == "groups_knockout" else None
+    standings = target_standings(competition, group_id)
+    if standings is None: return False
+
+    current = result_snapshot(match)
+    if previous == current: return False
+    if match.team1_id not in standings or match.team2_id not in standings:
+        calculate_standings(competition.id, group_id=group_id, save=False)
+        return True
+    if previous: apply_snapshot(standings, previous, -1)
+    if current: apply_snapshot(standings, current, 1)
+    STANDINGS_DELTAS.inc()
+    _touch_owner(competition, group_id)
+    return True
+
+# --- Recálculo Completo (Verificação/Reparo) ---
+
+def _compute_standings(competition_id, group_id=None):
+    """Recalcula do zero a classificação varrendo todas as partidas. Retorna um novo dict (ou None)."""
+    competition = get_competition(competition_id)
+    if not competition: return None
+
+    if competition.format == "groups_knockout" and group_id:
+        group = get_group(group_id)
+        if not group: return None
+        relevant_matches = get_group_matches(group_id)
+        relevant_teams = group.teams
+    elif competition.format == "round_robin":
+        group_id = None
+        relevant_matches = get_competition_matches(competition_id)
+        relevant_teams = competition.teams
+    else:
+        return None # Formato inválido ou grupo não especificado quando necessário
+
+    existing_teams = []
+    for team_id in relevant_teams:
+        if get_team(team_id):
+            existing_teams.append(team_id)
+        else:
+            print(f"Aviso: Time ID {team_id} não encontrado ao inicializar standings (competição {competition_id}, grupo {group_id}).")
+    standings = empty_standings(existing_teams, competition_id, group_id=group_id)
+
+    for match in relevant_matches:
+        snapshot = result_snapshot(match)
+        if snapshot: apply_snapshot(standings, snapshot, 1)
+    return standings
+
+def calculate_standings(competition_id, group_id=None, save=True):
+    """Recalcula a classificação de um grupo ou geral (round-robin) do zero.
+
+    Uso normal é incremental (`apply_result_delta`); este recálculo completo é o modo de reparo.
+    """
+    with timed(STANDINGS_SECONDS, "standings", operation="recompute"):
+        standings = _compute_standings(competition_id, group_id)
+    if standings is None: return
+    STANDINGS_RECOMPUTES.inc()
+    competition = get_competition(competition_id)
+    if competition.format == "groups_knockout":
+        get_group(group_id).standings = standings
+    else:
+        competition.standings = standings
+    _touch_owner(competition, group_id)
+    if save:
+        save_data() # Salva os standings atualizados
+
+def ensure_standings(competition_id, group_id=None, save=True):
+    """Garante que a classificação tem linha para todos os times; recalcula (reparo) apenas se faltar alguma."""
+    competition = get_competition(competition_id)
+    if not competition: return None
+    standings = target_standings(competition, group_id)
+    if standings is None: return None
+    teams = get_group(group_id).teams if competition.format == "groups_knockout" else competition.teams
+    # Linhas gravadas antes da matriz de confrontos diretos têm jogos mas nenhum confronto: também recalcula
+    if (any(team_id not in standings for team_id in teams if get_team(team_id))
+            or any(s.played and not s.head_to_head for s in standings.values())):
+        calculate_standings(competition_id, group_id=group_id, save=save)
+        standings = target_standings(competition, group_id)
+    return standings
+
+def verify_standings(competition_id, group_id=None, repair=False):
+    """Compara a classificação armazenada com um recálculo completo.
+
+    Retorna a lista de team_ids divergentes. Com repair=True, substitui a classificação pelo recálculo.
+    """
+    competition = get_competition(competition_id)
+    expected = _compute_standings(competition_id, group_id)
+    if not competition or expected is None: return []
+    stored = target_standings(competition, group_id) or {}
+    mismatched = sorted(team_id for team_id in set(expected) | set(stored)
+                        if expected.get(team_id) != stored.get(team_id))
+    if mismatched and repair:
+        calculate_standings(competition_id, group_id=group_id)
+    return mismatched
+
+# --- Ordenação ---
+
+def _head_to_head_key(standings_dict, team_ids):
+    """Mini-liga entre times empatados: (pontos, saldo, gols pró) só nos jogos entre eles, negados para o sort.
+
+    Se a mini-liga desempata só parte do grupo, repete o critério entre os que continuam empatados.
+    Retorna team_id -> tupla de desempate.
+    """
+    tied = set(team_ids)
+    keys = {}
+    for team_id in team_ids:
+        points = goals_for = goals_against = 0
+        for opponent_id, (_, pts, gf, ga) in standings_dict[team_id].head_to_head.items():
+            if opponent_id in tied:
+                points += pts; goals_for += gf; goals_against += ga
+        keys[team_id] = ((-points, goals_against - goals_for, -goals_for),)
+    for subgroup in _tied_groups(team_ids, keys):
+        if 1 < len(subgroup) < len(team_ids):
+            for team_id, key in _head_to_head_key(standings_dict, subgroup).items():
+                keys[team_id] += key
+    return keys
+
+def _tied_groups(team_ids, keys):
+    """Agrupa os times com a mesma chave (na ordem de entrada)."""
+    groups = {}
+    for team_id in team_ids:
+        groups.setdefault(keys[team_id], []).append(team_id)
+    return groups.values()
+
+def sort_standings(standings_dict, competition_id, group_id=None):
+    """Ordena a classificação (de grupo ou geral) usando critérios de desempate.
+
+    Critérios: 1. Pontos; 2. Confronto direto (mini-liga entre os empatados em pontos: pontos, saldo e
+    gols pró); 3. Saldo de gols; 4. Gols pró; 5. Menos cartões vermelhos; 6. Menos cartões amarelos.
+    Sorteio não implementado (empate total mantém a ordem de inserção).
+    """
+    with timed(STANDINGS_SECONDS, "standings", operation="sort"):
+        by_points = {team_id: (-s.points,) for team_id, s in standings_dict.items()}
+        head_to_head = {}
+        for tied in _tied_groups(list(standings_dict), by_points):
+            if len(tied) > 1:
+                head_to_head.update(_head_to_head_key(standings_dict, tied))
+
+        def sort_key(s):
+            return (-s.points, head_to_head.get(s.team_id, ()), -s.goal_difference, -s.goals_for,
+                    s.red_cards, s.yellow_cards)
+
+        return sorted(standings_dict.values(), key=sort_key)
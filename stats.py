@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""Estatísticas materializadas da competição: artilharia, disciplina e goleiros (gols sofridos).
+
+Os totais por jogador (`Player.competition_stats`) e por time (`Team.competition_stats`) são mantidos
+incrementalmente ao registrar/corrigir/remover resultados. As tabelas ficam em listas já ordenadas por
+competição (`Leaderboard`), atualizadas no caminho de escrita e consultadas com `top_scorers`,
+`discipline_table` e `goalkeeper_table` sob uma trava própria (nunca a trava de escrita `models.data_lock`).
+Competições gravadas antes dos totais materializados os recebem na primeira alteração; até lá, as tabelas
+vêm de um recálculo que não altera os dados.
+"""
+
+import threading
+from bisect import bisect_left, insort
+
+from . import models
+from .models import (
+    touch, data_storage,
+    get_competition, get_team, get_player, get_match,
+    get_competition_teams, get_team_players, get_matches_by_status
+)
+from .metrics import STATS_REBUILDS
+
+PLAYER_COUNTERS = {"goal": "goals", "yellow_card": "yellow_cards", "red_card": "red_cards"}
+
+def empty_player_stats():
+    return {"goals": 0, "yellow_cards": 0, "red_cards": 0}
+
+def empty_team_stats():
+    return {"goals_conceded": 0, "matches_played": 0}
+
+# --- Estado da Partida que Afeta as Estatísticas ---
+
+def stats_snapshot(match):
+    """Captura o que a partida contribui para as estatísticas (None se não finalizada).
+
+    Deve ser chamada ANTES de alterar a partida, para que o delta possa subtrair a contribuição antiga.
+    """
+    if match.status != "finished" or match.team1_score is None or match.team2_score is None:
+        return None
+    events = tuple((e.player_id, e.event_type) for e in match.events if e.event_type in PLAYER_COUNTERS)
+    return (match.team1_id, match.team2_id, match.team1_score, match.team2_score, events)
+
+def _apply_snapshot(competition_id, snapshot, sign, player_totals, team_totals):
+    """Soma (sign=1) ou subtrai (sign=-1) a contribuição de uma partida nos totais informados.
+
+    `player_totals`/`team_totals` são dicts id -> totais (criados sob demanda); retorna os ids alterados.
+    """
+    team1_id, team2_id, score1, score2, events = snapshot
+    changed_players, changed_teams = set(), set()
+    for team_id, conceded in ((team1_id, score2), (team2_id, score1)):
+        if team_id is None: continue
+        totals = team_totals(team_id)
+        if totals is None: continue
+        totals["goals_conceded"] += sign * conceded
+        totals["matches_played"] += sign
+        changed_teams.add(team_id)
+    for player_id, event_type in events:
+        totals = player_totals(player_id)
+        if totals is None: continue
+        totals[PLAYER_COUNTERS[event_type]] += sign
+        changed_players.add(player_id)
+    return changed_players, changed_teams
+
+def _stored_totals(table, competition_id, empty):
+    """Acessa os totais materializados da entidade (None se ela não existir).
+
+    Na primeira alteração troca o dict por uma cópia em vez de alterá-lo no lugar: as tabelas ordenadas e os
+    leitores (sem a trava de escrita) continuam com o dict anterior até `_update_boards` publicar o novo.
+    """
+    copied = set()
+    def totals(entity_id):
+        entity = table.get(entity_id)
+        if entity is None: return None
+        if entity_id not in copied:
+            copied.add(entity_id)
+            entity.competition_stats[competition_id] = dict(entity.competition_stats.get(competition_id) or empty())
+        return entity.competition_stats[competition_id]
+    return totals
+
+def _apply_to_storage(competition, snapshot, sign):
+    players, teams = _apply_snapshot(competition.id, snapshot, sign,
+                                     _stored_totals(data_storage["players"], competition.id, empty_player_stats),
+                                     _stored_totals(data_storage["teams"], competition.id, empty_team_stats))
+    touch("players", *players)
+    touch("teams", *teams)
+    _update_boards(competition, players, teams)
+
+def apply_stats_delta(match, previous):
+    """Atualiza os totais após registrar/editar uma partida, aplicando apenas o delta.
+
+    `previous` é o `stats_snapshot` da partida antes da alteração. Se a competição ainda não tiver os
+    totais materializados, faz o recálculo completo (que já inclui o novo resultado).
+    Retorna True se algo foi alterado (o chamador é responsável por salvar).
+    """
+    competition = get_competition(match.competition_id)
+    if not competition: return False
+    if not competition.stats_ready:
+        rebuild_competition_stats(competition)
+        return True
+    current = stats_snapshot(match)
+    if previous == current: return False
+    if previous: _apply_to_storage(competition, previous, -1)
+    if current: _apply_to_storage(competition, current, 1)
+    return True
+
+def discard_match_stats(match_id):
+    """Subtrai a contribuição de uma partida que será removida (chamar antes de `delete_match`)."""
+    match = get_match(match_id)
+    competition = get_competition(match.competition_id) if match else None
+    if not competition or not competition.stats_ready: return False
+    previous = stats_snapshot(match)
+    if not previous: return False
+    _apply_to_storage(competition, previous, -1)
+    return True
+
+# --- Recálculo Completo (Verificação/Reparo) ---
+
+def _compute_stats(competition_id):
+    """Recalcula do zero os totais varrendo as partidas finalizadas. Retorna (jogadores, times)."""
+    player_stats, team_stats = {}, {}
+    def player_totals(player_id):
+        if player_id not in player_stats:
+            if not get_player(player_id): return None
+            player_stats[player_id] = empty_player_stats()
+        return player_stats[player_id]
+    def team_totals(team_id):
+        if team_id not in team_stats:
+            if not get_team(team_id): return None
+            team_stats[team_id] = empty_team_stats()
+        return team_stats[team_id]
+    for match in get_matches_by_status(competition_id, "finished"):
+        snapshot = stats_snapshot(match)
+        if snapshot: _apply_snapshot(competition_id, snapshot, 1, player_totals, team_totals)
+    return player_stats, team_stats
+
+def _stored_stats(competition_id):
+    """Totais materializados atualmente (apenas entidades com entrada para a competição)."""
+    def collect(table):
+        return {entity_id: entity.competition_stats[competition_id]
+                for entity_id, entity in table.items() if competition_id in entity.competition_stats}
+    return collect(data_storage["players"]), collect(data_storage["teams"])
+
+def rebuild_competition_stats(competition):
+    """Substitui os totais materializados da competição pelo recálculo completo (o chamador salva)."""
+    competition_id = competition.id
+    STATS_REBUILDS.inc()
+    player_stats, team_stats = _compute_stats(competition_id)
+    stored_players, stored_teams = _stored_stats(competition_id)
+    for table, kind, fresh, stored in ((data_storage["players"], "players", player_stats, stored_players),
+                                       (data_storage["teams"], "teams", team_stats, stored_teams)):
+        for entity_id in set(stored) - set(fresh):
+            del table[entity_id].competition_stats[competition_id]
+            touch(kind, entity_id)
+        for entity_id, totals in fresh.items():
+            if stored.get(entity_id) != totals:
+                table[entity_id].competition_stats[competition_id] = totals
+                touch(kind, entity_id)
+    if not competition.stats_ready:
+        competition.stats_ready = True
+        touch("competitions", competition_id)
+    with _boards_lock:
+        _boards[competition_id] = _build_boards(competition)
+
+def _nonzero(totals):
+    return {k: v for k, v in totals.items() if v}
+
+def verify_competition_stats(competition_id, repair=False):
+    """Compara os totais materializados com um recálculo completo.
+
+    Retorna (player_ids, team_ids) divergentes. Com repair=True, substitui os totais pelo recálculo.
+    """
+    competition = get_competition(competition_id)
+    if not competition: return [], []
+    expected_players, expected_teams = _compute_stats(competition_id)
+    stored_players, stored_teams = _stored_stats(competition_id)
+    def diff(expected, stored):
+        return sorted(entity_id for entity_id in set(expected) | set(stored)
+                      if _nonzero(expected.get(entity_id, {})) != _nonzero(stored.get(entity_id, {})))
+    players, teams = diff(expected_players, stored_players), diff(expected_teams, stored_teams)
+    if (players or teams or not competition.stats_ready) and repair:
+        rebuild_competition_stats(competition)
+    return players, teams
+
+# --- Tabelas Ordenadas ---
+
+class Leaderboard:
+    """Lista mantida ordenada (bisect): reposicionar um item custa O(log n) na busca e a consulta top-N é uma fatia."""
+
+    def __init__(self):
+        self._entries = [] # [(*chave, item_id)] em ordem crescente
+        self._positions = {} # item_id -> entrada atual
+
+    def update(self, item_id, key):
+        """Reposiciona o item com a nova chave de ordenação; key=None tira o item da tabela."""
+        old = self._positions.pop(item_id, None)
+        if old is not None:
+            del self._entries[bisect_left(self._entries, old)]
+        if key is not None:
+            entry = (*key, item_id)
+            insort(self._entries, entry)
+            self._positions[item_id] = entry
+
+    def top(self, n=None):
+        """Ids dos n primeiros (todos se n for None)."""
+        entries = self._entries if n is None else self._entries[:n]
+        return [entry[-1] for entry in entries]
+
+    def __len__(self):
+        return len(self._entries)
+
+def _scorer_key(totals):
+    return (-totals["goals"],) if totals.get("goals", 0) > 0 else None
+
+def _discipline_key(totals):
+    red, yellow = totals.get("red_cards", 0), totals.get("yellow_cards", 0)
+    return (-red, -yellow) if red > 0 or yellow > 0 else None
+
+def _goalkeeper_key(totals):
+    played = totals.get("matches_played", 0)
+    if played <= 0: return None
+    return (totals["goals_conceded"] / played, totals["goals_conceded"])
+
+class CompetitionBoards:
+    """Tabelas ordenadas de uma competição, com os totais que as ordenam (os próprios dicts de
+    `competition_stats`, sem cópia: o caminho de escrita nunca os altera no lugar, ver `_stored_totals`).
+
+    Montadas e atualizadas no caminho de escrita (que já segura `models.data_lock`); leitores só precisam de
+    `_boards_lock`. Válidas enquanto outro worker não recarregar os dados (`reload_count`).
+    """
+
+    def __init__(self, reload_count, player_totals, team_totals):
+        self.reload_count = reload_count
+        self.scorers = Leaderboard()
+        self.discipline = Leaderboard()
+        self.goalkeepers = Leaderboard()
+        self.player_totals = {} # player_id -> totais (só de quem está em alguma tabela)
+        self.team_totals = {}
+        for player_id, totals in player_totals.items():
+            self.update_player(player_id, totals)
+        for team_id, totals in team_totals.items():
+            self.update_team(team_id, totals)
+
+    def update_player(self, player_id, totals):
+        scorer_key, discipline_key = _scorer_key(totals), _discipline_key(totals)
+        self.scorers.update(player_id, scorer_key)
+        self.discipline.update(player_id, discipline_key)
+        if scorer_key or discipline_key: self.player_totals[player_id] = totals
+        else: self.player_totals.pop(player_id, None) # Fora das tabelas: ninguém consulta
+
+    def update_team(self, team_id, totals):
+        key = _goalkeeper_key(totals)
+        self.goalkeepers.update(team_id, key)
+        if key: self.team_totals[team_id] = totals
+        else: self.team_totals.pop(team_id, None)
+
+_NO_TOTALS = {} # Entidade sem totais na competição (somente leitura; evita um dict vazio por jogador)
+
+_boards = {} # competition_id -> CompetitionBoards
+_boards_lock = threading.Lock() # Protege _boards e as tabelas; nunca a trava de escrita nas consultas
+
+def _build_boards(competition):
+    """Monta as tabelas pelos totais materializados (ou por um recálculo sem gravar, se ainda não houver)."""
+    reload_count = models.reload_count # Antes de ler os totais: recarga no meio deixa as tabelas inválidas
+    if not competition.stats_ready:
+        return CompetitionBoards(reload_count, *_compute_stats(competition.id))
+    competition_id = competition.id
+    player_totals, team_totals = {}, {}
+    for team in get_competition_teams(competition_id):
+        team_totals[team.id] = team.competition_stats.get(competition_id, _NO_TOTALS)
+        for player in get_team_players(team.id):
+            player_totals[player.id] = player.competition_stats.get(competition_id, _NO_TOTALS)
+    return CompetitionBoards(reload_count, player_totals, team_totals)
+
+def _current_boards(competition):
+    """Tabelas válidas da competição (chamar com `_boards_lock`); monta se ainda não houver."""
+    boards = _boards.get(competition.id)
+    if boards is None or boards.reload_count != models.reload_count:
+        boards = _boards[competition.id] = _build_boards(competition)
+    return boards
+
+def _update_boards(competition, player_ids, team_ids):
+    """Caminho de escrita: reposiciona nas tabelas apenas os jogadores/times cujos totais mudaram."""
+    competition_id = competition.id
+    with _boards_lock:
+        boards = _boards.get(competition_id)
+        if boards is None or boards.reload_count != models.reload_count:
+            _boards[competition_id] = _build_boards(competition) # Já inclui a alteração
+            return
+        for player_id in player_ids:
+            player = get_player(player_id)
+            if player: boards.update_player(player_id, player.competition_stats.get(competition_id, _NO_TOTALS))
+        for team_id in team_ids:
+            team = get_team(team_id)
+            if team and team_id in competition.teams:
+                boards.update_team(team_id, team.competition_stats.get(competition_id, _NO_TOTALS))
+
+# --- Consultas (top-N) ---
+
+def _top_players(competition_id, board_name, n):
+    competition = get_competition(competition_id)
+    if not competition: return []
+    with _boards_lock:
+        boards = _current_boards(competition)
+        entries = [(player_id, boards.player_totals[player_id]) for player_id in getattr(boards, board_name).top(n)]
+    rows = []
+    for player_id, totals in entries:
+        player = get_player(player_id)
+        if player: rows.append(_player_row(player, totals))
+    return rows
+
+def top_scorers(competition_id, n=None):
+    """Artilharia: jogadores com gols, do maior para o menor."""
+    return _top_players(competition_id, "scorers", n)
+
+def discipline_table(competition_id, n=None):
+    """Disciplina: jogadores com cartões, por vermelhos e depois amarelos (decrescente)."""
+    return _top_players(competition_id, "discipline", n)
+
+def goalkeeper_table(competition_id, n=None):
+    """Goleiros: times por média de gols sofridos e depois total sofrido (crescente)."""
+    competition = get_competition(competition_id)
+    if not competition: return []
+    with _boards_lock:
+        boards = _current_boards(competition)
+        entries = [(team_id, boards.team_totals[team_id]) for team_id in boards.goalkeepers.top(n)]
+    rows = []
+    for team_id, totals in entries:
+        team = get_team(team_id)
+        if not team: continue
+        rows.append({"team_name": team.name, "goals_conceded": totals["goals_conceded"],
+                     "matches_played": totals["matches_played"],
+                     "avg_conceded": totals["goals_conceded"] / totals["matches_played"]})
+    return rows
+
+def _player_row(player, totals):
+    team = get_team(player.team_id)
+    return {"name": player.name, "team_id": player.team_id, "team_name": team.name if team else "Desconhecido",
+            "goals": totals.get("goals", 0), "yellow_cards": totals.get("yellow_cards", 0), "red_cards": totals.get("red_cards", 0)}
+
+def player_stats_row(player_id, competition_id):
+    """Linha de artilharia/disciplina de um jogador na competição."""
+    player = get_player(player_id)
+    return _player_row(player, player.competition_stats.get(competition_id, {}))
+
+def calculate_stats(competition_id):
+    """Estatísticas gerais da competição (artilharia, cartões, goleiros) a partir dos totais materializados."""
+    return {"top_scorers": top_scorers(competition_id),
+            "discipline": discipline_table(competition_id),
+            "goalkeepers": goalkeeper_table(competition_id)}
@@ -0,0 +1,682 @@
+# -*- coding: utf-8 -*-
+"""Backends de persistência para o data_storage (arquivo JSON, SQLite, snapshot + journal ou shards por competição).
+
+Os backends trabalham com dicts crus (formato do data.json); a conversão de/para dataclasses fica em models.py.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+from .shared import ProcessLock, read_generation, write_generation
+from .shards import IdRanges, entity_owner, shard_member_ids
+
+ENTITY_KINDS = ("competitions", "teams", "players", "groups", "matches")
+DEFAULT_NEXT_IDS = {"competition": 1, "team": 1, "player": 1, "group": 1, "match": 1, "event": 1}
+
+class StorageError(IOError):
+    """Falha de leitura/escrita no backend de persistência."""
+
+def _full_raw(storage, serialize):
+    raw = {kind: {k: serialize(v) for k, v in storage[kind].items()} for kind in ENTITY_KINDS}
+    raw["next_ids"] = dict(storage["next_ids"])
+    return raw
+
+class Backend:
+    """Interface comum dos backends.
+
+    A gravação é dividida em `prepare` (serializa; chamado com o data_storage travado) e `write`
+    (E/S; chamado fora da trava), para que a thread de gravação não bloqueie as rotas durante o disco.
+    """
+    name = None
+
+    process_lock = None # Trava entre processos; definida por models quando MULTI_WORKER está ativo
+    bytes_read = 0 # Totais deste processo, expostos em /metrics
+    bytes_written = 0
+
+    def load_raw(self):
+        raise NotImplementedError
+
+    def generation(self):
+        """Número de geração dos dados no disco; muda a cada gravação de qualquer processo."""
+        return read_generation(self.path + ".gen")
+
+    def _bump_generation(self):
+        write_generation(self.path + ".gen", self.generation() + 1)
+
+    def source_id(self):
+        """Identifica a versão dos dados no disco para o snapshot binário (snapshot.py); None = sem snapshot."""
+        return None
+
+    def changes_since(self, generation):
+        """Alterações gravadas (por outros processos) desde `generation`.
+
+        Retorna ("full", raw) quando é preciso recarregar tudo ou ("partial", changes, next_ids),
+        com changes = [(tipo, id, dict ou None)]. O padrão é recarregar tudo.
+        """
+        return ("full", self.load_raw())
+
+    def prepare(self, storage, dirty, serialize):
+        raise NotImplementedError
+
+    def write(self, payload):
+        raise NotImplementedError
+
+    def save(self, storage, dirty, serialize):
+        """Serializa e grava em sequência (dirty=None grava todas as entidades)."""
+        self.write(self.prepare(storage, dirty, serialize))
+
+    def _read_json(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        self.bytes_read += len(data)
+        return json.loads(data)
+
+    def _write_json(self, path, raw, indent=None):
+        self.bytes_written += _atomic_write_json(path, raw, indent=indent)
+
+class JsonStorage(Backend):
+    """Arquivo JSON único reescrito por completo a cada gravação (formato original)."""
+    name = "json"
+
+    def __init__(self, path):
+        self.path = path
+
+    def load_raw(self):
+        """Retorna o dict cru do arquivo ou None se ele não existir."""
+        if not os.path.exists(self.path):
+            return None
+        return self._read_json(self.path)
+
+    def source_id(self):
+        """(inode, tamanho, mtime) do data.json: toda gravação troca o arquivo (rename), mudando a identificação."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def prepare(self, storage, dirty, serialize):
+        """Serializa todas as entidades (o conjunto `dirty` é ignorado neste formato)."""
+        return _full_raw(storage, serialize)
+
+    def write(self, payload):
+        self.write_raw(payload)
+
+    def write_raw(self, raw):
+        """Grava em arquivo temporário + rename: uma queda nunca deixa o data.json truncado."""
+        self._write_json(self.path, raw, indent=4)
+        self._bump_generation()
+
+class SqliteStorage(Backend):
+    """Banco SQLite (modo WAL) com uma linha por entidade; gravações fazem upsert apenas das entidades alteradas."""
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        # Uma conexão por processo: com gunicorn --preload a conexão do master não pode ser herdada pelos workers
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for kind in ENTITY_KINDS:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {kind} (id INTEGER PRIMARY KEY, data TEXT NOT NULL, "
+                             "gen INTEGER NOT NULL DEFAULT 0)")
+                # Bancos criados antes da coluna de geração
+                if "gen" not in [row[1] for row in conn.execute(f"PRAGMA table_info({kind})")]:
+                    conn.execute(f"ALTER TABLE {kind} ADD COLUMN gen INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS deleted (kind TEXT NOT NULL, id INTEGER NOT NULL, "
+                         "gen INTEGER NOT NULL, PRIMARY KEY (kind, id))")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def load_raw(self):
+        """Retorna o dict cru montado a partir das tabelas ou None se o banco não existir."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with self._lock:
+                conn = self._connection()
+                raw = {}
+                for kind in ENTITY_KINDS:
+                    rows = conn.execute(f"SELECT id, data FROM {kind}").fetchall()
+                    self.bytes_read += sum(len(data) for _, data in rows)
+                    raw[kind] = {entity_id: json.loads(data) for entity_id, data in rows}
+                row = conn.execute("SELECT value FROM meta WHERE key = 'next_ids'").fetchone()
+        except sqlite3.Error as e:
+            raise StorageError(f"Erro ao ler {self.path}: {e}") from e
+        raw["next_ids"] = json.loads(row[0]) if row else dict(DEFAULT_NEXT_IDS)
+        return raw
+
+    def generation(self):
+        """Geração gravada na tabela meta (incrementada na mesma transação de cada gravação)."""
+        if not os.path.exists(self.path):
+            return 0
+        try:
+            with self._lock:
+                return self._read_generation(self._connection())
+        except sqlite3.Error as e:
+            raise StorageError(f"Erro ao ler {self.path}: {e}") from e
+
+    @staticmethod
+    def _read_generation(conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def changes_since(self, generation):
+        """Lê apenas as linhas gravadas/removidas depois de `generation`."""
+        try:
+            with self._lock:
+                conn = self._connection()
+                changes = [(kind, row[0], json.loads(row[1]))
+                           for kind in ENTITY_KINDS
+                           for row in conn.execute(f"SELECT id, data FROM {kind} WHERE gen > ?", (generation,))]
+                changes += [(row[0], row[1], None)
+                            for row in conn.execute("SELECT kind, id FROM deleted WHERE gen > ?", (generation,))]
+                row = conn.execute("SELECT value FROM meta WHERE key = 'next_ids'").fetchone()
+        except sqlite3.Error as e:
+            raise StorageError(f"Erro ao ler {self.path}: {e}") from e
+        return ("partial", changes, json.loads(row[0]) if row else dict(DEFAULT_NEXT_IDS))
+
+    def is_empty(self):
+        if not os.path.exists(self.path):
+            return True
+        raw = self.load_raw()
+        return not any(raw[kind] for kind in ENTITY_KINDS)
+
+    def prepare(self, storage, dirty, serialize):
+        """Monta upserts (ou deletes, se a entidade não existe mais) para cada (tipo, id) em `dirty`.
+
+        Com dirty=None prepara todas as entidades (sincronização completa).
+        """
+        if dirty is None:
+            return self._rows_from_raw(_full_raw(storage, serialize))
+        upserts = {kind: [] for kind in ENTITY_KINDS}
+        deletes = {kind: [] for kind in ENTITY_KINDS}
+        for kind, entity_id in dirty:
+            obj = storage[kind].get(entity_id)
+            if obj is None:
+                deletes[kind].append((entity_id,))
+            else:
+                upserts[kind].append((entity_id, json.dumps(serialize(obj), ensure_ascii=False)))
+        return upserts, deletes, dict(storage["next_ids"]), False
+
+    @staticmethod
+    def _rows_from_raw(raw):
+        upserts = {kind: [(int(k), json.dumps(v, ensure_ascii=False)) for k, v in raw.get(kind, {}).items()]
+                   for kind in ENTITY_KINDS}
+        return upserts, {}, raw.get("next_ids", DEFAULT_NEXT_IDS), True
+
+    def write_raw(self, raw):
+        """Substitui todo o conteúdo do banco pelo dict cru (usado na migração e na sincronização completa)."""
+        self.write(self._rows_from_raw(raw))
+
+    def write(self, payload):
+        upserts, deletes, next_ids, replace = payload
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    gen = self._read_generation(conn) + 1
+                    for kind in ENTITY_KINDS:
+                        if replace:
+                            conn.execute(f"INSERT OR REPLACE INTO deleted (kind, id, gen) SELECT ?, id, ? FROM {kind}", (kind, gen))
+                            conn.execute(f"DELETE FROM {kind}")
+                        if deletes.get(kind):
+                            conn.executemany(f"DELETE FROM {kind} WHERE id = ?", deletes[kind])
+                            conn.executemany("INSERT OR REPLACE INTO deleted (kind, id, gen) VALUES (?, ?, ?)",
+                                             [(kind, row[0], gen) for row in deletes[kind]])
+                        if upserts.get(kind):
+                            conn.executemany(f"INSERT INTO {kind} (id, data, gen) VALUES (?, ?, {gen}) "
+                                             "ON CONFLICT(id) DO UPDATE SET data = excluded.data, gen = excluded.gen",
+                                             upserts[kind])
+                    conn.execute("INSERT INTO meta (key, value) VALUES ('next_ids', ?) "
+                                 "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (json.dumps(next_ids),))
+                    conn.execute("INSERT INTO meta (key, value) VALUES ('generation', ?) "
+                                 "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (str(gen),))
+                    conn.execute("COMMIT")
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK")
+                    raise
+                self.bytes_written += sum(len(data) for rows in upserts.values() for _, data in rows)
+        except sqlite3.Error as e:
+            raise StorageError(f"Erro ao gravar em {self.path}: {e}") from e
+
+class JournalStorage(Backend):
+    """Snapshot JSON + journal append-only: cada gravação acrescenta (e faz fsync de) uma linha com as entidades alteradas.
+
+    O journal é incorporado a um novo snapshot em segundo plano a cada `compact_every` gravações.
+    Formato de cada linha: {"changes": [[tipo, id, dict ou null], ...], "next_ids": {...}}
+    """
+    name = "journal"
+
+    def __init__(self, snapshot_path, compact_every=500):
+        self.path = snapshot_path
+        self.journal_path = snapshot_path + ".journal"
+        self.compacting_path = snapshot_path + ".journal.compacting"
+        self.compact_every = compact_every
+        self._entries = 0 # Linhas no journal atual desde a última compactação
+        self._lock = threading.Lock()
+        self._compaction = None
+        self._epoch = 0 # Incrementado a cada snapshot completo; invalida compactações em andamento
+        self._snapshot_id = None # (inode, mtime) do snapshot lido/gravado por este processo
+        self._journal_pos = (None, 0) # (inode, offset) até onde este processo já leu o journal
+
+    def _read_journal(self, journal_path, offset=0):
+        """Lê as linhas do journal a partir de `offset`. Retorna (entradas, offset final).
+
+        Uma última linha incompleta (queda durante a escrita) é descartada e removida do arquivo,
+        para que as próximas gravações não fiquem depois de uma linha inválida.
+        """
+        if not os.path.exists(journal_path):
+            return [], 0
+        entries = []
+        good_offset = offset
+        with open(journal_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"): raise ValueError("linha sem terminador")
+                    entries.append(json.loads(line))
+                except ValueError:
+                    print(f"Aviso: linha incompleta descartada no journal {journal_path}.")
+                    break
+                good_offset += len(line)
+        if good_offset < os.path.getsize(journal_path):
+            os.truncate(journal_path, good_offset)
+        self.bytes_read += good_offset - offset
+        return entries, good_offset
+
+    @staticmethod
+    def _apply_entries(raw, entries):
+        """Reaplica entradas do journal sobre o dict cru."""
+        for entry in entries:
+            for kind, entity_id, data in entry.get("changes", []):
+                table = raw.setdefault(kind, {})
+                table.pop(str(entity_id), None); table.pop(entity_id, None)
+                if data is not None:
+                    table[str(entity_id)] = data
+            if "next_ids" in entry:
+                raw["next_ids"] = entry["next_ids"]
+
+    def _apply_journal(self, raw, journal_path):
+        entries, _ = self._read_journal(journal_path)
+        self._apply_entries(raw, entries)
+        return len(entries)
+
+    @staticmethod
+    def _file_id(path):
+        try:
+            st = os.stat(path)
+            return (st.st_ino, st.st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.path):
+            return None
+        return self._read_json(self.path)
+
+    def load_raw(self):
+        """Lê o snapshot e reaplica o journal em compactação (se houver) e o journal atual."""
+        self._snapshot_id = self._file_id(self.path)
+        raw = self._load_snapshot()
+        has_journal = os.path.exists(self.journal_path) or os.path.exists(self.compacting_path)
+        if raw is None and not has_journal:
+            self._journal_pos = (None, 0)
+            return None
+        if raw is None:
+            raw = {kind: {} for kind in ENTITY_KINDS} | {"next_ids": dict(DEFAULT_NEXT_IDS)}
+        self._apply_journal(raw, self.compacting_path)
+        entries, offset = self._read_journal(self.journal_path)
+        self._apply_entries(raw, entries)
+        journal_id = self._file_id(self.journal_path)
+        self._journal_pos = (journal_id[0] if journal_id else None, offset)
+        self._entries = len(entries)
+        if self._entries >= self.compact_every:
+            self.compact()
+        return raw
+
+    def changes_since(self, generation):
+        """Lê só as linhas acrescentadas ao journal desde a última leitura (recarrega tudo se houve compactação)."""
+        journal_id = self._file_id(self.journal_path)
+        inode, offset = self._journal_pos
+        if self._file_id(self.path) == self._snapshot_id and journal_id is None and inode is None:
+            return ("partial", [], None)
+        if self._file_id(self.path) != self._snapshot_id or journal_id is None or journal_id[0] != inode:
+            return ("full", self.load_raw())
+        entries, new_offset = self._read_journal(self.journal_path, offset)
+        self._journal_pos = (inode, new_offset)
+        self._entries += len(entries)
+        changes = [tuple(change) for entry in entries for change in entry.get("changes", [])]
+        next_ids = next((entry["next_ids"] for entry in reversed(entries) if "next_ids" in entry), None)
+        return ("partial", changes, next_ids)
+
+    def prepare(self, storage, dirty, serialize):
+        """Monta a linha do journal com as entidades em `dirty` (dirty=None prepara um snapshot completo)."""
+        if dirty is None:
+            return ("snapshot", _full_raw(storage, serialize))
+        changes = []
+        for kind, entity_id in sorted(dirty, key=lambda item: (item[0], item[1])):
+            obj = storage[kind].get(entity_id)
+            changes.append([kind, entity_id, serialize(obj) if obj is not None else None])
+        return ("line", json.dumps({"changes": changes, "next_ids": storage["next_ids"]}, ensure_ascii=False) + "\n")
+
+    def write(self, payload):
+        """Acrescenta a linha ao journal com fsync (ou grava o snapshot completo)."""
+        payload_type, data = payload
+        if payload_type == "snapshot":
+            self.write_raw(data)
+            return
+        encoded = data.encode("utf-8")
+        with self._lock:
+            before = self._file_id(self.journal_path)
+            before_pos = (before[0], os.path.getsize(self.journal_path)) if before else (None, 0)
+            with open(self.journal_path, "ab") as f:
+                f.write(encoded)
+                f.flush()
+                os.fsync(f.fileno())
+                after_pos = (os.fstat(f.fileno()).st_ino, f.tell())
+            self.bytes_written += len(encoded)
+            # Só avança a posição de leitura se não havia linhas de outros processos ainda não lidas
+            if before_pos == self._journal_pos or (before is None and self._journal_pos[0] is None):
+                self._journal_pos = after_pos
+            self._entries += 1
+            should_compact = self._entries >= self.compact_every
+            self._bump_generation()
+        if should_compact:
+            self.compact()
+
+    def write_raw(self, raw):
+        """Grava um snapshot completo (atômico) e descarta o journal."""
+        with self._lock:
+            self._epoch += 1
+            self._write_json(self.path, raw)
+            for path in (self.compacting_path, self.journal_path):
+                if os.path.exists(path): os.remove(path)
+            self._entries = 0
+            self._snapshot_id = self._file_id(self.path)
+            self._journal_pos = (None, 0)
+            self._bump_generation()
+
+    def compact(self, wait=False):
+        """Incorpora o journal ao snapshot em uma thread de segundo plano.
+
+        O journal atual é renomeado para `.compacting` e novas gravações vão para um journal novo, então
+        a compactação não bloqueia as rotas. Reaplicar `.compacting` sobre o snapshot novo é idempotente,
+        o que torna segura uma queda entre a troca do snapshot e a remoção do arquivo.
+        """
+        with self._lock:
+            if self._compaction and self._compaction.is_alive():
+                compaction = self._compaction
+            else:
+                if os.path.exists(self.journal_path) and not os.path.exists(self.compacting_path):
+                    os.replace(self.journal_path, self.compacting_path)
+                    self._entries = 0
+                    self._journal_pos = (None, 0)
+                compaction = threading.Thread(target=self._run_compaction, args=(self._epoch,),
+                                              name="journal-compaction", daemon=True)
+                self._compaction = compaction
+                compaction.start()
+        if wait:
+            compaction.join()
+
+    def _run_compaction(self, epoch):
+        if not os.path.exists(self.compacting_path):
+            return
+        # Trava própria (outro descritor): bloqueia enquanto outro processo/requisição segura a trava de escrita
+        process_lock = ProcessLock(self.process_lock.path) if self.process_lock else None
+        try:
+            raw = self._load_snapshot() or ({kind: {} for kind in ENTITY_KINDS} | {"next_ids": dict(DEFAULT_NEXT_IDS)})
+            self._apply_journal(raw, self.compacting_path)
+            if process_lock: process_lock.acquire()
+            try:
+                with self._lock:
+                    if epoch != self._epoch or not os.path.exists(self.compacting_path):
+                        return # Um snapshot completo foi gravado nesse meio tempo
+                    self._write_json(self.path, raw)
+                    os.remove(self.compacting_path)
+                    self._snapshot_id = self._file_id(self.path)
+            finally:
+                if process_lock: process_lock.release()
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Erro ao compactar o journal em {self.path}: {e}")
+
+class ShardedStorage(Backend):
+    """Um arquivo JSON por competição (shard) + um índice global pequeno.
+
+    O índice guarda resumos das competições, os donos dos ids (em faixas) e os next_ids; models.py
+    carrega os shards sob demanda (`lazy`) e cada gravação reescreve só os shards com entidades alteradas.
+    Formato do índice: {"next_ids": {...}, "competitions": {id: {"name", "type", "format", "status", "gen"}},
+    "owners": {tipo: [[primeiro_id, último_id, competition_id], ...]}}
+    """
+    name = "sharded"
+    lazy = True
+    OWNED_KINDS = ("teams", "players", "groups", "matches")
+    SUMMARY_FIELDS = ("name", "type", "format", "status")
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, "index.json")
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._summaries = None # competition_id -> resumo (carregado na primeira consulta)
+        self._owners = None # tipo -> IdRanges
+        self._next_ids = None
+        self._pending = {} # competition_id -> shard preparado e ainda não gravado
+
+    def _shard_path(self, competition_id):
+        return os.path.join(self.directory, f"competition_{competition_id}.json")
+
+    def _read_index(self):
+        if not os.path.exists(self.path):
+            return None
+        return self._read_json(self.path)
+
+    def _set_index(self, index):
+        self._summaries = {int(k): v for k, v in index.get("competitions", {}).items()}
+        self._owners = {kind: IdRanges(index.get("owners", {}).get(kind, ())) for kind in self.OWNED_KINDS}
+        self._next_ids = index.get("next_ids", dict(DEFAULT_NEXT_IDS))
+
+    def _ensure_index(self):
+        if self._summaries is None:
+            self._set_index(self._read_index() or {})
+
+    def _index_raw(self):
+        return {"next_ids": dict(self._next_ids),
+                "competitions": {str(k): dict(v) for k, v in self._summaries.items()},
+                "owners": {kind: ranges.to_list() for kind, ranges in self._owners.items()}}
+
+    # --- Consultas usadas pelo carregamento sob demanda ---
+
+    def next_ids(self):
+        with self._lock:
+            self._ensure_index()
+            return dict(self._next_ids)
+
+    def competition_summaries(self):
+        """competition_id -> resumo (nome, tipo, formato, status), sem abrir nenhum shard."""
+        with self._lock:
+            self._ensure_index()
+            return {cid: dict(summary) for cid, summary in self._summaries.items()}
+
+    def owner_of(self, kind, entity_id):
+        """Competição (shard) dona do id, segundo o índice (None se desconhecido)."""
+        with self._lock:
+            self._ensure_index()
+            if kind == "competitions":
+                return entity_id if entity_id in self._summaries else None
+            ranges = self._owners.get(kind)
+            return ranges.owner(entity_id) if ranges is not None and isinstance(entity_id, int) else None
+
+    def load_shard(self, competition_id):
+        """Dict cru com as entidades da competição (None se o shard não existir)."""
+        with self._lock:
+            pending = self._pending.get(competition_id)
+            if pending is not None: # Ainda não chegou ao disco: usa uma cópia do que foi preparado
+                return json.loads(json.dumps(pending))
+        path = self._shard_path(competition_id)
+        if not os.path.exists(path):
+            return None
+        return self._read_json(path)
+
+    def load_raw(self):
+        """Monta o dict cru completo (todos os shards); usado em migrações e verificações."""
+        index = self._read_index()
+        if index is None:
+            return None
+        raw = {kind: {} for kind in ENTITY_KINDS} | {"next_ids": index.get("next_ids", dict(DEFAULT_NEXT_IDS))}
+        for key in index.get("competitions", {}):
+            shard = self.load_shard(int(key)) or {}
+            for kind in ENTITY_KINDS:
+                raw[kind].update(shard.get(kind, {}))
+        return raw
+
+    def is_empty(self):
+        index = self._read_index()
+        return not index or not index.get("competitions")
+
+    def changes_since(self, generation):
+        """Relê o índice e informa as competições cujos shards foram regravados depois de `generation`."""
+        index = self._read_index() or {}
+        with self._lock:
+            self._set_index(index)
+            changed = [cid for cid, summary in self._summaries.items() if summary.get("gen", 0) > generation]
+            return ("shards", changed, dict(self._next_ids))
+
+    # --- Gravação ---
+
+    def _register_shard(self, competition_id, shard, summary):
+        for kind in self.OWNED_KINDS:
+            for entity_id in shard[kind]:
+                self._owners[kind].assign(int(entity_id), competition_id)
+        previous = self._summaries.get(competition_id, {})
+        self._summaries[competition_id] = {f: summary.get(f) for f in self.SUMMARY_FIELDS} | {"gen": previous.get("gen", 0)}
+        self._pending[competition_id] = shard
+
+    def prepare(self, storage, dirty, serialize):
+        """Monta os shards das competições com entidades em `dirty` (dirty=None: todas as carregadas)."""
+        with self._lock:
+            self._ensure_index()
+            if dirty is None:
+                competition_ids = set(storage["competitions"].keys())
+            else:
+                competition_ids = set()
+                for kind, entity_id in dirty:
+                    owner = entity_owner(storage, kind, entity_id)
+                    if owner is None and kind != "competitions": # Removida: regrava o shard em que estava
+                        ranges = self._owners.get(kind)
+                        owner = ranges.owner(entity_id) if ranges is not None else None
+                    if owner is not None:
+                        competition_ids.add(owner)
+            shards = {}
+            for competition_id in competition_ids:
+                competition = dict.get(storage["competitions"], competition_id)
+                if competition is None:
+                    shards[competition_id] = None
+                    self._summaries.pop(competition_id, None)
+                    continue
+                members = shard_member_ids(storage, competition)
+                shard = {kind: {str(i): serialize(dict.get(storage[kind], i)) for i in ids} for kind, ids in members.items()}
+                self._register_shard(competition_id, shard, {f: getattr(competition, f) for f in self.SUMMARY_FIELDS})
+                shards[competition_id] = shard
+            self._next_ids = dict(storage["next_ids"])
+            return shards
+
+    def write(self, payload):
+        """Grava os shards (cada um de forma atômica) e depois o índice."""
+        with self._lock:
+            generation = self.generation() + 1
+            for competition_id in payload:
+                if competition_id in self._summaries:
+                    self._summaries[competition_id]["gen"] = generation
+            index_raw = self._index_raw()
+        for competition_id, shard in payload.items():
+            if shard is None:
+                if os.path.exists(self._shard_path(competition_id)):
+                    os.remove(self._shard_path(competition_id))
+            else:
+                self._write_json(self._shard_path(competition_id), shard)
+        self._write_json(self.path, index_raw)
+        write_generation(self.path + ".gen", generation)
+        with self._lock:
+            for competition_id, shard in payload.items():
+                if self._pending.get(competition_id) is shard:
+                    del self._pending[competition_id]
+
+    def write_raw(self, raw):
+        """Substitui todo o conteúdo dividindo o dict cru em shards (migração a partir do data.json)."""
+        tables = {kind: {str(k): v for k, v in raw.get(kind, {}).items()} for kind in ENTITY_KINDS}
+        shards = {}
+        with self._lock:
+            self._set_index({"next_ids": raw.get("next_ids", dict(DEFAULT_NEXT_IDS))})
+            for key, competition in tables["competitions"].items():
+                ids = {"competitions": [key], "teams": competition.get("teams", []), "groups": competition.get("groups", [])}
+                matches = dict.fromkeys(competition.get("matches", []))
+                for group_id in ids["groups"]:
+                    matches.update(dict.fromkeys(tables["groups"].get(str(group_id), {}).get("matches", [])))
+                ids["matches"] = list(matches)
+                ids["players"] = [p for t in ids["teams"] for p in tables["teams"].get(str(t), {}).get("players", [])]
+                shard = {kind: {str(i): tables[kind][str(i)] for i in ids[kind] if str(i) in tables[kind]} for kind in ENTITY_KINDS}
+                self._register_shard(int(key), shard, competition)
+                shards[int(key)] = shard
+        for name in os.listdir(self.directory): # Shards antigos que não fazem parte dos novos dados
+            if name.startswith("competition_") and name.endswith(".json") and int(name[12:-5]) not in shards:
+                os.remove(os.path.join(self.directory, name))
+        self.write(shards)
+
+def _atomic_write_json(path, raw, indent=None):
+    """Escreve o JSON em um arquivo temporário e o renomeia sobre o destino (nunca deixa o arquivo truncado).
+
+    Retorna o tamanho gravado em bytes.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(raw, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+        size = os.fstat(f.fileno()).st_size
+    os.replace(tmp_path, path)
+    return size
+
+def create_backend(name, data_file, database_file, shard_dir=None):
+    """Cria o backend configurado ("json", "sqlite", "journal" ou "sharded")."""
+    if name == "sharded":
+        return ShardedStorage(shard_dir or os.path.join(os.path.dirname(data_file), "shards"))
+    if name == "sqlite":
+        return SqliteStorage(database_file)
+    if name == "journal":
+        return JournalStorage(data_file, compact_every=int(os.environ.get("JOURNAL_COMPACT_EVERY", 500)))
+    if name != "json":
+        print(f"Aviso: backend de dados '{name}' desconhecido. Usando JSON.")
+    return JsonStorage(data_file)
+
+def migrate_json_to_sqlite(json_path, database_path, force=False):
+    """Migração única do data.json para o banco SQLite. Retorna o número de entidades copiadas por tipo."""
+    raw = JsonStorage(json_path).load_raw()
+    if raw is None:
+        raise StorageError(f"Arquivo {json_path} não encontrado.")
+    target = SqliteStorage(database_path)
+    if not force and not target.is_empty():
+        raise StorageError(f"O banco {database_path} já contém dados (use force para sobrescrever).")
+    target.write_raw(raw)
+    return {kind: len(raw.get(kind, {})) for kind in ENTITY_KINDS}
+
+def migrate_json_to_shards(json_path, shard_dir, force=False):
+    """Divide o data.json em um shard por competição. Retorna o número de entidades copiadas por tipo."""
+    raw = JsonStorage(json_path).load_raw()
+    if raw is None:
+        raise StorageError(f"Arquivo {json_path} não encontrado.")
+    target = ShardedStorage(shard_dir)
+    if not force and not target.is_empty():
+        raise StorageError(f"O diretório {shard_dir} já contém dados (use force para sobrescrever).")
+    target.write_raw(raw)
+    return {kind: len(raw.get(kind, {})) for kind in ENTITY_KINDS}
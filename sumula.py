@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""Geração da súmula em PDF com cache (memória LRU + disco opcional) e exportação em lote.
+
+A súmula de uma partida finalizada é gerada uma vez por versão: a chave do cache é o id da partida mais
+uma impressão digital (hash) de tudo o que aparece no documento (placar, eventos, elencos, nomes), então
+qualquer edição gera uma nova chave e downloads repetidos não refazem o PDF. A exportação em lote
+renderiza as súmulas que faltam no cache em processos paralelos (spawn, recebendo os dados já extraídos)
+e as entrega em um ZIP gerado aos poucos.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import zipfile
+from collections import OrderedDict, deque
+
+from .models import (
+    get_competition, get_team, get_player, get_group, get_match, get_team_players,
+    get_matches_by_status, get_group_matches, get_round_matches, get_knockout_round_matches
+)
+from .metrics import timed, SUMULA_RENDER_SECONDS
+
+SUMULA_CACHE_SIZE = int(os.environ.get("SUMULA_CACHE_SIZE", "128")) # PDFs mantidos em memória
+SUMULA_CACHE_DIR = os.environ.get("SUMULA_CACHE_DIR") # Cache em disco (opcional), compartilhado entre workers
+EXPORT_WORKERS = int(os.environ.get("SUMULA_EXPORT_WORKERS", os.cpu_count() or 1)) # Processos na exportação em lote
+EXPORT_PARALLEL_MIN = int(os.environ.get("SUMULA_EXPORT_PARALLEL_MIN", "8")) # Súmulas fora do cache para usar os processos
+LAYOUT_VERSION = 1 # Incrementar ao mudar o layout: invalida os PDFs já em cache
+
+# --- Geração ---
+
+def sumula_sheet(match_id):
+    """Tudo o que aparece na súmula, em tipos simples (None se a partida não estiver finalizada ou faltar algo).
+
+    É o que os processos da exportação recebem: o PDF é desenhado sem consultar o data_storage.
+    """
+    match = get_match(match_id)
+    if not match or match.status != "finished": return None
+    competition = get_competition(match.competition_id)
+    team1 = get_team(match.team1_id); team2 = get_team(match.team2_id)
+    if not competition or not team1 or not team2: return None # Verifica se tudo existe
+    phase = ""
+    if match.group_id: group = get_group(match.group_id); phase = f"Fase de Grupos - {group.name}" if group else "Grupo Desconhecido"
+    elif match.knockout_round: phase = f"Fase Eliminatória - {match.knockout_round}"
+    elif match.round_number: phase = f"Rodada {match.round_number}"
+    events = []
+    for event in match.events:
+        player = get_player(event.player_id); team = get_team(event.team_id)
+        events.append((event.minute, event.event_type, player.name if player else f"ID {event.player_id}",
+                       team.name if team else f"ID {event.team_id}"))
+    penalties = None
+    if match.team1_penalties is not None and match.team2_penalties is not None:
+        penalties = (match.team1_penalties, match.team2_penalties)
+    return {"competition": competition.name, "type": competition.type, "format": competition.format,
+            "phase": phase, "date": match.date, "team1": team1.name, "team2": team2.name,
+            "score1": match.team1_score, "score2": match.team2_score, "penalties": penalties,
+            "players1": [p.name for p in get_team_players(team1.id)],
+            "players2": [p.name for p in get_team_players(team2.id)], "events": events}
+
+def sumula_fingerprint(sheet, title):
+    """Hash de tudo o que aparece na súmula: muda com placar, eventos, elencos ou nomes."""
+    content = [LAYOUT_VERSION, title, sheet]
+    return hashlib.sha1(json.dumps(content, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()[:20]
+
+def _render(sheet, title):
+    """O fpdf só é importado aqui, na primeira súmula do processo (ver sumula_pdf.py)."""
+    from .sumula_pdf import render_sumula
+    with timed(SUMULA_RENDER_SECONDS, "pdf"):
+        return render_sumula(sheet, title)
+
+def generate_sumula_pdf(match_id, title):
+    """Gera a súmula sem cache. Retorna os bytes do PDF ou None."""
+    sheet = sumula_sheet(match_id)
+    return _render(sheet, title) if sheet else None
+
+# --- Cache ---
+
+class SumulaCache:
+    """PDFs por (match_id, impressão digital): LRU em memória e, se configurado, arquivos em disco."""
+
+    def __init__(self, max_entries, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict() # (match_id, fingerprint) -> bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, match_id, fingerprint):
+        return os.path.join(self.directory, f"sumula_{match_id}_{fingerprint}.pdf")
+
+    def get(self, match_id, fingerprint):
+        key = (match_id, fingerprint)
+        with self._lock:
+            pdf_bytes = self._entries.get(key)
+            if pdf_bytes is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pdf_bytes
+        if self.directory:
+            try:
+                with open(self._path(match_id, fingerprint), "rb") as f:
+                    pdf_bytes = f.read()
+            except FileNotFoundError:
+                pdf_bytes = None
+            if pdf_bytes:
+                self.disk_hits += 1
+                self._remember(key, pdf_bytes)
+                return pdf_bytes
+        self.misses += 1
+        return None
+
+    def contains(self, match_id, fingerprint):
+        """Se a súmula está em cache (memória ou disco), sem ler o arquivo; ausente conta como erro de cache."""
+        with self._lock:
+            if (match_id, fingerprint) in self._entries: return True
+        if self.directory and os.path.exists(self._path(match_id, fingerprint)): return True
+        self.misses += 1
+        return False
+
+    def _remember(self, key, pdf_bytes):
+        with self._lock:
+            # Versões antigas da mesma partida não serão mais pedidas
+            for old_key in [k for k in self._entries if k[0] == key[0] and k != key]:
+                del self._entries[old_key]
+            self._entries[key] = pdf_bytes
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, match_id, fingerprint, pdf_bytes):
+        self._remember((match_id, fingerprint), pdf_bytes)
+        if self.directory:
+            path = self._path(match_id, fingerprint)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(pdf_bytes)
+                os.replace(tmp_path, path)
+                prefix = f"sumula_{match_id}_"
+                for name in os.listdir(self.directory):
+                    if name.startswith(prefix) and name.endswith(".pdf") and os.path.join(self.directory, name) != path:
+                        os.remove(os.path.join(self.directory, name))
+            except OSError as e:
+                print(f"Aviso: não foi possível gravar a súmula em cache em {path}: {e}")
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+sumula_cache = SumulaCache(SUMULA_CACHE_SIZE, SUMULA_CACHE_DIR)
+
+def get_sumula_pdf(match_id, title):
+    """Súmula da partida, do cache quando possível. Retorna (bytes, impressão digital) ou (None, None)."""
+    sheet = sumula_sheet(match_id)
+    if not sheet: return None, None
+    fingerprint = sumula_fingerprint(sheet, title)
+    pdf_bytes = sumula_cache.get(match_id, fingerprint)
+    if pdf_bytes is None:
+        pdf_bytes = _render(sheet, title)
+        sumula_cache.put(match_id, fingerprint, pdf_bytes)
+    return pdf_bytes, fingerprint
+
+# --- Exportação em Lote ---
+
+def export_matches(competition_id, group_id=None, round_number=None, knockout_round=None):
+    """Partidas finalizadas da competição, opcionalmente só de um grupo, rodada ou fase do mata-mata."""
+    if group_id is not None:
+        matches = get_group_matches(group_id)
+    elif round_number is not None:
+        matches = get_round_matches(competition_id, round_number)
+    elif knockout_round:
+        matches = get_knockout_round_matches(competition_id, knockout_round)
+    else:
+        matches = get_matches_by_status(competition_id, "finished")
+    matches = [m for m in matches if m.competition_id == competition_id and m.status == "finished"]
+    return sorted(matches, key=lambda m: (m.group_id or 0, m.round_number or 0, m.knockout_round or "", m.id))
+
+def _process_pool(workers):
+    """Pool de processos iniciados com spawn (None se indisponível).
+
+    Nunca fork: o worker do gunicorn tem dezenas de threads e travas (data_lock, gravação em grupo) que
+    poderiam estar seguras no momento do fork e travar o filho. Os filhos só importam sumula_pdf.py
+    (sem models.py nem os dados) e recebem cada súmula já extraída.
+    """
+    import multiprocessing # Só na exportação em lote
+    from concurrent.futures import ProcessPoolExecutor
+    try:
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    except (ValueError, OSError) as e:
+        print(f"Aviso: exportação em paralelo indisponível ({e}). Renderizando em sequência.")
+        return None
+
+def render_many(match_ids, title, workers=None):
+    """Gera (match_id, bytes do PDF) na ordem de `match_ids`.
+
+    Súmulas em cache são reaproveitadas; as demais são renderizadas em paralelo por um pool de processos
+    quando faltam pelo menos EXPORT_PARALLEL_MIN (iniciar os processos custa centenas de ms).
+    No máximo 2 x workers PDFs ficam em memória ao mesmo tempo.
+    """
+    from .sumula_pdf import render_sumula
+    pending = [] # (match_id, impressão digital, súmula ou None se já em cache)
+    for match_id in match_ids:
+        sheet = sumula_sheet(match_id)
+        if not sheet: continue
+        fingerprint = sumula_fingerprint(sheet, title)
+        pending.append((match_id, fingerprint, None if sumula_cache.contains(match_id, fingerprint) else sheet))
+    workers = max(workers or EXPORT_WORKERS, 1)
+    missing = sum(1 for _, _, sheet in pending if sheet is not None)
+    executor = _process_pool(min(workers, missing)) if workers > 1 and missing >= EXPORT_PARALLEL_MIN else None
+    window = workers * 2 if executor else 1
+    queue = deque() # (match_id, impressão digital, bytes ou Future)
+    def resolve(item):
+        match_id, fingerprint, result = item
+        if not isinstance(result, (bytes, bytearray)):
+            result = result.result()
+            sumula_cache.put(match_id, fingerprint, result)
+        return match_id, result
+    try:
+        for match_id, fingerprint, sheet in pending:
+            pdf_bytes = sumula_cache.get(match_id, fingerprint) if sheet is None else None
+            if pdf_bytes is None:
+                sheet = sheet or sumula_sheet(match_id) # Saiu do cache desde a verificação
+                if not sheet: continue
+                if executor is None:
+                    pdf_bytes = _render(sheet, title)
+                    sumula_cache.put(match_id, fingerprint, pdf_bytes)
+            queue.append((match_id, fingerprint, pdf_bytes if pdf_bytes is not None else executor.submit(render_sumula, sheet, title)))
+            while len(queue) >= window:
+                yield resolve(queue.popleft())
+        while queue:
+            yield resolve(queue.popleft())
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+class _StreamBuffer:
+    """Destino de escrita do ZipFile que só acumula o que ainda não foi enviado (arquivo não posicionável)."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def iter_sumulas_zip(match_ids, title, workers=None):
+    """Gera o ZIP com as súmulas em pedaços, à medida que cada PDF fica pronto."""
+    buffer = _StreamBuffer()
+    # PDFs já são comprimidos internamente: ZIP_STORED evita gastar CPU comprimindo de novo
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for match_id, pdf_bytes in render_many(match_ids, title, workers):
+            archive.writestr(f"sumula_partida_{match_id}.pdf", pdf_bytes)
+            yield buffer.pop()
+    yield buffer.pop()
+
+def render_merged_pdf(match_ids, title):
+    """Um único PDF com a súmula de cada partida a partir de uma nova página (renderizado em sequência)."""
+    from .sumula_pdf import new_pdf, add_sumula_page
+    pdf = new_pdf(title)
+    for match_id in match_ids:
+        sheet = sumula_sheet(match_id)
+        if sheet: add_sumula_page(pdf, sheet)
+    return bytes(pdf.output())
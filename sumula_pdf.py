@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Documento PDF da súmula (fpdf2), desenhado a partir dos dados já extraídos da partida (`sheet`).
+
+Separado de sumula.py para que o fpdf (que carrega fontTools e PIL, centenas de ms) seja importado apenas
+quando a primeira súmula do processo é gerada, e não na inicialização de cada worker. Não importa models.py:
+os processos da exportação em lote (spawn) carregam só este módulo e recebem os dados prontos, sem o
+data_storage.
+"""
+
+import os
+
+from fpdf import FPDF
+
+FONT_DIR = "/usr/share/fonts/truetype/dejavu"
+FONT_FILES = {"": "DejaVuSans.ttf", "B": "DejaVuSans-Bold.ttf", "I": "DejaVuSans-Oblique.ttf"} # estilo -> arquivo
+FALLBACK_FONT = "Helvetica" # Fonte padrão do PDF (sem acentuação fora do latin-1)
+
+# --- Fontes ---
+
+_font_files = None
+
+def _resolve_fonts():
+    """Verifica uma vez por processo quais arquivos da DejaVu existem (estilo -> caminho)."""
+    global _font_files
+    if _font_files is None:
+        regular = os.path.join(FONT_DIR, FONT_FILES[""])
+        if not os.path.exists(regular):
+            print(f"Aviso: Fonte DejaVu não encontrada em {regular}. Usando {FALLBACK_FONT}.")
+            _font_files = {}
+        else:
+            # Estilos sem arquivo próprio usam o regular (evita "Undefined font" ao pedir negrito/itálico)
+            _font_files = {style: path if os.path.exists(path) else regular
+                           for style, path in ((s, os.path.join(FONT_DIR, f)) for s, f in FONT_FILES.items())}
+    return _font_files
+
+class PDF(FPDF):
+    def __init__(self, title):
+        super().__init__()
+        self.title_text = title
+        font_files = _resolve_fonts()
+        for style, path in font_files.items(): # Registradas uma vez por documento, não a cada página
+            self.add_font("DejaVu", style, path)
+        self.base_family = "DejaVu" if font_files else FALLBACK_FONT
+
+    def header(self):
+        self.set_font(self.base_family, "B", 12)
+        self.cell(0, 10, self.title_text, 0, 1, "C")
+        self.set_font(self.base_family, "", 10)
+        self.cell(0, 10, "Súmula da Partida", 0, 1, "C")
+        self.ln(5)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font(self.base_family, "I", 8)
+        self.cell(0, 10, f"Página {self.page_no()}/{{nb}}", 0, 0, "C")
+
+# --- Página da Súmula ---
+
+EVENT_TYPE_NAMES = {"goal": "Gol", "yellow_card": "Cartão Amarelo", "red_card": "Cartão Vermelho"}
+
+def _event_order(event):
+    minute, event_type = event[0], event[1]
+    return (int(minute) if minute and minute.isdigit() else 999, event_type)
+
+def add_sumula_page(pdf, sheet):
+    """Escreve a súmula de uma partida (dict de `sumula.sumula_sheet`) a partir de uma nova página do documento."""
+    team1, team2 = sheet["team1"], sheet["team2"]
+    players1, players2 = sheet["players1"], sheet["players2"]
+    pdf.add_page()
+    family = pdf.base_family
+    pdf.set_font(family, "B", 11)
+    format_text = "Pontos Corridos" if sheet["format"] == "round_robin" else "Grupos + Mata-Mata"
+    pdf.cell(0, 7, f"Competição: {sheet['competition']} ({sheet['type'].capitalize()}) - Formato: {format_text}", 0, 1)
+    pdf.cell(0, 7, f"Fase/Rodada: {sheet['phase']}", 0, 1)
+    pdf.cell(0, 7, f"Data: {sheet['date'] if sheet['date'] else 'Não informada'}", 0, 1); pdf.ln(5)
+    pdf.set_font(family, "B", 14)
+    pdf.cell(0, 10, f"{team1}  {sheet['score1']}  x  {sheet['score2']}  {team2}", 0, 1, "C")
+    if sheet["penalties"]:
+        pdf.set_font(family, "", 11)
+        pdf.cell(0, 6, f"Pênaltis: {sheet['penalties'][0]} x {sheet['penalties'][1]}", 0, 1, "C")
+    pdf.ln(5)
+    pdf.set_font(family, "B", 11); pdf.cell(0, 7, "Jogadores Relacionados", 0, 1)
+    col_width = pdf.w / 2 - 15
+    pdf.set_font(family, "B", 10)
+    pdf.cell(col_width, 6, team1, border=1, ln=0, align="C")
+    pdf.cell(10, 6, "", border=0, ln=0)
+    pdf.cell(col_width, 6, team2, border=1, ln=1, align="C")
+    pdf.set_font(family, "", 9)
+    for i in range(max(len(players1), len(players2))):
+        pdf.cell(col_width, 5, players1[i] if i < len(players1) else "", border=1, ln=0)
+        pdf.cell(10, 5, "", border=0, ln=0)
+        pdf.cell(col_width, 5, players2[i] if i < len(players2) else "", border=1, ln=1)
+    pdf.ln(5)
+    pdf.set_font(family, "B", 11); pdf.cell(0, 7, "Eventos da Partida", 0, 1)
+    pdf.set_font(family, "B", 9)
+    pdf.cell(20, 6, "Minuto", border=1, ln=0, align="C"); pdf.cell(25, 6, "Tipo", border=1, ln=0, align="C")
+    pdf.cell(70, 6, "Jogador", border=1, ln=0, align="C"); pdf.cell(70, 6, "Time", border=1, ln=1, align="C")
+    pdf.set_font(family, "", 9)
+    for minute, event_type, player_name, team_name in sorted(sheet["events"], key=_event_order):
+        pdf.cell(20, 5, str(minute) if minute else "-", border=1, ln=0, align="C")
+        pdf.cell(25, 5, EVENT_TYPE_NAMES.get(event_type, event_type), border=1, ln=0, align="C")
+        pdf.cell(70, 5, player_name, border=1, ln=0)
+        pdf.cell(70, 5, team_name, border=1, ln=1)
+    pdf.ln(10)
+    pdf.set_font(family, "", 10)
+    pdf.cell(pdf.w / 3, 10, "_________________________", 0, 0, "C"); pdf.cell(pdf.w / 3, 10, "_________________________", 0, 0, "C"); pdf.cell(pdf.w / 3, 10, "_________________________", 0, 1, "C")
+    pdf.cell(pdf.w / 3, 5, "Árbitro", 0, 0, "C"); pdf.cell(pdf.w / 3, 5, "Representante Time 1", 0, 0, "C"); pdf.cell(pdf.w / 3, 5, "Representante Time 2", 0, 1, "C")
+
+def new_pdf(title):
+    pdf = PDF(title); pdf.alias_nb_pages()
+    return pdf
+
+def render_sumula(sheet, title):
+    """Bytes do PDF de uma súmula (também executado nos processos da exportação em lote)."""
+    pdf = new_pdf(title)
+    add_sumula_page(pdf, sheet)
+    return bytes(pdf.output())
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""Testes de comportamento (pytest).
+
+Executar a partir do diretório que contém o pacote: `python -m pytest src/tests`.
+Os dados ficam em um diretório temporário; nada do DATA_FILE real é tocado.
+"""
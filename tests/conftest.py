@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Configuração dos testes: dados em um diretório temporário e cliente Flask com fábricas de competições.
+
+Como nos benchmarks, as variáveis de ambiente precisam ser definidas antes de importar models.py (que lê a
+configuração na importação). Gravação síncrona e sem snapshot: cada teste vê o data.json já gravado.
+"""
+
+import os
+import shutil
+import tempfile
+
+_DATA_DIR = tempfile.mkdtemp(prefix="tests_")
+os.environ.update({
+    "DATA_FILE": os.path.join(_DATA_DIR, "data.json"),
+    "DATABASE_FILE": os.path.join(_DATA_DIR, "data.db"),
+    "DATA_BACKEND": "json",
+    "SAVE_INTERVAL": "0",
+    "DATA_SNAPSHOT": "0",
+    "MULTI_WORKER": "0",
+})
+
+import pytest
+
+from .. import create_app, models
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_DATA_DIR, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    app.testing = True
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def make_competition(client):
+    """Cria uma competição pelas rotas, com `teams` times de `players` jogadores cada."""
+    def make(competition_format="round_robin", teams=4, players=1):
+        client.post("/competition/new", data={"name": "Teste", "type": "futebol", "format": competition_format})
+        competition = models.get_competition(max(models.data_storage["competitions"]))
+        for number in range(1, teams + 1):
+            client.post(f"/competition/{competition.id}/add_team", data={"team_name": f"Time {number}"})
+        for team in models.get_competition_teams(competition.id):
+            for number in range(1, players + 1):
+                client.post(f"/competition/{competition.id}/team/{team.id}/add_player",
+                            data={"player_name": f"Jogador {team.id}-{number}"})
+        return competition
+    return make
+
+@pytest.fixture
+def record(client):
+    """Registra o resultado de uma partida pelo formulário; `events` são (tipo, player_id)."""
+    def record(match, score1, score2, events=(), **form):
+        data = {"score1": score1, "score2": score2, "event_count": len(events), **form}
+        for index, (event_type, player_id) in enumerate(events):
+            data[f"event_type_{index}"] = event_type
+            data[f"player_id_{index}"] = player_id
+        return client.post(f"/match/{match.id}/record_result", data=data)
+    return record
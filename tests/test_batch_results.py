@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Lançamento em lote via JSON: validação do formato e tudo ou nada."""
+
+import pytest
+
+from .. import models
+from ..standings import verify_standings
+
+@pytest.fixture
+def league(client, make_competition):
+    competition = make_competition(teams=4, players=2)
+    client.post(f"/competition/{competition.id}/generate_rr_matches")
+    return competition
+
+def _post(client, competition, body):
+    return client.post(f"/competition/{competition.id}/batch_results", json=body)
+
+def _result(match, score1=1, score2=0, **extra):
+    return {"match_id": match.id, "score1": score1, "score2": score2, **extra}
+
+@pytest.mark.parametrize("body", [
+    [], "resultados", 5, {}, {"results": {}}, {"results": "x"}, {"results": [5]}, {"results": [[1, 2]]},
+])
+def test_malformed_body_is_rejected(client, league, body):
+    version = league.version
+    response = _post(client, league, body)
+    assert response.status_code == 400
+    assert response.get_json()["applied"] == 0
+    assert league.version == version
+
+def test_invalid_json_is_rejected(client, league):
+    response = client.post(f"/competition/{league.id}/batch_results", data="{\"results\": [",
+                           content_type="application/json")
+    assert response.status_code == 400
+    assert response.get_json()["errors"][0]["match_id"] is None
+
+@pytest.mark.parametrize("item", [
+    {"match_id": "1", "score1": 1, "score2": 0},
+    {"match_id": 1.0, "score1": 1, "score2": 0},
+    {"match_id": True, "score1": 1, "score2": 0},
+    {"match_id": 10 ** 9, "score1": 1, "score2": 0},
+])
+def test_unknown_or_non_integer_match_id(client, league, item):
+    response = _post(client, league, {"results": [item]})
+    assert response.status_code == 400
+    assert response.get_json()["errors"][0]["match_id"] is None
+
+@pytest.mark.parametrize("extra", [
+    {"events": {}}, {"events": [1]}, {"events": "goal"}, {"date": 20240101},
+    {"score1": "1"}, {"score1": -1}, {"penalties1": "3"},
+    {"events": [{"event_type": "own_goal", "player_id": None}]},
+])
+def test_invalid_item_fields(client, league, extra):
+    match = models.get_competition_matches(league.id)[0]
+    response = _post(client, league, {"results": [{**_result(match), **extra}]})
+    assert response.status_code == 400
+    assert [error["match_id"] for error in response.get_json()["errors"]] == [match.id]
+    assert match.status == "scheduled"
+
+def test_player_from_another_team_is_rejected(client, league):
+    match = models.get_competition_matches(league.id)[0]
+    outsider = next(team_id for team_id in league.teams if team_id not in (match.team1_id, match.team2_id))
+    player = models.get_team_players(outsider)[0]
+    response = _post(client, league, {"results": [_result(match, events=[{"event_type": "goal", "player_id": player.id}])]})
+    assert response.status_code == 400
+
+def test_batch_is_all_or_nothing(client, league):
+    first, second = models.get_competition_matches(league.id)[:2]
+    response = _post(client, league, {"results": [_result(first), _result(second, score1=None)]})
+    assert response.status_code == 400
+    assert response.get_json()["applied"] == 0
+    assert first.status == second.status == "scheduled"
+
+    response = _post(client, league, {"results": [_result(first), _result(first, 2, 2)]})
+    assert response.status_code == 400 # Partida repetida no lote
+    assert first.status == "scheduled"
+
+def test_valid_batch_is_applied(client, league):
+    matches = models.get_competition_matches(league.id)[:2]
+    scorer = models.get_team_players(matches[0].team1_id)[0]
+    version = league.version
+    response = _post(client, league, {"results": [
+        _result(matches[0], 2, 1, date="2024-05-01", events=[{"event_type": "goal", "player_id": scorer.id, "minute": "10"}]),
+        _result(matches[1], 0, 0),
+    ]})
+    assert response.status_code == 200
+    assert response.get_json() == {"applied": 2, "errors": []}
+    assert [m.status for m in matches] == ["finished", "finished"]
+    assert matches[0].date == "2024-05-01"
+    assert league.version == version + 1 # Uma versão para o lote inteiro
+    assert verify_standings(league.id) == []
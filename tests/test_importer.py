@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Importação de times e jogadores: codificação e separador do CSV, duplicatas e competição já iniciada."""
+
+import io
+
+import pytest
+
+from .. import models
+from ..importer import ImportFormatError, import_teams, iter_rows
+
+def _import(competition, text, encoding="utf-8", dry_run=False):
+    return import_teams(competition, iter_rows(io.BytesIO(text.encode(encoding)), "csv"), dry_run=dry_run)
+
+def _roster(competition):
+    return {team.name: [p.name for p in models.get_team_players(team.id)]
+            for team in models.get_competition_teams(competition.id)}
+
+def test_cp1252_csv_falls_back_per_line(make_competition):
+    competition = make_competition(teams=0)
+    report = _import(competition, "team,player\r\nSão Paulo,João\r\nGrêmio,Zé\r\n", encoding="cp1252")
+    assert report.errors == []
+    assert _roster(competition) == {"São Paulo": ["João"], "Grêmio": ["Zé"]}
+
+def test_utf8_bom_and_multiline_field(make_competition):
+    competition = make_competition(teams=0)
+    report = _import(competition, '\ufeffTeam,Player\nAvaí,"Zé\nda Silva"\n')
+    assert report.errors == []
+    assert _roster(competition) == {"Avaí": ["Zé da Silva"]}
+
+def test_semicolon_delimited_excel_export(client, make_competition):
+    competition = make_competition(teams=0)
+    data = "time;jogador\r\nSão Paulo;João\r\nSão Paulo;\"Silva; Jr.\"\r\nCoritiba;\r\n".encode("cp1252")
+    response = client.post(f"/competition/{competition.id}/import_teams", content_type="multipart/form-data",
+                           data={"file": (io.BytesIO(data), "times.csv")})
+    assert response.status_code == 302 # Sem linhas com erro: volta para a competição
+    assert _roster(competition) == {"São Paulo": ["João", "Silva; Jr."], "Coritiba": []}
+
+def test_undecodable_line_is_a_format_error(make_competition):
+    competition = make_competition(teams=0)
+    with pytest.raises(ImportFormatError, match="Linha 3"):
+        import_teams(competition, iter_rows(io.BytesIO(b"team\nAlfa\nBeta \x81\n"), "csv"))
+    assert _roster(competition) == {} # Nada gravado
+
+def test_duplicate_rows_are_reported_and_reimport_is_idempotent(make_competition):
+    competition = make_competition(teams=0)
+    text = "team,player\nAlfa,Ana\nalfa,ANA\nAlfa,Bia\nBeta,\nBETA,\n"
+    report = _import(competition, text)
+    assert (report.teams_created, report.players_created) == (2, 2)
+    assert [line for line, _ in report.errors] == [3]
+    assert _roster(competition) == {"Alfa": ["Ana", "Bia"], "Beta": []}
+
+    report = _import(competition, text)
+    assert (report.teams_created, report.players_created) == (0, 0)
+    assert [line for line, _ in report.errors] == [2, 3, 4]
+    assert _roster(competition) == {"Alfa": ["Ana", "Bia"], "Beta": []}
+
+def test_started_competition_accepts_players_but_not_new_teams(client, make_competition):
+    competition = make_competition(teams=2, players=0)
+    client.post(f"/competition/{competition.id}/generate_rr_matches")
+    assert competition.status != "planning"
+    version = competition.version
+    report = _import(competition, "team,player\nTime 1,Novo\nTime Novo,Outro\n")
+    assert (report.teams_created, report.players_created) == (0, 1)
+    assert [line for line, _ in report.errors] == [3]
+    assert _roster(competition) == {"Time 1": ["Novo"], "Time 2": []}
+    assert competition.version > version
+
+def test_dry_run_does_not_write(make_competition):
+    competition = make_competition(teams=0)
+    report = _import(competition, "team,player\nAlfa,Ana\n", dry_run=True)
+    assert (report.teams_created, report.players_created) == (1, 1)
+    assert _roster(competition) == {}
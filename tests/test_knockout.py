@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Avanço no mata-mata pela árvore (`next_match_id`/`next_slot`)."""
+
+import pytest
+
+from .. import models
+from ..knockout import match_winner
+
+@pytest.fixture
+def bracket(client, make_competition, record):
+    """Competição com grupos finalizados e mata-mata de 4 times: (competição, [semifinais], final)."""
+    competition = make_competition("groups_knockout", teams=8, players=0)
+    client.post(f"/competition/{competition.id}/setup_groups", data={"num_groups": 2, "teams_per_group": 4})
+    for match in models.get_competition_matches(competition.id):
+        record(match, 1, 0)
+    client.post(f"/competition/{competition.id}/setup_knockout", data={"num_teams_knockout": 4})
+    assert competition.status == "knockout_stage"
+    semifinals = [models.get_match(match_id) for match_id in competition.knockout_stage.rounds["Semifinal"]]
+    final, = [models.get_match(match_id) for match_id in competition.knockout_stage.rounds["Final"]]
+    return competition, semifinals, final
+
+def test_bracket_links_semifinals_to_final(bracket):
+    competition, semifinals, final = bracket
+    assert [(m.next_match_id, m.next_slot) for m in semifinals] == [(final.id, 1), (final.id, 2)]
+    assert final.next_match_id is None
+    assert (final.team1_id, final.team2_id) == (None, None)
+    assert competition.knockout_stage.bracket == [[m.id for m in semifinals], [final.id]]
+
+def test_winners_take_their_slots(bracket, record):
+    competition, (first, second), final = bracket
+    record(first, 2, 0)
+    assert (final.team1_id, final.team2_id) == (first.team1_id, None)
+    record(second, 0, 1)
+    assert (final.team1_id, final.team2_id) == (first.team1_id, second.team2_id)
+    assert final.id in {m.id for m in models.get_team_matches(second.team2_id)} # Índice por time atualizado
+
+def test_draw_is_decided_on_penalties(bracket, record):
+    competition, (first, second), final = bracket
+    record(first, 1, 1, penalties1=3, penalties2=4)
+    assert match_winner(first) == first.team2_id
+    assert final.team1_id == first.team2_id
+
+    record(first, 1, 1) # Empate sem pênaltis: vaga volta a ficar vazia
+    assert match_winner(first) is None
+    assert final.team1_id is None
+
+def test_editing_semifinal_before_final_moves_the_winner(bracket, record):
+    competition, (first, second), final = bracket
+    record(first, 2, 0)
+    record(second, 2, 0)
+    record(first, 0, 2)
+    assert (final.team1_id, final.team2_id) == (first.team2_id, second.team1_id)
+
+def test_editing_semifinal_after_final_keeps_the_final(bracket, record):
+    competition, (first, second), final = bracket
+    record(first, 2, 0)
+    record(second, 2, 0)
+    assert record(final, 1, 0).status_code == 302
+    assert competition.status == "finished"
+
+    record(first, 0, 2) # Final já disputada: não troca o finalista nem desfaz o resultado
+    assert match_winner(first) == first.team2_id
+    assert (final.team1_id, final.team2_id) == (first.team1_id, second.team1_id)
+    assert final.status == "finished" and match_winner(final) == first.team1_id
+
+def test_final_without_teams_cannot_be_recorded(bracket, record):
+    competition, semifinals, final = bracket
+    response = record(final, 1, 0)
+    assert response.status_code == 302
+    assert final.status == "scheduled"
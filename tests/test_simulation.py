@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Probabilidades de classificação: fora da página da competição e uma simulação por estado."""
+
+import threading
+
+from .. import models, simulation
+from ..cache import view_cache
+from ..routes import competition_view_model
+
+def _league(client, make_competition, record):
+    competition = make_competition(teams=4, players=0)
+    client.post(f"/competition/{competition.id}/generate_rr_matches")
+    record(models.get_competition_matches(competition.id)[0], 2, 0)
+    return competition
+
+def test_page_model_does_not_simulate(client, make_competition, record, monkeypatch):
+    competition = _league(client, make_competition, record)
+    def fail(*args, **kwargs): raise AssertionError("simulação no caminho da página")
+    monkeypatch.setattr(simulation, "simulate_standings", fail)
+    assert competition_view_model(competition)["round_robin_chances"] is True
+
+    for match in models.get_competition_matches(competition.id):
+        record(match, 1, 0)
+    assert competition_view_model(competition)["round_robin_chances"] is False # Sem partidas restantes
+
+def test_odds_api_serves_the_simulation(client, make_competition, record):
+    competition = _league(client, make_competition, record)
+    odds = client.get(f"/api/competition/{competition.id}/odds").get_json()["odds"]
+    assert odds["remaining_matches"] == len(models.get_competition_matches(competition.id)) - 1
+    assert sorted(team["team_id"] for team in odds["teams"]) == sorted(competition.teams)
+    assert all(abs(sum(team["positions"]) - 1) < 0.01 for team in odds["teams"])
+
+def test_concurrent_misses_share_one_simulation(client, make_competition, record, monkeypatch):
+    competition = _league(client, make_competition, record)
+    view_cache.invalidate(competition.id)
+    simulate, started, release, calls = simulation.simulate_standings, threading.Event(), threading.Event(), []
+    def slow_simulation(*args, **kwargs):
+        calls.append(args)
+        started.set()
+        release.wait(10)
+        return simulate(*args, **kwargs)
+    monkeypatch.setattr(simulation, "simulate_standings", slow_simulation)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(simulation.qualification_odds(competition)), daemon=True)
+               for _ in range(4)]
+    threads[0].start()
+    started.wait(10)
+    for thread in threads[1:]: thread.start()
+    release.set()
+    for thread in threads: thread.join(10)
+    assert len(calls) == 1
+    assert len(results) == 4 and all(result is results[0] for result in results)
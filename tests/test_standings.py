@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Classificação incremental (deltas por resultado) contra o recálculo completo."""
+
+from .. import models
+from ..standings import result_snapshot, apply_result_delta, ensure_standings, sort_standings, verify_standings
+
+def _match_between(competition, team1_id, team2_id):
+    for match in models.get_competition_matches(competition.id):
+        if {match.team1_id, match.team2_id} == {team1_id, team2_id}:
+            return match
+    raise AssertionError(f"Sem partida entre {team1_id} e {team2_id}")
+
+def _record_between(record, competition, team1_id, goals1, team2_id, goals2, events=()):
+    """Registra o placar na orientação da partida gerada (mandante/visitante)."""
+    match = _match_between(competition, team1_id, team2_id)
+    if match.team1_id == team1_id:
+        response = record(match, goals1, goals2, events)
+    else:
+        response = record(match, goals2, goals1, events)
+    assert response.status_code == 302
+    return match
+
+def _order(competition):
+    standings = ensure_standings(competition.id, save=False)
+    return [s.team_id for s in sort_standings(standings, competition.id)]
+
+def test_incremental_standings_match_recompute_after_edits(client, make_competition, record):
+    competition = make_competition(teams=4, players=1)
+    client.post(f"/competition/{competition.id}/generate_rr_matches")
+    matches = models.get_competition_matches(competition.id)
+    for index, match in enumerate(matches):
+        player = models.get_team_players(match.team1_id)[0]
+        record(match, index % 3, 1, [("goal", player.id), ("yellow_card", player.id)])
+    assert verify_standings(competition.id) == []
+
+    # Edições: placar invertido, cartões trocados, empate e um resultado que volta ao original
+    for match in matches[:3]:
+        rival = models.get_team_players(match.team2_id)[0]
+        record(match, 0, 2, [("red_card", rival.id)])
+    record(matches[3], 1, 1)
+    record(matches[0], 0, 1)
+    assert verify_standings(competition.id) == []
+    standings = competition.standings
+    assert sum(s.played for s in standings.values()) == 2 * len(matches)
+    assert sum(s.red_cards for s in standings.values()) == 2
+
+def test_removed_result_is_subtracted(client, make_competition, record):
+    competition = make_competition(teams=4)
+    client.post(f"/competition/{competition.id}/generate_rr_matches")
+    matches = models.get_competition_matches(competition.id)
+    for match in matches:
+        record(match, 2, 0)
+
+    match = matches[0]
+    previous = result_snapshot(match)
+    match.status = "scheduled"
+    match.team1_score = match.team2_score = None
+    assert apply_result_delta(match, previous)
+    assert verify_standings(competition.id) == []
+    assert competition.standings[match.team1_id].played == 2
+    assert match.team2_id not in competition.standings[match.team1_id].head_to_head
+
+def test_head_to_head_breaks_points_tie_before_goal_difference(client, make_competition, record):
+    competition = make_competition(teams=4)
+    client.post(f"/competition/{competition.id}/generate_rr_matches")
+    a, b, c, d = competition.teams
+    _record_between(record, competition, a, 1, b, 0)
+    _record_between(record, competition, a, 0, c, 1)
+    _record_between(record, competition, a, 1, d, 0)
+    _record_between(record, competition, b, 5, c, 0)
+    _record_between(record, competition, b, 5, d, 0)
+    _record_between(record, competition, c, 0, d, 0)
+    # A e B com 6 pontos; B tem saldo melhor, mas A venceu o confronto direto
+    assert competition.standings[a].points == competition.standings[b].points == 6
+    assert _order(competition)[:2] == [a, b]
+
+    _record_between(record, competition, a, 0, b, 1) # Edição: B passa a vencer
+    assert _order(competition)[0] == b
+    _record_between(record, competition, a, 1, b, 0) # E volta ao resultado original
+    assert _order(competition)[:2] == [a, b]
+    assert verify_standings(competition.id) == []
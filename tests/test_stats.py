@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Estatísticas materializadas (artilharia, disciplina, goleiros) e as tabelas ordenadas."""
+
+import threading
+
+import pytest
+
+from .. import models, stats
+from ..stats import verify_competition_stats, top_scorers, discipline_table, goalkeeper_table, calculate_stats
+
+@pytest.fixture
+def league(client, make_competition):
+    competition = make_competition(teams=4, players=2)
+    client.post(f"/competition/{competition.id}/generate_rr_matches")
+    return competition
+
+def _players(match):
+    return models.get_team_players(match.team1_id), models.get_team_players(match.team2_id)
+
+def test_materialized_stats_match_recompute_after_edits(league, record):
+    matches = models.get_competition_matches(league.id)
+    for match in matches:
+        (home, _), (away, _) = _players(match)
+        record(match, 2, 1, [("goal", home.id), ("goal", home.id), ("goal", away.id), ("yellow_card", away.id)])
+    assert verify_competition_stats(league.id) == ([], [])
+
+    # Edições: artilheiro trocado, cartões removidos e acrescentados, placar sem eventos
+    for match in matches[:3]:
+        (_, home_reserve), (away, _) = _players(match)
+        record(match, 1, 1, [("goal", home_reserve.id), ("goal", away.id), ("red_card", away.id)])
+    record(matches[3], 0, 0)
+    assert verify_competition_stats(league.id) == ([], [])
+
+    scorers = top_scorers(league.id)
+    goals = [row["goals"] for row in scorers]
+    assert goals == sorted(goals, reverse=True)
+    assert sum(goals) == 3 * 2 + 2 * 3 # Três partidas editadas (2 gols) e duas intactas (3 gols)
+    assert all(row["red_cards"] or row["yellow_cards"] for row in discipline_table(league.id))
+    conceded = [row["avg_conceded"] for row in goalkeeper_table(league.id)]
+    assert conceded == sorted(conceded)
+    assert sum(row["matches_played"] for row in goalkeeper_table(league.id)) == 2 * len(matches)
+
+def test_top_n_is_a_prefix_of_the_full_table(league, record):
+    for position, match in enumerate(models.get_competition_matches(league.id)):
+        (home, _), _ = _players(match)
+        record(match, position + 1, 0, [("goal", home.id)] * (position + 1))
+    assert top_scorers(league.id, 2) == top_scorers(league.id)[:2]
+    assert verify_competition_stats(league.id) == ([], [])
+
+def test_regenerated_matches_discard_their_stats(client, league, record):
+    match = models.get_competition_matches(league.id)[0]
+    (home, _), _ = _players(match)
+    record(match, 1, 0, [("goal", home.id)])
+    assert top_scorers(league.id)[0]["goals"] == 1
+
+    client.post(f"/competition/{league.id}/generate_rr_matches")
+    assert verify_competition_stats(league.id) == ([], [])
+    assert top_scorers(league.id) == [] and goalkeeper_table(league.id) == []
+
+def test_reads_do_not_wait_for_the_write_lock(league, record):
+    match = models.get_competition_matches(league.id)[0]
+    (home, _), _ = _players(match)
+    record(match, 1, 0, [("goal", home.id)])
+    stats._boards.clear() # A consulta também monta as tabelas sem a trava de escrita
+
+    writer_holds_lock, release = threading.Event(), threading.Event()
+    def writer():
+        with models.data_lock:
+            writer_holds_lock.set()
+            release.wait(10)
+    threading.Thread(target=writer, daemon=True).start()
+    writer_holds_lock.wait(10)
+    results = []
+    try:
+        reader = threading.Thread(target=lambda: results.append(calculate_stats(league.id)), daemon=True)
+        reader.start()
+        reader.join(5)
+        assert not reader.is_alive(), "consulta esperou pela trava de escrita"
+    finally:
+        release.set()
+    assert results[0]["top_scorers"][0]["name"] == home.name
+
+def test_reads_before_materialization_do_not_write(league, record):
+    match = models.get_competition_matches(league.id)[0]
+    (home, _), (away, _) = _players(match)
+    record(match, 1, 0, [("goal", home.id), ("red_card", away.id)])
+    league.stats_ready = False # Como os dados gravados antes dos totais materializados
+    stats._boards.clear()
+    version, dirty = league.version, set(models._dirty)
+
+    assert [row["name"] for row in top_scorers(league.id)] == [home.name]
+    assert [row["name"] for row in discipline_table(league.id)] == [away.name]
+    assert league.stats_ready is False
+    assert (league.version, set(models._dirty)) == (version, dirty)
+
+    record(models.get_competition_matches(league.id)[1], 0, 0) # Primeira alteração materializa os totais
+    assert league.stats_ready is True
+    assert verify_competition_stats(league.id) == ([], [])
+    assert [row["name"] for row in top_scorers(league.id)] == [home.name]
+
+def test_writes_replace_totals_instead_of_mutating(league, record):
+    match = models.get_competition_matches(league.id)[0]
+    (home, _), _ = _players(match)
+    record(match, 1, 0, [("goal", home.id)])
+    published = stats._boards[league.id].player_totals[home.id] # O que um leitor pode estar lendo
+    record(match, 2, 0, [("goal", home.id), ("goal", home.id)])
+    assert published["goals"] == 1
+    assert stats._boards[league.id].player_totals[home.id] is home.competition_stats[league.id]
+    assert top_scorers(league.id)[0]["goals"] == 2
+    assert verify_competition_stats(league.id) == ([], [])
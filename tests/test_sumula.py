@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Súmulas: dados extraídos, impressão digital e exportação em processos (spawn)."""
+
+import threading
+
+import pytest
+
+pytest.importorskip("fpdf")
+
+from .. import models, sumula
+from ..sumula import sumula_sheet, sumula_fingerprint, render_many, generate_sumula_pdf
+
+def _without_dates(pdf_bytes):
+    return pdf_bytes.split(b"/CreationDate")[0]
+
+@pytest.fixture
+def finished_matches(client, make_competition, record):
+    competition = make_competition(teams=4, players=1)
+    client.post(f"/competition/{competition.id}/generate_rr_matches")
+    matches = models.get_competition_matches(competition.id)
+    for match in matches:
+        scorer = models.get_team_players(match.team1_id)[0]
+        record(match, 1, 0, [("goal", scorer.id)], minute_0="12")
+    return matches
+
+def test_sheet_has_only_plain_data(finished_matches):
+    match = finished_matches[0]
+    sheet = sumula_sheet(match.id)
+    assert sheet["score1"] == 1 and sheet["events"] == [("12", "goal", models.get_team_players(match.team1_id)[0].name,
+                                                          models.get_team(match.team1_id).name)]
+    assert sheet["phase"] == f"Rodada {match.round_number}"
+    assert all(isinstance(value, (str, int, list, tuple, type(None))) for value in sheet.values())
+
+def test_fingerprint_changes_with_displayed_content(finished_matches, record):
+    match = finished_matches[0]
+    before = sumula_fingerprint(sumula_sheet(match.id), "T")
+    assert sumula_fingerprint(sumula_sheet(match.id), "T") == before
+    record(match, 2, 0)
+    assert sumula_fingerprint(sumula_sheet(match.id), "T") != before
+
+def test_parallel_export_does_not_depend_on_parent_locks(finished_matches, monkeypatch):
+    monkeypatch.setattr(sumula, "EXPORT_PARALLEL_MIN", 2)
+    match_ids = [m.id for m in finished_matches]
+    title = "Exportação em paralelo"
+    expected = {match_id: generate_sumula_pdf(match_id, title) for match_id in match_ids}
+    sumula.sumula_cache._entries.clear()
+
+    holding, release = threading.Event(), threading.Event()
+    def writer(): # Outra thread do worker segurando a trava de escrita durante a exportação
+        with models.data_lock:
+            holding.set()
+            release.wait(60)
+    threading.Thread(target=writer, daemon=True).start()
+    holding.wait(10)
+    try:
+        rendered = list(render_many(match_ids, title, workers=2))
+    finally:
+        release.set()
+    assert [match_id for match_id, _ in rendered] == match_ids
+    assert all(_without_dates(pdf) == _without_dates(expected[match_id]) for match_id, pdf in rendered)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Gravação em grupo (group commit): agrupa várias solicitações de save_data em uma única gravação."""
+
+import atexit
+import os
+import threading
+import time
+
+class GroupCommitWriter:
+    """Thread de gravação que executa no máximo uma gravação por `interval` segundos.
+
+    As rotas apenas marcam o armazenamento como sujo (`request`); a thread grava tudo o que estiver
+    pendente de uma vez. `request(wait=True)` grava imediatamente na thread chamadora e só retorna
+    com os dados no disco.
+    """
+
+    def __init__(self, flush, interval):
+        self._flush = flush # flush(full) -> bool; grava todas as alterações pendentes
+        self.interval = interval
+        self.save_requests = 0 # Solicitações recebidas
+        self.flushes = 0 # Gravações efetivamente executadas
+        self._reset()
+        atexit.register(self.shutdown)
+
+    def _reset(self):
+        # Chamado também após fork (gunicorn --preload): threads e travas do processo pai não são herdadas
+        self._cond = threading.Condition()
+        self._pending = False
+        self._full = False
+        self._stopping = False
+        self._thread = None
+        self._last_flush = 0.0
+        self._pid = os.getpid()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="group-commit-writer", daemon=True)
+            self._thread.start()
+
+    def request(self, full=False, wait=False):
+        """Solicita uma gravação. Com wait=True grava já (incluindo o que estava pendente) antes de retornar."""
+        if self._pid != os.getpid():
+            self._reset()
+        with self._cond:
+            self.save_requests += 1
+            if not wait:
+                self._pending = True
+                self._full = self._full or full
+                self._ensure_thread()
+                self._cond.notify()
+                return
+            # A gravação síncrona leva junto tudo o que estava pendente
+            self._pending = False
+            full = self._full or full
+            self._full = False
+        self._run_flush(full)
+
+    def _run_flush(self, full):
+        self._flush(full)
+        with self._cond:
+            self.flushes += 1
+            self._last_flush = time.monotonic()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                delay = self._last_flush + self.interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay) # Acumula as solicitações que chegarem neste intervalo
+            with self._cond:
+                if not self._pending:
+                    continue
+                self._pending = False
+                full = self._full
+                self._full = False
+            self._run_flush(full)
+
+    def flush(self):
+        """Grava imediatamente o que estiver pendente (sem contar como nova solicitação)."""
+        with self._cond:
+            if not self._pending:
+                return
+            self._pending = False
+            full = self._full
+            self._full = False
+        self._run_flush(full)
+
+    def shutdown(self):
+        """Para a thread e grava as alterações pendentes (registrado no atexit)."""
+        if self._pid != os.getpid():
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self.flush()
+
+    def stats(self):
+        """Contadores de solicitações, gravações executadas e solicitações agrupadas (coalescidas)."""
+        return {"save_requests": self.save_requests, "flushes": self.flushes,
+                "coalesced": max(self.save_requests - self.flushes, 0)}